@@ -1,16 +1,20 @@
 """Authentication utilities."""
 
-from datetime import datetime, timedelta, timezone
-from typing import Any
+import secrets
+import time
+from collections import OrderedDict
+from collections.abc import Callable
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from jose import JWTError, jwt
+from loguru import logger
 from pydantic import BaseModel
 
 from config import settings
 
 security = HTTPBearer()
+# For endpoints open to anyone that do more for a signed-in caller
+optional_security = HTTPBearer(auto_error=False)
 
 
 class Token(BaseModel):
@@ -29,42 +33,109 @@ class UserSession(BaseModel):
     host: str
     port: int
     username: str
-    # password stored in encrypted JWT — only used for SSH reconnection
+    # kept server-side in the session store — only used for SSH reconnection
     password: str
 
 
-def create_access_token(data: dict[str, Any]) -> str:
-    """Create a JWT access token."""
-    expire = datetime.now(timezone.utc) + timedelta(minutes=settings.access_token_expire_minutes)
-    to_encode = {**data, "exp": expire}
-    return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
-
-
-def decode_token(token: str) -> dict[str, Any]:
-    """Decode and validate a JWT token."""
-    try:
-        return jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-    except JWTError:
+class SessionStore:
+    """Server-side sessions, looked up by an opaque ID handed out at login.
+
+    The ID is the bearer token, so credentials never leave the server after
+    login. Sessions expire ``access_token_expire_minutes`` after login or are
+    revoked at logout; beyond ``session_max`` the least recently used ones
+    are dropped. Held in memory only: a server restart logs everyone out.
+
+    Whatever the backend keeps for a login (pollers, samplers, tails, idle
+    connections) is released by the ``on_end`` callbacks once the login's
+    last live session is gone. Call these from the event loop.
+    """
+
+    def __init__(self):
+        # id -> (session, expiry); most recently used last
+        self._sessions: OrderedDict[str, tuple[UserSession, float]] = OrderedDict()
+        self._on_end: list[Callable[[UserSession], None]] = []
+
+    def on_end(self, callback: Callable[[UserSession], None]) -> None:
+        """Call ``callback(session)`` when the last live session with its credentials ends.
+
+        That is at logout, on expiry (noticed by ``expire`` or a lookup) or
+        when the session is evicted beyond ``session_max``.
+        """
+        self._on_end.append(callback)
+
+    def create(self, session: UserSession) -> str:
+        self.expire()
+        ended = []
+        while len(self._sessions) >= settings.session_max:
+            ended.append(self._sessions.popitem(last=False)[1][0])
+        sid = secrets.token_urlsafe(32)
+        self._sessions[sid] = (session, time.monotonic() + settings.access_token_expire_minutes * 60)
+        for old in ended:
+            self._ended(old)
+        return sid
+
+    def get(self, sid: str) -> UserSession | None:
+        entry = self._sessions.get(sid)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._sessions[sid]
+            self._ended(entry[0])
+            return None
+        self._sessions.move_to_end(sid)
+        return entry[0]
+
+    def revoke(self, sid: str) -> UserSession | None:
+        """Forget a session; returns it if it was still live."""
+        entry = self._sessions.pop(sid, None)
+        if entry is None:
+            return None
+        self._ended(entry[0])
+        return entry[0] if entry[1] > time.monotonic() else None
+
+    def expire(self) -> None:
+        """Drop the sessions past their expiry and release what their logins held."""
+        now = time.monotonic()
+        expired = [sid for sid, (_, expires) in self._sessions.items() if expires <= now]
+        for sid in expired:
+            self._ended(self._sessions.pop(sid)[0])
+
+    def _ended(self, session: UserSession) -> None:
+        if self.in_use(session):
+            return
+        for callback in self._on_end:
+            try:
+                callback(session)
+            except Exception as e:
+                logger.error("Releasing the session of {}@{} failed: {}", session.username, session.host, e)
+
+    def live(self) -> int:
+        now = time.monotonic()
+        return sum(1 for _, expires in self._sessions.values() if expires > now)
+
+    def in_use(self, session: UserSession) -> bool:
+        """Whether any live session is logged in with the same credentials."""
+        now = time.monotonic()
+        return any(s == session and expires > now for s, expires in self._sessions.values())
+
+
+session_store = SessionStore()
+
+
+def session_from_token(token: str) -> UserSession:
+    """The live session a login token was issued for."""
+    session = session_store.get(token)
+    if session is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
         )
+    return session
 
 
-def get_current_session(
+async def get_current_session(
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ) -> UserSession:
-    """Extract the current user session from the JWT token."""
-    payload = decode_token(credentials.credentials)
-    try:
-        return UserSession(
-            host=payload["host"],
-            port=payload["port"],
-            username=payload["username"],
-            password=payload["password"],
-        )
-    except KeyError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token payload",
-        )
+    """Look up the current user session from its bearer token."""
+    # Async so lookups stay on the event loop: an expired session's on_end callbacks run here
+    return session_from_token(credentials.credentials)
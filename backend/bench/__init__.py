@@ -0,0 +1 @@
+"""Offline benchmark suite: a local SSH server and fake nanobot host driven through the API."""
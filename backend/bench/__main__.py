@@ -0,0 +1,127 @@
+"""Run the benchmark suite: ``python -m bench`` from the backend directory.
+
+Starts a local SSH server over a synthetic nanobot home, serves the API
+against it and drives every endpoint plus the chat socket, reporting
+p50/p99 latency, SSH round trips and bytes per request. ``--output`` writes
+the results as JSON; ``--baseline`` compares against an earlier run and
+exits non-zero on a regression.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import platform
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from loguru import logger
+
+from bench.fixtures import FixtureSize, build_home
+from bench.sshd import BenchSSHServer
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m bench", description=__doc__.split("\n\n")[0])
+    parser.add_argument("-n", "--iterations", type=int, default=20, help="timed requests per endpoint (default 20)")
+    parser.add_argument("--engine", choices=("asyncssh", "paramiko"), default="asyncssh")
+    parser.add_argument("--only", help="regex; run only the endpoints whose name matches")
+    parser.add_argument("--skills", type=int, default=FixtureSize.skills, help="workspace skills in the fixture")
+    parser.add_argument("--memory-mb", type=float, default=FixtureSize.memory_mb, help="size of MEMORY.md")
+    parser.add_argument("-o", "--output", type=Path, help="write results as JSON here")
+    parser.add_argument("--baseline", type=Path, help="JSON from an earlier run to compare against")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25,
+        help="allowed relative slowdown of p50 and growth in bytes before a regression is reported (default 0.25)",
+    )
+    return parser.parse_args()
+
+
+def compare(results: list[dict], baseline: dict, tolerance: float) -> list[str]:
+    """Human-readable regressions of ``results`` against a baseline run."""
+    before = {r["name"]: r for r in baseline["results"]}
+    problems = []
+    for result in results:
+        base = before.get(result["name"])
+        if base is None:
+            continue
+        # Sub-millisecond differences are noise whatever the ratio
+        if result["p50_ms"] > base["p50_ms"] * (1 + tolerance) and result["p50_ms"] - base["p50_ms"] > 1:
+            problems.append(f"{result['name']}: p50 {base['p50_ms']}ms -> {result['p50_ms']}ms")
+        if result["round_trips"] > base["round_trips"] + 0.01:
+            problems.append(f"{result['name']}: round trips {base['round_trips']} -> {result['round_trips']}")
+        if result["bytes"] > base["bytes"] * (1 + tolerance) and result["bytes"] - base["bytes"] > 1024:
+            problems.append(f"{result['name']}: bytes {base['bytes']} -> {result['bytes']}")
+        if result["errors"] > base["errors"]:
+            problems.append(f"{result['name']}: errors {base['errors']} -> {result['errors']}")
+    return problems
+
+
+def main() -> int:
+    args = parse_args()
+    # Keep the report readable: only the backend's warnings, and none of the
+    # handshake errors port scans cause on the bench sshd
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    logging.getLogger("paramiko").setLevel(logging.CRITICAL)
+    size = FixtureSize(skills=args.skills, memory_mb=args.memory_mb)
+    with tempfile.TemporaryDirectory(prefix="nanobot-bench-") as tmp:
+        print(f"Building fixture in {tmp} ...", file=sys.stderr)
+        sshd = BenchSSHServer(build_home(Path(tmp), size))
+        sshd.start()
+
+        os.environ["NANOBOT_WEB_SSH_ENGINE"] = args.engine
+        # Keep background pollers from adding to the measured traffic
+        os.environ.setdefault("NANOBOT_WEB_DASHBOARD_POLL_INTERVAL", "3600")
+        os.environ.setdefault("NANOBOT_WEB_METRICS_SAMPLE_INTERVAL", "3600")
+        os.environ["NANOBOT_WEB_LOCAL_STORE_PATH"] = f"{tmp}/state.db"
+        from bench.runner import Bench, start_api
+
+        server, base = start_api()
+        bench = Bench(sshd, base, args.iterations)
+        print(f"{'endpoint':<40} {'p50 ms':>9} {'p99 ms':>9} {'first ms':>9} {'trips':>6} {'bytes':>10} {'err':>4}")
+
+        def report(r) -> None:
+            print(
+                f"{r.name:<40} {r.p50_ms:>9.2f} {r.p99_ms:>9.2f} {r.first_ms:>9.2f} "
+                f"{r.round_trips:>6.2f} {r.bytes:>10,.0f} {r.errors:>4}",
+                flush=True,
+            )
+
+        try:
+            results = bench.run(re.compile(args.only) if args.only else None, progress=report)
+        finally:
+            server.should_exit = True
+            time.sleep(0.5)
+            sshd.close()
+
+    output = {
+        "meta": {
+            "time": time.time(),
+            "engine": args.engine,
+            "iterations": args.iterations,
+            "fixture": size.__dict__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": [r.as_dict() for r in results],
+    }
+    if args.output:
+        args.output.write_text(json.dumps(output, indent=2))
+        print(f"Wrote {args.output}", file=sys.stderr)
+    if args.baseline:
+        problems = compare(output["results"], json.loads(args.baseline.read_text()), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        if problems:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
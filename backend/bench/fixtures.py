@@ -0,0 +1,250 @@
+"""Synthetic nanobot host: a home directory with a fake ``nanobot`` CLI and package."""
+
+from __future__ import annotations
+
+import json
+import random
+import sys
+import textwrap
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass
+class FixtureSize:
+    skills: int = 300
+    builtin_skills: int = 20
+    memory_mb: float = 4
+    history_mb: float = 8
+    memory_notes: int = 30
+    cron_jobs: int = 50
+    log_lines: int = 20_000
+
+
+# Console script installed as ``nanobot``. Cron subcommands edit jobs.json the
+# way the real CLI does; the agent answers with an echo.
+_CLI = '''\
+import json, os, sys, time, uuid
+
+JOBS = os.path.expanduser("~/.nanobot/cron/jobs.json")
+
+
+def load():
+    with open(JOBS) as f:
+        return json.load(f)
+
+
+def save(data):
+    with open(JOBS, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def option(args, name, default=None):
+    return args[args.index(name) + 1] if name in args else default
+
+
+def cron(args):
+    data = load()
+    jobs = data["jobs"]
+    if args[0] == "add":
+        job = {
+            "id": uuid.uuid4().hex[:8],
+            "name": option(args, "--name"),
+            "enabled": True,
+            "schedule": {"kind": "every", "everyMs": int(option(args, "--every", "3600")) * 1000},
+            "payload": {"kind": "agent_turn", "message": option(args, "--message"), "deliver": "--deliver" in args},
+            "state": {"nextRunAtMs": int(time.time() * 1000) + 3600000},
+            "createdAtMs": int(time.time() * 1000),
+        }
+        jobs.append(job)
+        save(data)
+        print("Added job '%s' (%s)" % (job["name"], job["id"]))
+        return 0
+    job = next((j for j in jobs if j["id"] == args[1]), None)
+    if job is None:
+        print("Job %s not found" % args[1], file=sys.stderr)
+        return 1
+    if args[0] == "remove":
+        jobs.remove(job)
+        print("Removed job %s" % job["id"])
+    elif args[0] == "enable":
+        job["enabled"] = "--disable" not in args
+        print("Job %s %s" % (job["id"], "enabled" if job["enabled"] else "disabled"))
+    elif args[0] == "run":
+        print("Ran job %s" % job["id"])
+    save(data)
+    return 0
+
+
+def main(args):
+    if args[:1] == ["cron"]:
+        return cron(args[1:])
+    if args[:1] == ["agent"]:
+        if "--message" in args:
+            print("echo: " + option(args, "--message"))
+            return 0
+        for line in sys.stdin:
+            print("echo: " + line.rstrip("\\n"), flush=True)
+        return 0
+    if args[:1] == ["gateway"]:
+        print("gateway started")
+        return 0
+    print("nanobot " + " ".join(args))
+    return 0
+
+
+sys.exit(main(sys.argv[1:]))
+'''
+
+# The parts of the nanobot package the chat agent script imports
+_PACKAGE = {
+    "__init__.py": "",
+    "agent/__init__.py": "",
+    "agent/loop.py": """\
+        class AgentLoop:
+            def __init__(self, bus, provider, workspace, model=None, max_iterations=20):
+                self.turns = {}
+
+            async def process_direct(self, content, session_key="cli:direct", on_progress=None):
+                self.turns[session_key] = self.turns.get(session_key, 0) + 1
+                if on_progress:
+                    await on_progress("thinking")
+                return "turn %d: %s" % (self.turns[session_key], content)
+        """,
+    "bus/__init__.py": "",
+    "bus/queue.py": """\
+        class MessageBus:
+            pass
+        """,
+    "cli/__init__.py": "",
+    "cli/commands.py": """\
+        def _make_provider(config):
+            return object()
+        """,
+    "config/__init__.py": "",
+    "config/loader.py": """\
+        import os, types
+
+        def load_config():
+            defaults = types.SimpleNamespace(model="bench/model", max_tool_iterations=5)
+            return types.SimpleNamespace(
+                agents=types.SimpleNamespace(defaults=defaults),
+                tools=types.SimpleNamespace(),
+                workspace_path=os.path.expanduser("~/.nanobot/workspace"),
+            )
+        """,
+}
+
+# Stand-ins for host tools the backend shells out to. The benchmark runs
+# commands on this machine, so restarting "nanobot" must not touch real processes.
+_SHIMS = {
+    "systemctl": "exit 1\n",
+    "journalctl": "exit 1\n",
+    "pkill": "exit 1\n",
+}
+
+_LEVELS = ["INFO"] * 8 + ["DEBUG", "WARNING", "ERROR"]
+_WORDS = (
+    "agent tool call memory channel provider message session cron skill workspace "
+    "response token model config request reply user search file note"
+).split()
+
+
+def _write(path: Path, content: str | bytes, mode: int | None = None) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(content, str):
+        content = content.encode()
+    path.write_bytes(content)
+    if mode is not None:
+        path.chmod(mode)
+
+
+def _prose(rng: random.Random, size: int) -> str:
+    lines, total = [], 0
+    while total < size:
+        line = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(6, 16))).capitalize() + "."
+        lines.append(line)
+        total += len(line) + 1
+    return "\n".join(lines) + "\n"
+
+
+def _skill(name: str, rng: random.Random) -> str:
+    return (
+        f"---\nname: {name}\ndescription: {' '.join(rng.choice(_WORDS) for _ in range(10))}\n---\n\n"
+        f"# {name}\n\n" + _prose(rng, 2000)
+    )
+
+
+def build_home(root: Path, size: FixtureSize | None = None, seed: int = 0) -> Path:
+    """Create a fake host home under ``root``; returns its path.
+
+    ``bin/`` holds the ``nanobot`` console script (its shebang names a wrapper
+    interpreter that can import the fake package in ``lib/``) and the shims;
+    ``.nanobot/`` holds the config, workspace, memory and cron jobs.
+    """
+    size = size or FixtureSize()
+    rng = random.Random(seed)
+    home = root / "home"
+    bin_dir, lib_dir, dot = home / "bin", home / "lib", home / ".nanobot"
+
+    python = bin_dir / "python3-nanobot"
+    _write(python, f'#!/bin/sh\nPYTHONPATH={lib_dir} exec {sys.executable} "$@"\n', 0o755)
+    _write(bin_dir / "nanobot", f"#!{python}\n" + _CLI, 0o755)
+    for name, body in _SHIMS.items():
+        _write(bin_dir / name, "#!/bin/sh\n" + body, 0o755)
+    for rel, source in _PACKAGE.items():
+        _write(lib_dir / "nanobot" / rel, textwrap.dedent(source))
+    # Installed the way pip would, so the backend can read the version without running pip
+    _write(lib_dir / "nanobot_ai-0.1.4.dist-info" / "METADATA", "Metadata-Version: 2.1\nName: nanobot-ai\nVersion: 0.1.4\n")
+    for i in range(size.builtin_skills):
+        _write(lib_dir / "nanobot" / "skills" / f"builtin-{i:03d}" / "SKILL.md", _skill(f"builtin-{i:03d}", rng))
+
+    config = {
+        "agents": {"defaults": {"model": "bench/model", "maxTokens": 8192, "temperature": 0.1}},
+        "providers": {f"provider{i}": {"apiKey": f"sk-{i:032d}", "apiBase": None} for i in range(10)},
+        "channels": {
+            name: {"enabled": i % 2 == 0, "token": f"token-{i}", "allowFrom": []}
+            for i, name in enumerate(["telegram", "discord", "slack", "whatsapp", "feishu", "email", "qq", "matrix"])
+        },
+        "tools": {
+            "restrictToWorkspace": False,
+            "mcpServers": {f"mcp{i}": {"command": "npx", "args": [f"server-{i}"]} for i in range(5)},
+        },
+    }
+    _write(dot / "config.json", json.dumps(config, indent=2))
+
+    workspace = dot / "workspace"
+    _write(workspace / "AGENTS.md", "# Agents\n\n" + _prose(rng, 4000))
+    for i in range(size.skills):
+        _write(workspace / "skills" / f"skill-{i:04d}" / "SKILL.md", _skill(f"skill-{i:04d}", rng))
+
+    memory = workspace / "memory"
+    _write(memory / "MEMORY.md", _prose(rng, int(size.memory_mb * 1_048_576)))
+    _write(memory / "HISTORY.md", _prose(rng, int(size.history_mb * 1_048_576)))
+    for i in range(size.memory_notes):
+        _write(memory / f"2026-01-{i + 1:02d}.md", _prose(rng, 8000))
+
+    now_ms = 1_767_225_600_000
+    jobs = [
+        {
+            "id": f"job{i:05d}",
+            "name": f"job {i}",
+            "enabled": i % 3 != 0,
+            "schedule": {"kind": "every", "everyMs": 3_600_000},
+            "payload": {"kind": "agent_turn", "message": f"check {rng.choice(_WORDS)}", "deliver": False},
+            "state": {"nextRunAtMs": now_ms + i * 60_000},
+            "createdAtMs": now_ms,
+        }
+        for i in range(size.cron_jobs)
+    ]
+    _write(dot / "cron" / "jobs.json", json.dumps({"version": 1, "jobs": jobs}, indent=2))
+
+    log = []
+    for i in range(size.log_lines):
+        level = rng.choice(_LEVELS)
+        log.append(
+            f"2026-01-01 00:{i // 600 % 60:02d}:{i // 10 % 60:02d}.{i % 10}00 | {level:<8} | "
+            f"nanobot.agent:run:{rng.randint(10, 400)} - {' '.join(rng.choice(_WORDS) for _ in range(8))}"
+        )
+    _write(home / "nanobot.log", "\n".join(log) + "\n")
+    return home
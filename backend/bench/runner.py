@@ -0,0 +1,313 @@
+"""Drives every API endpoint and the chat socket against the bench server and measures them.
+
+Imported only after ``__main__`` has pointed the settings at the bench host,
+since importing ``main`` reads them.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import socket
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+import uvicorn
+from websockets.sync.client import connect as ws_connect
+
+from bench.sshd import BenchSSHServer
+from main import app
+
+
+class Client:
+    """Minimal JSON-over-HTTP client for the API served on ``base``."""
+
+    def __init__(self, base: str):
+        self.base = base
+        self.token: str | None = None
+
+    def call(self, method: str, path: str, body: Any = None, headers: dict[str, str] | None = None) -> tuple[int, bytes, dict[str, str]]:
+        data = None if body is None else json.dumps(body).encode()
+        req = urllib.request.Request(self.base + path, data=data, method=method)
+        req.add_header("Content-Type", "application/json")
+        if self.token:
+            req.add_header("Authorization", f"Bearer {self.token}")
+        for name, value in (headers or {}).items():
+            req.add_header(name, value)
+        try:
+            with urllib.request.urlopen(req, timeout=120) as res:
+                return res.status, res.read(), {k.lower(): v for k, v in res.headers.items()}
+        except urllib.error.HTTPError as e:
+            return e.code, e.read(), {k.lower(): v for k, v in e.headers.items()}
+
+    def json(self, method: str, path: str, body: Any = None) -> Any:
+        status, payload, _ = self.call(method, path, body)
+        if status >= 400:
+            raise RuntimeError(f"{method} {path} -> {status}: {payload[:200]!r}")
+        return json.loads(payload)
+
+
+@dataclass
+class Scenario:
+    name: str
+    # Makes one request; returns its HTTP status (or 200 for a socket exchange)
+    run: Callable[[int], int]
+    iterations: int | None = None  # overrides the run-wide count (slow or finite scenarios)
+
+
+@dataclass
+class Result:
+    name: str
+    iterations: int
+    errors: int
+    first_ms: float
+    p50_ms: float
+    p99_ms: float
+    mean_ms: float
+    # Per request, measured at the bench sshd
+    round_trips: float
+    channels: float
+    sftp_ops: float
+    connections: float
+    bytes: float
+    samples_ms: list[float] = field(default_factory=list, repr=False)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {k: v for k, v in self.__dict__.items() if k != "samples_ms"}
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def start_api() -> tuple[uvicorn.Server, str]:
+    """Serve the app from a background thread on a free local port."""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning", lifespan="on"))
+    threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True).start()
+    deadline = time.monotonic() + 30
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("API server did not start")
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+class Bench:
+    def __init__(self, sshd: BenchSSHServer, base: str, iterations: int):
+        self.sshd = sshd
+        self.api = Client(base)
+        self.ws_base = base.replace("http://", "ws://")
+        self.iterations = iterations
+        self.login = {"host": "127.0.0.1", "port": sshd.port, "username": "bench", "password": sshd.password}
+
+    def measure(self, scenario: Scenario) -> Result:
+        iterations = scenario.iterations or self.iterations
+        # The first call pays for cold caches and new connections; reported on its own
+        started = time.perf_counter()
+        errors = int(scenario.run(0) >= 400)
+        first_ms = (time.perf_counter() - started) * 1000
+        self.sshd.stats.take()
+
+        samples = []
+        for i in range(1, iterations + 1):
+            started = time.perf_counter()
+            status = scenario.run(i)
+            samples.append((time.perf_counter() - started) * 1000)
+            errors += status >= 400
+        wire = self.sshd.stats.take()
+        per = {name: round(count / iterations, 2) for name, count in wire.items()}
+        return Result(
+            name=scenario.name,
+            iterations=iterations,
+            errors=errors,
+            first_ms=round(first_ms, 2),
+            p50_ms=round(_percentile(samples, 50), 2),
+            p99_ms=round(_percentile(samples, 99), 2),
+            mean_ms=round(statistics.fmean(samples), 2),
+            round_trips=round(per["channels"] + per["sftp_ops"], 2),
+            channels=per["channels"],
+            sftp_ops=per["sftp_ops"],
+            connections=per["connections"],
+            bytes=round(per["bytes_in"] + per["bytes_out"]),
+            samples_ms=samples,
+        )
+
+    def scenarios(self) -> tuple[list[Scenario], dict[str, Any]]:
+        api = self.api
+        state: dict[str, Any] = {}
+
+        def get(path: str) -> Callable[[int], int]:
+            return lambda i: api.call("GET", path)[0]
+
+        def send(method: str, path: str, body: Callable[[int], Any]) -> Callable[[int], int]:
+            return lambda i: api.call(method, path, body(i))[0]
+
+        def login(i: int) -> int:
+            return api.call("POST", "/api/auth/login", self.login)[0]
+
+        def patch_config(i: int) -> int:
+            if "version" not in state:
+                state["version"] = api.call("GET", "/api/config")[2]["etag"].strip('"')
+            status, _, headers = api.call(
+                "PATCH",
+                "/api/config",
+                {"agents": {"defaults": {"temperature": round(0.1 + i / 1000, 3)}}},
+                {"Content-Type": "application/merge-patch+json", "If-Match": f'"{state["version"]}"'},
+            )
+            if "etag" in headers:
+                state["version"] = headers["etag"].strip('"')
+            return status
+
+        def put_config(i: int) -> int:
+            config = state.setdefault("config", api.json("GET", "/api/config"))
+            return api.call("PUT", "/api/config", {"config": config})[0]
+
+        def memory_path() -> dict[str, str]:
+            if "memory" not in state:
+                files = api.json("GET", "/api/memory")["files"]
+                state["memory"] = {f["name"]: f["path"] for f in files}
+            return state["memory"]
+
+        def memory_read(query: str) -> Callable[[int], int]:
+            def run(i: int) -> int:
+                path = urllib.request.quote(memory_path()["MEMORY.md"])
+                return api.call("GET", f"/api/memory/file?path={path}{query}")[0]
+            return run
+
+        def memory_write(i: int) -> int:
+            path = memory_path()["2026-01-01.md"]
+            return api.call("PUT", "/api/memory", {"path": path, "content": f"note {i}\n" * 200})[0]
+
+        def logs_follow(i: int) -> int:
+            query = f"&cursor={urllib.request.quote(state['cursor'])}" if state.get("cursor") else ""
+            status, payload, _ = api.call("GET", f"/api/logs?lines=200{query}")
+            if status < 400:
+                state["cursor"] = json.loads(payload).get("cursor")
+            return status
+
+        def cron_add(i: int) -> int:
+            body = {"name": f"bench {i}", "message": "ping", "schedule_type": "every", "schedule_value": 3600}
+            return api.call("POST", "/api/cron", body)[0]
+
+        def cron_run(i: int) -> int:
+            status, payload, _ = api.call("POST", "/api/cron/job00002/run")
+            if status >= 400:
+                return status
+            run_id = json.loads(payload)["run"]["id"]
+            with ws_connect(f"{self.ws_base}/ws/cron/runs/{run_id}", max_size=None) as ws:
+                ws.send(json.dumps({"token": api.token}))
+                while (frame := json.loads(ws.recv()))["type"] == "output":
+                    pass
+            return 200 if frame["type"] == "done" and frame["run"]["status"] == "ok" else 500
+
+        def fleet(method: str, path: str, body: Any = None) -> Callable[[int], int]:
+            def run(i: int) -> int:
+                if "fleet" not in state:
+                    # A second member: the same sshd under another login
+                    api.json("POST", "/api/fleet/hosts", {**self.login, "username": "bench2"})
+                    state["fleet"] = True
+                return api.call(method, path, body)[0]
+            return run
+
+        def chat_turn(i: int) -> int:
+            ws = state.get("ws")
+            if ws is None:
+                ws = state["ws"] = ws_connect(f"{self.ws_base}/ws/chat", max_size=None)
+                ws.send(json.dumps({"token": api.token}))
+                json.loads(ws.recv())  # connected
+            ws.send(json.dumps({"id": f"m{i}", "message": f"hello {i}"}))
+            while True:
+                frame = json.loads(ws.recv())
+                if frame["type"] == "done":
+                    return 200
+                if frame["type"] == "error":
+                    return 500
+
+        def chat_connect(i: int) -> int:
+            with ws_connect(f"{self.ws_base}/ws/chat", max_size=None) as ws:
+                ws.send(json.dumps({"token": api.token}))
+                json.loads(ws.recv())
+                ws.send(json.dumps({"id": "first", "message": "hello"}))
+                while json.loads(ws.recv())["type"] not in ("done", "error"):
+                    pass
+            return 200
+
+        def skill_name(i: int) -> str:
+            return f"skill-{i % 300:04d}"
+
+        n = self.iterations
+        return [
+            Scenario("POST /api/auth/login", login, iterations=min(n, 10)),
+            Scenario("GET /api/auth/me", get("/api/auth/me")),
+            Scenario("GET /api/health", get("/api/health")),
+            Scenario("GET /api/connection", get("/api/connection")),
+            Scenario("GET /api/dashboard", get("/api/dashboard")),
+            Scenario("GET /api/metrics/history", get("/api/metrics/history")),
+            Scenario("GET /api/config", get("/api/config")),
+            Scenario("PUT /api/config", put_config),
+            Scenario("PATCH /api/config", patch_config),
+            Scenario("GET /api/config/{section}", get("/api/config/agents")),
+            Scenario("PUT /api/config/{section}", send("PUT", "/api/config/agents", lambda i: {"data": {"defaults": {"model": f"bench/m{i}"}}})),
+            Scenario("GET /api/channels", get("/api/channels")),
+            Scenario("PUT /api/channels/{channel}", send("PUT", "/api/channels/telegram", lambda i: {"data": {"enabled": bool(i % 2)}})),
+            Scenario("GET /api/agents", get("/api/agents")),
+            Scenario("PUT /api/agents/md", send("PUT", "/api/agents/md", lambda i: {"content": f"# Agents\n\nrevision {i}\n"})),
+            Scenario("PUT /api/agents/config", send("PUT", "/api/agents/config", lambda i: {"data": {"defaults": {"maxTokens": 8000 + i}}})),
+            Scenario("GET /api/skills", get("/api/skills")),
+            Scenario("GET /api/skills/{name}", lambda i: api.call("GET", f"/api/skills/{skill_name(i)}")[0]),
+            Scenario("PUT /api/skills/{name}", lambda i: api.call("PUT", f"/api/skills/{skill_name(i)}", {"content": f"# {skill_name(i)}\n\nv{i}\n"})[0]),
+            Scenario("POST /api/skills", lambda i: api.call("POST", "/api/skills", {"name": f"bench-{time.monotonic_ns()}", "content": "# new\n"})[0]),
+            Scenario("GET /api/providers", get("/api/providers")),
+            Scenario("PUT /api/providers/{provider}", send("PUT", "/api/providers/provider0", lambda i: {"data": {"apiKey": f"sk-{i}"}})),
+            Scenario("GET /api/tools", get("/api/tools")),
+            Scenario("PUT /api/tools", send("PUT", "/api/tools", lambda i: {"data": {"restrictToWorkspace": bool(i % 2)}})),
+            Scenario("GET /api/memory", get("/api/memory")),
+            Scenario("GET /api/memory/file (1MB chunk)", memory_read("")),
+            Scenario("GET /api/memory/file?tail=200", memory_read("&tail=200")),
+            Scenario("PUT /api/memory", memory_write),
+            Scenario("GET /api/search?q= (common words)", get("/api/search?q=agent%20memo")),
+            Scenario("GET /api/search?q=&kind=skill", get("/api/search?q=skill-0042&kind=skill")),
+            Scenario("GET /api/logs?lines=200", get("/api/logs?lines=200")),
+            Scenario("GET /api/logs?level=error&pattern=", get("/api/logs?lines=200&level=error&pattern=memory")),
+            Scenario("GET /api/logs?cursor= (follow)", logs_follow),
+            Scenario("GET /api/cron", get("/api/cron")),
+            Scenario("POST /api/cron", cron_add),
+            Scenario("PUT /api/cron/{id}/toggle", lambda i: api.call("PUT", "/api/cron/job00001/toggle", {"enabled": bool(i % 2)})[0]),
+            Scenario("POST /api/cron/{id}/run + WS until done", cron_run),
+            Scenario("DELETE /api/cron/{id}", lambda i: api.call("DELETE", f"/api/cron/job{10 + i:05d}")[0], iterations=min(n, 39)),
+            Scenario("POST /api/service/restart", lambda i: api.call("POST", "/api/service/restart")[0], iterations=min(n, 10)),
+            Scenario("POST /api/test-connectivity", lambda i: api.call("POST", "/api/test-connectivity", {"host": "127.0.0.1", "ports": [self.sshd.port]})[0]),
+            Scenario("GET /api/fleet", fleet("GET", "/api/fleet")),
+            Scenario("POST /api/fleet/run status", fleet("POST", "/api/fleet/run", {"action": "status"})),
+            Scenario("POST /api/fleet/run cron", fleet("POST", "/api/fleet/run", {"action": "cron"})),
+            Scenario("WS /ws/chat connect + first turn", chat_connect, iterations=min(n, 5)),
+            Scenario("WS /ws/chat turn", chat_turn),
+        ], state
+
+    def run(self, only: re.Pattern[str] | None = None, progress: Callable[[Result], None] | None = None) -> list[Result]:
+        self.api.token = self.api.json("POST", "/api/auth/login", self.login)["access_token"]
+        scenarios, state = self.scenarios()
+        results = []
+        try:
+            for scenario in scenarios:
+                if only is not None and not only.search(scenario.name):
+                    continue
+                result = self.measure(scenario)
+                results.append(result)
+                if progress is not None:
+                    progress(result)
+        finally:
+            if state.get("ws") is not None:
+                state["ws"].close()
+            self.api.call("POST", "/api/auth/logout")
+        return results
@@ -0,0 +1,273 @@
+"""In-process SSH server standing in for a nanobot host, counting what crosses the wire."""
+
+from __future__ import annotations
+
+import os
+import socket
+import subprocess
+import threading
+from pathlib import Path
+from typing import Any
+
+import paramiko
+
+# Remote scripts hard-code the log the backend starts nanobot with
+_REMOTE_LOG = "/tmp/nanobot.log"
+
+
+class WireStats:
+    """Counters shared by every connection, read and reset around each benchmark."""
+
+    FIELDS = ("connections", "channels", "commands", "sftp_ops", "bytes_in", "bytes_out")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.FIELDS, 0)
+
+    def add(self, **counts: int) -> None:
+        with self._lock:
+            for name, n in counts.items():
+                self._counts[name] += n
+
+    def take(self) -> dict[str, int]:
+        """Counts since the last call; resets them."""
+        with self._lock:
+            counts, self._counts = self._counts, dict.fromkeys(self.FIELDS, 0)
+        return counts
+
+
+class _CountingSocket:
+    def __init__(self, sock: socket.socket, stats: WireStats):
+        self._sock = sock
+        self._stats = stats
+
+    def recv(self, size: int) -> bytes:
+        data = self._sock.recv(size)
+        self._stats.add(bytes_in=len(data))
+        return data
+
+    def send(self, data: bytes) -> int:
+        sent = self._sock.send(data)
+        self._stats.add(bytes_out=sent)
+        return sent
+
+    def sendall(self, data: bytes) -> None:
+        self._sock.sendall(data)
+        self._stats.add(bytes_out=len(data))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._sock, name)
+
+
+class _Server(paramiko.ServerInterface):
+    def __init__(self, host: BenchSSHServer):
+        self.host = host
+
+    def get_allowed_auths(self, username: str) -> str:
+        return "password"
+
+    def check_auth_password(self, username: str, password: str) -> int:
+        return paramiko.AUTH_SUCCESSFUL if password == self.host.password else paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind: str, chanid: int) -> int:
+        if kind != "session":
+            return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+        self.host.stats.add(channels=1)
+        return paramiko.OPEN_SUCCEEDED
+
+    def check_channel_exec_request(self, channel: paramiko.Channel, command: bytes) -> bool:
+        self.host.stats.add(commands=1)
+        threading.Thread(target=self.host.run_command, args=(channel, command.decode()), daemon=True).start()
+        return True
+
+    def check_global_request(self, kind: str, msg: paramiko.Message) -> bool:
+        return False
+
+
+class _SFTPServer(paramiko.SFTPServer):
+    def _process(self, t: int, request_number: int, msg: paramiko.Message) -> None:
+        self.server.host.stats.add(sftp_ops=1)
+        super()._process(t, request_number, msg)
+
+
+class _Handle(paramiko.SFTPHandle):
+    def stat(self) -> paramiko.SFTPAttributes | int:
+        return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+
+    def chattr(self, attr: paramiko.SFTPAttributes) -> int:
+        if attr.st_mode is not None:
+            os.fchmod(self.readfile.fileno(), attr.st_mode & 0o7777)
+        return paramiko.SFTP_OK
+
+
+class _SFTP(paramiko.SFTPServerInterface):
+    """Plain filesystem access, relative paths resolved against the fake home."""
+
+    def __init__(self, server: _Server, *args: Any, **kwargs: Any):
+        super().__init__(server, *args, **kwargs)
+        self.host = server.host
+        self.home = server.host.home
+
+    def _path(self, path: str) -> str:
+        return path if path.startswith("/") else os.path.join(self.home, path)
+
+    @staticmethod
+    def _call(fn, *args) -> int:
+        try:
+            fn(*args)
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        return paramiko.SFTP_OK
+
+    def canonicalize(self, path: str) -> str:
+        return os.path.normpath(self._path(path))
+
+    def stat(self, path: str) -> paramiko.SFTPAttributes | int:
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.stat(self._path(path)))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    lstat = stat
+
+    def list_folder(self, path: str) -> list[paramiko.SFTPAttributes] | int:
+        try:
+            with os.scandir(self._path(path)) as entries:
+                return [paramiko.SFTPAttributes.from_stat(e.stat(), e.name) for e in entries]
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    def open(self, path: str, flags: int, attr: paramiko.SFTPAttributes) -> _Handle | int:
+        try:
+            fd = os.open(self._path(path), flags, 0o666)
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        if flags & os.O_WRONLY:
+            mode = "ab" if flags & os.O_APPEND else "wb"
+        elif flags & os.O_RDWR:
+            mode = "r+b"
+        else:
+            mode = "rb"
+        handle = _Handle(flags)
+        handle.readfile = handle.writefile = os.fdopen(fd, mode)
+        return handle
+
+    def remove(self, path: str) -> int:
+        return self._call(os.remove, self._path(path))
+
+    def rename(self, oldpath: str, newpath: str) -> int:
+        return self._call(os.rename, self._path(oldpath), self._path(newpath))
+
+    posix_rename = rename
+
+    def mkdir(self, path: str, attr: paramiko.SFTPAttributes) -> int:
+        return self._call(os.mkdir, self._path(path))
+
+    def chattr(self, path: str, attr: paramiko.SFTPAttributes) -> int:
+        if attr.st_mode is None:
+            return paramiko.SFTP_OK
+        return self._call(os.chmod, self._path(path), attr.st_mode & 0o7777)
+
+
+class BenchSSHServer:
+    """Password-authenticated sshd on 127.0.0.1 running commands in a fake home.
+
+    Commands run through ``bash -c`` on this machine with ``HOME`` set to the
+    fixture and its ``bin/`` first on ``PATH``; SFTP serves the real
+    filesystem. ``stats`` counts connections, channels, commands, SFTP
+    requests and bytes for every client.
+    """
+
+    def __init__(self, home: Path, password: str = "bench"):
+        self.home = str(home)
+        self.password = password
+        self.stats = WireStats()
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self._listener: socket.socket | None = None
+        self._transports: list[paramiko.Transport] = []
+        self._env = dict(os.environ, HOME=self.home, PATH=f"{self.home}/bin:{os.environ.get('PATH', '')}")
+
+    @property
+    def port(self) -> int:
+        return self._listener.getsockname()[1]
+
+    def start(self) -> None:
+        self._listener = socket.socket()
+        self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind(("127.0.0.1", 0))
+        self._listener.listen(64)
+        threading.Thread(target=self._accept_loop, name="bench-sshd", daemon=True).start()
+
+    def close(self) -> None:
+        if self._listener is not None:
+            self._listener.close()
+        for transport in self._transports:
+            transport.close()
+
+    def _accept_loop(self) -> None:
+        while True:
+            try:
+                sock, _ = self._listener.accept()
+            except OSError:
+                return
+            self.stats.add(connections=1)
+            # As OpenSSH does; otherwise small replies wait out delayed ACKs
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+
+    def _serve(self, sock: socket.socket) -> None:
+        transport = paramiko.Transport(_CountingSocket(sock, self.stats))
+        transport.add_server_key(self.host_key)
+        transport.set_subsystem_handler("sftp", _SFTPServer, _SFTP)
+        self._transports.append(transport)
+        try:
+            transport.start_server(server=_Server(self))
+        except (paramiko.SSHException, EOFError, OSError):
+            # Port probes connect and hang up without a handshake
+            transport.close()
+
+    def run_command(self, channel: paramiko.Channel, command: str) -> None:
+        command = command.replace(_REMOTE_LOG, f"{self.home}/nanobot.log")
+        proc = subprocess.Popen(
+            ["bash", "-c", command],
+            cwd=self.home,
+            env=self._env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+
+        def feed_stdin() -> None:
+            try:
+                while data := channel.recv(65536):
+                    proc.stdin.write(data)
+                    proc.stdin.flush()
+            except (OSError, EOFError):
+                pass
+            finally:
+                try:
+                    proc.stdin.close()
+                except OSError:
+                    pass
+
+        def relay_stderr() -> None:
+            for data in iter(lambda: proc.stderr.read1(65536), b""):
+                channel.sendall_stderr(data)
+
+        threading.Thread(target=feed_stdin, daemon=True).start()
+        stderr = threading.Thread(target=relay_stderr, daemon=True)
+        stderr.start()
+        try:
+            for data in iter(lambda: proc.stdout.read1(65536), b""):
+                channel.sendall(data)
+        except OSError:
+            proc.kill()  # client went away
+        stderr.join()
+        code = proc.wait()
+        if channel.closed:
+            return  # the client already closed it; a late status or close draws "Invalid channel number"
+        try:
+            channel.send_exit_status(128 - code if code < 0 else code)
+            channel.close()
+        except OSError:
+            pass
@@ -5,19 +5,333 @@ from __future__ import annotations
 import asyncio
 import json
 import uuid
+from collections import deque
+from collections.abc import AsyncIterator
+from typing import Any
 
 from fastapi import WebSocket, WebSocketDisconnect
 from loguru import logger
 
-from auth import UserSession, decode_token
-from ssh_manager import SSHManager
+from auth import UserSession, session_from_token
+from config import settings
+from remote_scripts import AGENT_SCRIPT
+from ssh_engines import RemoteProcess
+from ssh_manager import NANOBOT_PYTHON, SSHManager
+
+# Deltas queued behind a slow socket are sent as one frame, up to this many characters
+_MAX_MERGED_DELTA = 65536
+# Agent events buffered per request before reading from the agent pauses
+_STREAM_BUFFER = 16
+
+
+class AgentProcess:
+    """A long-lived nanobot agent on the remote host, one per chat connection.
+
+    Starting nanobot (interpreter, imports, provider setup) costs seconds, so
+    the agent is started once and fed messages as JSON lines on its stdin;
+    the conversation stays in the remote process between turns. Several
+    requests can be in flight; their events are routed back by request id.
+    If the process dies it is restarted on the next message.
+    """
+
+    def __init__(self, ssh: SSHManager, session_key: str):
+        self.ssh = ssh
+        self.session_key = session_key
+        self.mode: str | None = None  # "agent" (in-process) or "cli" (fallback)
+        self._proc: RemoteProcess | None = None
+        self._starting: asyncio.Task | None = None
+        self._reader: asyncio.Task | None = None
+        self._drain: asyncio.Task | None = None
+        self._stderr: deque[str] = deque(maxlen=20)
+        self._streams: dict[str, asyncio.Queue[dict[str, Any] | Exception]] = {}
+
+    def warm_up(self) -> None:
+        """Start the agent in the background so the first message doesn't wait for it."""
+        if self._proc is None and self._starting is None:
+            self._starting = asyncio.create_task(self._start())
+
+    async def _start(self) -> None:
+        proc = await self.ssh.start_script(
+            AGENT_SCRIPT, self.session_key, str(settings.chat_turn_timeout), python=NANOBOT_PYTHON
+        )
+        self._proc = proc
+        self._drain = asyncio.create_task(self._drain_stderr(proc))
+        try:
+            ready = await asyncio.wait_for(self._read_event(proc), settings.chat_agent_start_timeout)
+        except BaseException:
+            self.close()
+            raise
+        self.mode = ready.get("mode")
+        if ready.get("reason"):
+            logger.info("nanobot agent on {} runs per message: {}", self.ssh.session.host, ready["reason"])
+        self._reader = asyncio.create_task(self._dispatch(proc))
+
+    async def _drain_stderr(self, proc: RemoteProcess) -> None:
+        while line := await proc.read_stderr():
+            self._stderr.append(line.rstrip())
+
+    async def _read_event(self, proc: RemoteProcess) -> dict[str, Any]:
+        while True:
+            line = await proc.readline()
+            if not line:
+                detail = "\n".join(self._stderr) or f"exit status {proc.exit_status}"
+                raise ConnectionError(f"nanobot agent exited: {detail}")
+            try:
+                return json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning("Unexpected agent output on {}: {}", self.ssh.session.host, line.rstrip())
+
+    async def _dispatch(self, proc: RemoteProcess) -> None:
+        """Route the agent's events to the requests waiting for them."""
+        try:
+            while True:
+                event = await self._read_event(proc)
+                queue = self._streams.get(event.get("id"))
+                if queue is not None:
+                    # Bounded: a slow consumer holds back the channel rather than growing memory
+                    await queue.put(event)
+        except ConnectionError as e:
+            if self._proc is proc:
+                self._fail_streams(e)
+
+    def _fail_streams(self, error: Exception) -> None:
+        for queue in self._streams.values():
+            while queue.full():
+                queue.get_nowait()
+            queue.put_nowait(error)
+
+    async def stream(self, request_id: str, message: str) -> AsyncIterator[dict[str, Any]]:
+        """Send one message and yield the agent's events as they arrive.
+
+        Events are ``delta`` (response text), ``progress`` (intermediate
+        status) and a final ``done`` carrying the exit code and stderr
+        (flagged ``cancelled`` if the request was cancelled).
+        """
+        if self._proc is not None and self._proc.exit_status is not None and not self._streams:
+            self.close()  # exited since the last turn
+        if self._proc is None:
+            self.warm_up()
+            starting = self._starting
+            try:
+                await starting
+            finally:
+                if self._starting is starting:
+                    self._starting = None
+
+        queue: asyncio.Queue[dict[str, Any] | Exception] = asyncio.Queue(maxsize=_STREAM_BUFFER)
+        self._streams[request_id] = queue
+        try:
+            await self._proc.write(json.dumps({"id": request_id, "message": message}) + "\n")
+            while True:
+                # The agent enforces the turn timeout itself; this only catches a hung process
+                event = await asyncio.wait_for(queue.get(), settings.chat_turn_timeout + 10)
+                if isinstance(event, Exception):
+                    raise event
+                yield event
+                if event.get("type") == "done":
+                    return
+        except (ConnectionError, TimeoutError):
+            self.close()
+            raise
+        finally:
+            self._streams.pop(request_id, None)
+
+    async def cancel(self, request_id: str) -> bool:
+        """Ask the agent to stop a request; stop the whole process if it doesn't comply.
+
+        Returns False if the request hasn't reached the agent yet.
+        """
+        proc = self._proc
+        if request_id not in self._streams or proc is None:
+            return False
+        try:
+            await proc.write(json.dumps({"cancel": request_id}) + "\n")
+        except ConnectionError:
+            pass
+
+        def force_stop() -> None:
+            if request_id in self._streams and self._proc is proc:
+                logger.warning("nanobot agent on {} ignored cancel; stopping it", self.ssh.session.host)
+                self.close()
+
+        asyncio.get_running_loop().call_later(settings.chat_cancel_grace, force_stop)
+        return True
+
+    def close(self) -> None:
+        """Stop the remote agent; closing its stdin makes it exit."""
+        if self._starting is not None and self._starting is not asyncio.current_task():
+            if self._starting.done() and not self._starting.cancelled():
+                self._starting.exception()  # failed warm-up nobody waited for
+            self._starting.cancel()
+            self._starting = None
+        for task in (self._reader, self._drain):
+            if task is not None:
+                task.cancel()
+        self._reader = self._drain = None
+        if self._proc is not None:
+            self._proc.close()
+            self._proc = None
+        self._fail_streams(ConnectionError("nanobot agent stopped"))
+
+
+class ChatConnection:
+    """One chat WebSocket: its agent, in-flight messages and outgoing frames.
+
+    Every message gets an id (the client's, or a generated one) that tags
+    each frame of its reply. Up to ``chat_max_concurrent`` run at once;
+    later ones wait their turn. Either kind can be cancelled.
+    """
+
+    def __init__(self, ws: WebSocket, session: UserSession, conn_id: str):
+        self.ws = ws
+        self.session = session
+        self.conn_id = conn_id
+        self.ssh = SSHManager(session, long_lived=True)
+        self.agent = AgentProcess(self.ssh, session_key=f"web:{conn_id}")
+        # Bounded, so a slow browser stalls reading from the agent instead of piling up frames
+        self.outbox: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=settings.chat_send_buffer)
+        self._slots = asyncio.Semaphore(settings.chat_max_concurrent)
+        self._runs: dict[str, asyncio.Task] = {}
+        self._cancelled: set[str] = set()
+
+    async def run(self) -> None:
+        sender = asyncio.create_task(self._send_loop())
+        try:
+            await self.ws.send_json({"type": "connected", "message": "Connected to nanobot chat"})
+            self.agent.warm_up()
+
+            while True:
+                data = json.loads(await self.ws.receive_text())
+                if data.get("type") == "cancel":
+                    await self._cancel(str(data.get("id", "")))
+                    continue
+
+                user_msg = data.get("message", "").strip()
+                if not user_msg:
+                    continue
+                msg_id = str(data.get("id") or uuid.uuid4().hex[:8])
+                if msg_id in self._runs:
+                    await self.outbox.put({"type": "error", "id": msg_id, "message": "Duplicate message id"})
+                    continue
+                if len(self._runs) >= settings.chat_max_queued:
+                    await self.outbox.put({"type": "error", "id": msg_id, "message": "Too many messages in flight"})
+                    continue
+
+                # The slots are handed out in arrival order, so this is its place in line
+                position = len(self._runs) + 1 - settings.chat_max_concurrent
+                task = asyncio.create_task(self._handle(msg_id, user_msg, position))
+                self._runs[msg_id] = task
+                task.add_done_callback(lambda _, msg_id=msg_id: self._forget(msg_id))
+        finally:
+            # Disconnected or failed: nothing should keep running on the host for this socket
+            for task in list(self._runs.values()):
+                task.cancel()
+            sender.cancel()
+            self.agent.close()
+            self.ssh.close()
+
+    async def end(self) -> None:
+        """Disconnect because the login's session ended."""
+        # Don't wait for the browser to acknowledge the close before stopping the agent
+        self.agent.close()
+        self.ssh.close()
+        try:
+            await self.ws.send_json({"type": "error", "message": "Session ended; log in again"})
+            await self.ws.close()
+        except Exception:
+            pass
+
+    def _forget(self, msg_id: str) -> None:
+        self._runs.pop(msg_id, None)
+        self._cancelled.discard(msg_id)
+
+    async def _handle(self, msg_id: str, message: str, position: int) -> None:
+        if position > 0:
+            await self.outbox.put({"type": "queued", "id": msg_id, "position": position})
+        async with self._slots:
+            await self.outbox.put({"type": "thinking", "id": msg_id, "message": "Processing..."})
+            await self._relay(msg_id, message)
+
+    async def _cancel(self, msg_id: str) -> None:
+        task = self._runs.get(msg_id)
+        if task is None:
+            return
+        self._cancelled.add(msg_id)
+        # Once the agent has it, the reply ends with a cancelled event
+        if not await self.agent.cancel(msg_id):
+            task.cancel()
+            await self.outbox.put({"type": "cancelled", "id": msg_id})
+
+    async def _relay(self, msg_id: str, message: str) -> None:
+        """Forward one agent turn to the socket as delta frames and a final done frame."""
+        answered = False
+        try:
+            async for event in self.agent.stream(msg_id, message):
+                if event["type"] == "delta":
+                    answered = answered or bool(event["content"].strip())
+                    await self.outbox.put({"type": "delta", "id": msg_id, "message": event["content"]})
+                elif event["type"] == "progress":
+                    await self.outbox.put({"type": "progress", "id": msg_id, "message": event["content"]})
+                elif event["type"] == "done" and event.get("cancelled"):
+                    await self.outbox.put({"type": "cancelled", "id": msg_id})
+                elif event["type"] == "done":
+                    if not answered:
+                        text = _format_reply("", event["stderr"], event["code"])
+                        await self.outbox.put({"type": "delta", "id": msg_id, "message": text})
+                    await self.outbox.put({"type": "done", "id": msg_id, "code": event["code"]})
+        except Exception as e:
+            if msg_id in self._cancelled:
+                # The agent was stopped to honour the cancel
+                await self.outbox.put({"type": "cancelled", "id": msg_id})
+                return
+            # The agent is restarted on the next message
+            logger.warning("nanobot agent failed on {}: {}", self.ssh.session.host, e)
+            await self.outbox.put({"type": "error", "id": msg_id, "message": str(e) or "nanobot agent timed out"})
+
+    async def _send_loop(self) -> None:
+        """Write queued frames to the socket, merging deltas that piled up meanwhile."""
+        pending: dict[str, Any] | None = None
+        closed = False
+        while True:
+            frame = pending or await self.outbox.get()
+            pending = None
+            while frame["type"] == "delta" and len(frame["message"]) < _MAX_MERGED_DELTA:
+                try:
+                    following = self.outbox.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if following["type"] == "delta" and following.get("id") == frame.get("id"):
+                    frame = {**frame, "message": frame["message"] + following["message"]}
+                else:
+                    pending = following
+                    break
+            if closed:
+                continue  # keep draining so producers never block on a dead socket
+            try:
+                await self.ws.send_json(frame)
+            except Exception:
+                closed = True
+
+
+def _format_reply(stdout: str, stderr: str, code: int) -> str:
+    """Turn the agent's output into the message shown in the chat."""
+    response = stdout.strip()
+    if not response:
+        if code != 0:
+            if "No API key configured" in stderr:
+                return "Error: No API key configured. Please go to Settings/Config to add your provider API keys."
+            return f"Error ({code}): {stderr.strip() or 'Unknown error'}"
+        else:
+            response = stderr.strip() if stderr.strip() else "No response from nanobot."
+    return response
 
 
 class ChatManager:
     """Manages WebSocket chat sessions with nanobot."""
 
     def __init__(self):
-        self._connections: dict[str, WebSocket] = {}
+        self._connections: dict[str, ChatConnection] = {}
+        self._ending: set[asyncio.Task] = set()
 
     async def handle(self, ws: WebSocket) -> None:
         """Handle an incoming WebSocket connection for chat."""
@@ -25,44 +339,19 @@ class ChatManager:
         conn_id = str(uuid.uuid4())[:8]
 
         try:
-            # First message must be the JWT token
+            # First message must be the login token
             auth_msg = await ws.receive_text()
             auth_data = json.loads(auth_msg)
-            token = auth_data.get("token", "")
-            payload = decode_token(token)
-            session = UserSession(
-                host=payload["host"],
-                port=payload["port"],
-                username=payload["username"],
-                password=payload["password"],
-            )
-        except Exception as e:
+            session = session_from_token(auth_data.get("token", ""))
+        except Exception:
             await ws.send_json({"type": "error", "message": "Authentication failed"})
             await ws.close()
             return
 
-        self._connections[conn_id] = ws
-        ssh = SSHManager(session)
-
+        conn = ChatConnection(ws, session, conn_id)
+        self._connections[conn_id] = conn
         try:
-            await ws.send_json({"type": "connected", "message": "Connected to nanobot chat"})
-
-            while True:
-                raw = await ws.receive_text()
-                data = json.loads(raw)
-                user_msg = data.get("message", "").strip()
-                if not user_msg:
-                    continue
-
-                await ws.send_json({"type": "thinking", "message": "Processing..."})
-
-                # Execute the message via nanobot CLI on the remote server
-                response = await asyncio.get_event_loop().run_in_executor(
-                    None, self._send_to_nanobot, ssh, user_msg
-                )
-
-                await ws.send_json({"type": "response", "message": response})
-
+            await conn.run()
         except WebSocketDisconnect:
             logger.info("Chat WebSocket disconnected: {}", conn_id)
         except Exception as e:
@@ -73,32 +362,21 @@ class ChatManager:
                 pass
         finally:
             self._connections.pop(conn_id, None)
-            ssh.close()
-
-    @staticmethod
-    def _send_to_nanobot(ssh: SSHManager, message: str) -> str:
-        """Send a message to nanobot via the CLI and capture the response."""
-        # Escape the message for shell
-        escaped = message.replace("'", "'\\''")
-
-        # Determine the correct command to use.
-        # Since SSHManager.exec_command now includes standard PATHs, we try standard commands.
-        full_cmd = (
-            f"timeout 120 nanobot agent --message '{escaped}' 2>/dev/null || "
-            f"timeout 120 python3 -m nanobot agent --message '{escaped}' 2>/dev/null"
-        )
 
-        stdout, stderr, code = ssh.exec_command(full_cmd, timeout=130)
-        
-        response = stdout.strip()
-        if not response:
-            if code != 0:
-                if "No API key configured" in stderr:
-                    return "Error: No API key configured. Please go to Settings/Config to add your provider API keys."
-                return f"Error ({code}): {stderr.strip() or 'Unknown error'}"
-            else:
-                response = stderr.strip() if stderr.strip() else "No response from nanobot."
-        return response
+    def release(self, session: UserSession) -> None:
+        """Disconnect the chats of a login whose last session ended."""
+        for conn in self._connections.values():
+            if conn.session == session:
+                task = asyncio.create_task(conn.end())
+                self._ending.add(task)
+                task.add_done_callback(self._ending.discard)
+
+    def stats(self) -> dict[str, int]:
+        """Open chat sockets and the messages they have in flight."""
+        return {
+            "connections": len(self._connections),
+            "messages": sum(len(conn._runs) for conn in self._connections.values()),
+        }
 
 
 chat_manager = ChatManager()
@@ -6,9 +6,11 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     """Application settings loaded from environment."""
 
-    secret_key: str = "nanobot-web-change-me-in-production"
-    algorithm: str = "HS256"
     access_token_expire_minutes: int = 720  # 12 hours
+    session_max: int = 1000  # live logins kept; least recently used dropped beyond this
+
+    # Bearer token for scraping /metrics; empty accepts login tokens only
+    metrics_token: str = ""
 
     # Default SSH connection (overridable via env)
     default_ssh_host: str = ""
@@ -16,10 +18,75 @@ class Settings(BaseSettings):
     default_ssh_user: str = "root"
     default_ssh_password: str = ""
 
+    # SSH client: "asyncssh" (native asyncio) or "paramiko" (blocking, run in threads)
+    ssh_engine: str = "asyncssh"
+
+    # Shared SSH connection pool
+    ssh_pool_max_per_host: int = 4  # paramiko opens chat, log tail and cron run channels on connections of their own
+    ssh_pool_idle_timeout: int = 300  # seconds before an idle connection is closed
+    ssh_pool_acquire_timeout: int = 30  # seconds to wait for a free slot
+    ssh_pool_max_sessions: int = 8  # concurrent channels per connection (asyncssh)
+    ssh_keepalive_interval: int = 30  # transport keepalive packets, seconds
+    ssh_health_interval: int = 30  # background probe of idle connections, seconds
+
+    # Port scan behind test-connectivity / find_ssh_port
+    port_scan_ports: list[int] = [22, 2222, 222, 22022, 8022, 1022, 22222, 21098, 2288]
+    port_scan_timeout: float = 5  # seconds for a whole scan, however many ports
+    port_scan_cache_ttl: int = 60  # seconds a host's results are reused
+
+    # Host facts (OS, Python version) cached by the status collector, seconds
+    status_static_ttl: int = 3600
+
+    # SQLite file for host facts kept across restarts (builtin skills); empty keeps them in memory
+    local_store_path: str = "~/.nanobot-web/state.db"
+
     # Nanobot paths on remote server
     nanobot_config_path: str = "~/.nanobot/config.json"
     nanobot_workspace_path: str = "~/.nanobot/workspace"
 
+    # Largest chunk of a memory file returned by a single read
+    memory_max_read_bytes: int = 1_048_576
+
+    # Workspace search index
+    search_refresh_interval: int = 60  # seconds before a query triggers a background re-sync
+    search_max_file_bytes: int = 1_048_576  # larger files are indexed up to this point
+
+    # Chat: one long-lived nanobot agent process per WebSocket
+    chat_turn_timeout: int = 120  # seconds for the agent to answer one message
+    chat_agent_start_timeout: int = 60  # seconds for the agent process to come up
+    chat_send_buffer: int = 64  # frames queued per socket before reading from the agent pauses
+    chat_max_concurrent: int = 1  # messages answered at once per socket; the rest wait
+    chat_max_queued: int = 8  # messages in flight (running + waiting) per socket
+    chat_cancel_grace: int = 5  # seconds a cancelled run gets before the agent is stopped
+
+    # Manual cron runs: started in the background, output streamed to watchers
+    cron_run_timeout: int = 1800  # seconds a run is followed before it is reported as timed out
+    cron_max_running: int = 4  # runs in progress at once per host
+    cron_run_history: int = 20  # finished runs kept per host
+    cron_run_output_lines: int = 2000  # output lines kept per run
+
+    # Dashboard: one background poller per host, shared by every viewer
+    dashboard_poll_interval: int = 10  # seconds between refreshes while someone is watching
+    dashboard_idle_timeout: int = 60  # seconds after the last read before polling stops
+
+    # Resource history sampled per host in the background
+    metrics_sample_interval: int = 15  # seconds between samples
+    metrics_raw_samples: int = 5760  # raw samples kept (a day at 15s)
+    metrics_rollup_seconds: int = 300  # period folded into one min/max/avg rollup
+    metrics_rollup_samples: int = 8640  # rollups kept (30 days at 5 minutes)
+
+    # Live logs: one remote tail per host, shared by every viewer
+    logs_buffer_lines: int = 1000  # recent lines kept per host and sent to new viewers
+    logs_viewer_buffer: int = 2000  # lines a viewer may fall behind before it is dropped
+    logs_idle_timeout: int = 30  # seconds the tail outlives its last viewer
+    logs_restart_delay: int = 5  # seconds before restarting a tail that exited
+    logs_max_read_bytes: int = 1_048_576  # largest batch of lines one /api/logs call returns
+
+    # Fleet mode: one login fanning actions out to many hosts
+    fleet_max_hosts: int = 100  # hosts per fleet, the login's own included
+    fleet_concurrency: int = 16  # hosts worked on at once by one fan-out
+    fleet_host_timeout: int = 60  # seconds each host gets before it is reported as failed
+
     class Config:
         env_prefix = "NANOBOT_WEB_"
 
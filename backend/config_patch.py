@@ -0,0 +1,138 @@
+"""JSON Merge Patch (RFC 7396) and JSON Patch (RFC 6902) for nanobot config."""
+
+from __future__ import annotations
+
+import copy
+from typing import Any
+
+
+class PatchError(ValueError):
+    """A patch document is malformed or cannot be applied."""
+
+
+def apply_merge_patch(target: Any, patch: Any) -> Any:
+    """Apply a JSON Merge Patch: objects merge recursively, null deletes a key."""
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
+
+
+def _parse_pointer(pointer: str) -> list[str]:
+    if pointer == "":
+        return []
+    if not pointer.startswith("/"):
+        raise PatchError(f"Invalid JSON pointer '{pointer}'")
+    return [t.replace("~1", "/").replace("~0", "~") for t in pointer[1:].split("/")]
+
+
+def _array_index(container: list, token: str, allow_end: bool) -> int:
+    if token == "-" and allow_end:
+        return len(container)
+    if not token.isdigit() or (token != "0" and token.startswith("0")):
+        raise PatchError(f"Invalid array index '{token}'")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f"Array index {index} out of range")
+    return index
+
+
+def _resolve_parent(doc: Any, tokens: list[str]) -> Any:
+    node = doc
+    for token in tokens[:-1]:
+        if isinstance(node, dict):
+            if token not in node:
+                raise PatchError(f"Path segment '{token}' not found")
+            node = node[token]
+        elif isinstance(node, list):
+            node = node[_array_index(node, token, allow_end=False)]
+        else:
+            raise PatchError(f"Cannot traverse into scalar at '{token}'")
+    return node
+
+
+def _get(doc: Any, tokens: list[str]) -> Any:
+    if not tokens:
+        return doc
+    parent = _resolve_parent(doc, tokens)
+    last = tokens[-1]
+    if isinstance(parent, dict):
+        if last not in parent:
+            raise PatchError(f"Path segment '{last}' not found")
+        return parent[last]
+    if isinstance(parent, list):
+        return parent[_array_index(parent, last, allow_end=False)]
+    raise PatchError(f"Cannot index scalar with '{last}'")
+
+
+def _add(doc: Any, tokens: list[str], value: Any) -> Any:
+    if not tokens:
+        return value
+    parent = _resolve_parent(doc, tokens)
+    last = tokens[-1]
+    if isinstance(parent, dict):
+        parent[last] = value
+    elif isinstance(parent, list):
+        parent.insert(_array_index(parent, last, allow_end=True), value)
+    else:
+        raise PatchError(f"Cannot add to scalar at '{last}'")
+    return doc
+
+
+def _remove(doc: Any, tokens: list[str]) -> Any:
+    if not tokens:
+        raise PatchError("Cannot remove the whole document")
+    parent = _resolve_parent(doc, tokens)
+    last = tokens[-1]
+    if isinstance(parent, dict):
+        if last not in parent:
+            raise PatchError(f"Path segment '{last}' not found")
+        del parent[last]
+    elif isinstance(parent, list):
+        del parent[_array_index(parent, last, allow_end=False)]
+    else:
+        raise PatchError(f"Cannot remove from scalar at '{last}'")
+    return doc
+
+
+def apply_json_patch(doc: Any, operations: list[dict[str, Any]]) -> Any:
+    """Apply a JSON Patch to a copy of ``doc``; all operations succeed or none do."""
+    if not isinstance(operations, list):
+        raise PatchError("JSON Patch must be an array of operations")
+    doc = copy.deepcopy(doc)
+    for op in operations:
+        if not isinstance(op, dict) or "op" not in op or "path" not in op:
+            raise PatchError("Each operation needs 'op' and 'path'")
+        kind = op["op"]
+        path = _parse_pointer(op["path"])
+        if kind in ("add", "replace", "test") and "value" not in op:
+            raise PatchError(f"'{kind}' operation needs a 'value'")
+
+        if kind == "add":
+            doc = _add(doc, path, copy.deepcopy(op["value"]))
+        elif kind == "remove":
+            doc = _remove(doc, path)
+        elif kind == "replace":
+            _get(doc, path)
+            doc = _add(_remove(doc, path) if path else doc, path, copy.deepcopy(op["value"]))
+        elif kind in ("move", "copy"):
+            if "from" not in op:
+                raise PatchError(f"'{kind}' operation needs 'from'")
+            source = _parse_pointer(op["from"])
+            if kind == "move" and path[: len(source)] == source and path != source:
+                raise PatchError("Cannot move a value into one of its children")
+            value = copy.deepcopy(_get(doc, source))
+            if kind == "move":
+                doc = _remove(doc, source)
+            doc = _add(doc, path, value)
+        elif kind == "test":
+            if _get(doc, path) != op["value"]:
+                raise PatchError(f"Test failed at '{op['path']}'")
+        else:
+            raise PatchError(f"Unknown operation '{kind}'")
+    return doc
@@ -0,0 +1,225 @@
+"""Manual cron job runs — executed in the background, output streamed to watchers."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+import uuid
+from collections import deque
+from typing import Any
+
+from fastapi import WebSocket, WebSocketDisconnect
+from loguru import logger
+
+from auth import UserSession, session_from_token
+from config import settings
+from ssh_manager import SSHManager
+from ssh_pool import PoolKey, pool_key, secret_digest
+
+# Most output lines sent to a watcher in one frame
+_MAX_BATCH = 500
+
+
+class CronRun:
+    """One manual run of a cron job: its state, recent output and live watchers."""
+
+    def __init__(self, owner: PoolKey, secret: str, job_id: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.owner = owner
+        self.secret = secret  # digest of the password the run was started with
+        self.job_id = job_id
+        self.status = "running"  # then "ok", "error" or "timeout"
+        self.exit_status: int | None = None
+        self.error: str | None = None
+        self.started_at = time.time()
+        self.finished_at: float | None = None
+        self.output: deque[dict[str, str]] = deque(maxlen=settings.cron_run_output_lines)
+        self.watchers: set[asyncio.Queue[dict[str, str] | None]] = set()
+        self.task: asyncio.Task | None = None
+        self.stop_reason: str | None = None  # why following was cancelled
+
+    @property
+    def running(self) -> bool:
+        return self.finished_at is None
+
+    def as_dict(self, output: bool = False) -> dict[str, Any]:
+        data = {
+            "id": self.id,
+            "job_id": self.job_id,
+            "status": self.status,
+            "exit_status": self.exit_status,
+            "error": self.error,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration": (self.finished_at or time.time()) - self.started_at,
+        }
+        if output:
+            data["output"] = list(self.output)
+        return data
+
+    def publish(self, stream: str, line: str) -> None:
+        entry = {"stream": stream, "line": line}
+        self.output.append(entry)
+        for queue in list(self.watchers):
+            try:
+                queue.put_nowait(entry)
+            except asyncio.QueueFull:
+                # Too far behind; it can reload the run for the rest
+                self.watchers.discard(queue)
+                queue.get_nowait()
+                queue.put_nowait(None)
+
+    def finish(self, status: str, exit_status: int | None = None, error: str | None = None) -> None:
+        self.status, self.exit_status, self.error = status, exit_status, error
+        self.finished_at = time.time()
+        for queue in list(self.watchers):
+            # Watchers notice the end once their queue drains; wake idle ones
+            if queue.empty():
+                queue.put_nowait(None)
+
+
+class CronRunner:
+    """Starts manual cron runs on a background channel and keeps the recent ones per host.
+
+    ``start`` returns at once with a handle; the job's output is kept on the
+    run (the last ``cron_run_output_lines`` lines) and pushed to WebSocket
+    watchers. The last ``cron_run_history`` finished runs per host and login
+    are kept with their duration and exit status.
+    """
+
+    def __init__(self):
+        self._runs: dict[PoolKey, deque[CronRun]] = {}
+
+    def start(self, session: UserSession, job_id: str) -> CronRun:
+        """Start running a job; raises RuntimeError if the host has too many runs going."""
+        runs = self._runs.setdefault(pool_key(session), deque())
+        if sum(run.running for run in runs) >= settings.cron_max_running:
+            raise RuntimeError(f"{settings.cron_max_running} cron runs already in progress on this host")
+        run = CronRun(pool_key(session), secret_digest(session), job_id)
+        runs.appendleft(run)
+        finished = [r for r in runs if not r.running]
+        for old in finished[settings.cron_run_history:]:
+            runs.remove(old)
+        run.task = asyncio.create_task(self._execute(run, SSHManager(session, long_lived=True)))
+        return run
+
+    def runs(self, session: UserSession, job_id: str | None = None) -> list[CronRun]:
+        """Recent runs on the session's host, newest first."""
+        return [r for r in self._runs.get(pool_key(session), ()) if job_id is None or r.job_id == job_id]
+
+    def get(self, session: UserSession, run_id: str) -> CronRun | None:
+        return next((r for r in self._runs.get(pool_key(session), ()) if r.id == run_id), None)
+
+    def release(self, session: UserSession) -> None:
+        """Stop following the runs a login started; its last session ended.
+
+        The finished runs stay listed; they hold no credentials.
+        """
+        secret = secret_digest(session)
+        for run in self._runs.get(pool_key(session), ()):
+            if run.running and run.secret == secret and run.task is not None:
+                run.stop_reason = "Session ended; stopped following the run"
+                run.task.cancel()
+
+    def close(self) -> None:
+        """Stop following every run; called on shutdown."""
+        for runs in self._runs.values():
+            for run in runs:
+                if run.task is not None:
+                    run.task.cancel()
+        self._runs.clear()
+
+    async def _execute(self, run: CronRun, ssh: SSHManager) -> None:
+        host = ssh.session.host
+        proc = None
+        try:
+            proc = await ssh.start_cron_run(run.job_id)
+
+            async def pump(read, stream: str) -> None:
+                while line := await read():
+                    run.publish(stream, line.rstrip("\n"))
+
+            # Await the gather directly so a cancel mid-read never leaves its result unretrieved
+            async with asyncio.timeout(settings.cron_run_timeout):
+                await asyncio.gather(pump(proc.readline, "stdout"), pump(proc.read_stderr, "stderr"))
+            # The exit status can trail the end of output by a moment
+            for _ in range(50):
+                if proc.exit_status is not None:
+                    break
+                await asyncio.sleep(0.02)
+            code = proc.exit_status
+            run.finish("ok" if code == 0 else "error", code)
+        except TimeoutError:
+            run.finish("timeout", error=f"No result after {settings.cron_run_timeout}s; stopped following it")
+        except asyncio.CancelledError:
+            run.finish("error", error=run.stop_reason or "Backend shut down during the run")
+            raise
+        except Exception as e:
+            logger.warning("Cron run {} of {} on {} failed: {}", run.id, run.job_id, host, e)
+            run.finish("error", error=str(e) or type(e).__name__)
+        finally:
+            if proc is not None:
+                proc.close()
+            ssh.close()
+        logger.info("Cron run {} of {} on {}: {} in {:.1f}s", run.id, run.job_id, host, run.status, run.as_dict()["duration"])
+
+    async def handle(self, ws: WebSocket, run_id: str) -> None:
+        """Stream one run's output: the backlog, new lines as they come, then the result."""
+        await ws.accept()
+        try:
+            auth_data = json.loads(await ws.receive_text())
+            session = session_from_token(auth_data.get("token", ""))
+        except Exception:
+            await ws.send_json({"type": "error", "message": "Authentication failed"})
+            await ws.close()
+            return
+
+        run = self.get(session, run_id)
+        if run is None:
+            await ws.send_json({"type": "error", "message": "Run not found"})
+            await ws.close()
+            return
+
+        queue: asyncio.Queue[dict[str, str] | None] = asyncio.Queue(maxsize=settings.cron_run_output_lines)
+        backlog = list(run.output)
+        if run.running:
+            run.watchers.add(queue)
+        # Watchers don't send anything after auth; this only notices them leave
+        closed = asyncio.create_task(self._wait_closed(ws))
+        try:
+            await ws.send_json({"type": "output", "lines": backlog, "backfill": True})
+            while run.running or not queue.empty():
+                entry = asyncio.create_task(queue.get())
+                await asyncio.wait({entry, closed}, return_when=asyncio.FIRST_COMPLETED)
+                if not entry.done():
+                    entry.cancel()
+                    return
+                batch = [entry.result()]
+                while len(batch) < _MAX_BATCH and not queue.empty():
+                    batch.append(queue.get_nowait())
+                lines = [e for e in batch if e is not None]
+                if lines:
+                    await ws.send_json({"type": "output", "lines": lines})
+                if None in batch and run.running:
+                    await ws.send_json({"type": "error", "message": "Fell too far behind the output; reload the run"})
+                    await ws.close()
+                    return
+            await ws.send_json({"type": "done", "run": run.as_dict()})
+            await ws.close()
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            closed.cancel()
+            run.watchers.discard(queue)
+
+    @staticmethod
+    async def _wait_closed(ws: WebSocket) -> None:
+        try:
+            while True:
+                await ws.receive_text()
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+
+
+cron_runner = CronRunner()
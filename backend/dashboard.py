@@ -0,0 +1,256 @@
+"""Dashboard snapshots — one background poller per host, shared by every viewer."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from collections.abc import Callable
+from typing import Any
+
+from fastapi import WebSocket, WebSocketDisconnect
+from loguru import logger
+
+from auth import UserSession, session_from_token
+from config import settings
+from ssh_manager import SSHManager
+from ssh_pool import PoolKey, pool_key, secret_digest
+
+
+async def build_dashboard(ssh: SSHManager) -> dict[str, Any]:
+    """Collect the dashboard overview: status, config summary, channels, skills count."""
+    status_info = await ssh.get_nanobot_status()
+    config = await ssh.get_nanobot_config() or {}
+
+    channels_cfg = config.get("channels", {})
+    enabled_channels = [
+        ch for ch in channels_cfg
+        if isinstance(channels_cfg[ch], dict) and channels_cfg[ch].get("enabled")
+    ]
+
+    agents_cfg = config.get("agents", {})
+    defaults = agents_cfg.get("defaults", {})
+
+    providers_cfg = config.get("providers", {})
+    active_providers = [
+        p for p in providers_cfg
+        if isinstance(providers_cfg[p], dict) and providers_cfg[p].get("apiKey", providers_cfg[p].get("api_key", ""))
+    ]
+
+    tools_cfg = config.get("tools", {})
+    mcp_servers = list(tools_cfg.get("mcpServers", tools_cfg.get("mcp_servers", {})).keys())
+
+    return {
+        "status": status_info,
+        "config_summary": {
+            "model": defaults.get("model", "anthropic/claude-opus-4-5"),
+            "provider": defaults.get("provider", "auto"),
+            "max_tokens": defaults.get("maxTokens", defaults.get("max_tokens", 8192)),
+            "temperature": defaults.get("temperature", 0.1),
+            "workspace": defaults.get("workspace", "~/.nanobot/workspace"),
+        },
+        "channels": {
+            "enabled": enabled_channels,
+            "total": len([ch for ch in channels_cfg if isinstance(channels_cfg[ch], dict)]),
+        },
+        "providers": {
+            "active": active_providers,
+            "total": len([p for p in providers_cfg if isinstance(providers_cfg[p], dict)]),
+        },
+        "tools": {
+            "mcp_servers": mcp_servers,
+            "restrict_to_workspace": tools_cfg.get("restrictToWorkspace", tools_cfg.get("restrict_to_workspace", False)),
+        },
+    }
+
+
+class DashboardPoller:
+    """Refreshes one host's dashboard every ``dashboard_poll_interval`` seconds.
+
+    Readers are served the latest snapshot from memory; WebSocket viewers are
+    pushed each new one. Polling stops once there are no viewers and nobody
+    has read the snapshot for ``dashboard_idle_timeout`` seconds; ``on_idle``
+    is then called so the hub can drop the poller and its session.
+    """
+
+    def __init__(self, key: tuple[PoolKey, str], session: UserSession, on_idle: Callable[[DashboardPoller], None]):
+        self.key = key
+        self.ssh = SSHManager(session)
+        self._on_idle = on_idle
+        self.snapshot: dict[str, Any] | None = None
+        self.error: str | None = None
+        # None on a queue means the login's session ended
+        self.viewers: set[asyncio.Queue[dict[str, Any] | None]] = set()
+        self.last_read = time.monotonic()
+        self._polled = asyncio.Event()
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.ssh.close()
+
+    def end(self) -> None:
+        """Stop polling and disconnect the viewers; the login's session has ended."""
+        self.stop()
+        # Readers still waiting for a first poll get an error instead
+        self.snapshot, self.error = None, "Session ended"
+        self._polled.set()
+        for queue in self.viewers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+    def refresh(self) -> None:
+        """Poll now instead of at the next interval (e.g. after a restart)."""
+        self._wake.set()
+
+    async def read(self) -> dict[str, Any]:
+        """The latest snapshot, waiting for the first poll if there is none yet."""
+        self.last_read = time.monotonic()
+        self.start()
+        await self._polled.wait()
+        if self.snapshot is None:
+            raise RuntimeError(self.error or "Failed to load dashboard")
+        return self.snapshot
+
+    def frame(self) -> dict[str, Any]:
+        if self.snapshot is None:
+            return {"type": "error", "message": self.error or "Failed to load dashboard"}
+        return {"type": "snapshot", "data": self.snapshot}
+
+    async def _run(self) -> None:
+        host = self.ssh.session.host
+        while True:
+            try:
+                snapshot = await build_dashboard(self.ssh)
+                snapshot["updated_at"] = time.time()
+                self.snapshot, self.error = snapshot, None
+            except Exception as e:
+                # Keep serving the last good snapshot; viewers are told about the failure
+                logger.warning("Dashboard poll on {} failed: {}", host, e)
+                self.error = str(e) or type(e).__name__
+            finally:
+                # Hand the connection back between polls
+                self.ssh.close()
+            self._polled.set()
+            self._publish({"type": "error", "message": self.error} if self.error else self.frame())
+
+            if not self.viewers and time.monotonic() - self.last_read > settings.dashboard_idle_timeout:
+                # Whoever comes back later gets a new poller and waits for its first poll
+                self._on_idle(self)
+                return
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.dashboard_poll_interval)
+            except TimeoutError:
+                pass
+            self._wake.clear()
+
+    def _publish(self, frame: dict[str, Any]) -> None:
+        for queue in self.viewers:
+            # Viewers only need the newest snapshot; replace one they haven't sent yet
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(frame)
+
+
+class DashboardHub:
+    """Shares one ``DashboardPoller`` per host and login between REST readers and viewers."""
+
+    def __init__(self):
+        self._pollers: dict[tuple[PoolKey, str], DashboardPoller] = {}
+
+    def _poller_for(self, session: UserSession) -> DashboardPoller:
+        key = (pool_key(session), secret_digest(session))
+        poller = self._pollers.get(key)
+        if poller is None:
+            poller = self._pollers[key] = DashboardPoller(key, session, self._expire)
+        return poller
+
+    def _expire(self, poller: DashboardPoller) -> None:
+        if self._pollers.get(poller.key) is poller:
+            del self._pollers[poller.key]
+        poller.ssh.close()
+
+    async def snapshot(self, session: UserSession) -> dict[str, Any]:
+        """Dashboard for the session's host, from the shared poller."""
+        return await self._poller_for(session).read()
+
+    def refresh(self, session: UserSession) -> None:
+        """Make the host's poller (if any) poll again right away."""
+        poller = self._pollers.get((pool_key(session), secret_digest(session)))
+        if poller is not None:
+            poller.refresh()
+
+    def release(self, session: UserSession) -> None:
+        """Drop the poller of a login whose last session ended."""
+        poller = self._pollers.pop((pool_key(session), secret_digest(session)), None)
+        if poller is not None:
+            poller.end()
+
+    def close(self) -> None:
+        """Stop every poller; called on shutdown."""
+        for poller in self._pollers.values():
+            poller.stop()
+        self._pollers.clear()
+
+    async def handle(self, ws: WebSocket) -> None:
+        """Handle an incoming WebSocket connection for dashboard updates."""
+        await ws.accept()
+        try:
+            auth_data = json.loads(await ws.receive_text())
+            session = session_from_token(auth_data.get("token", ""))
+        except Exception:
+            await ws.send_json({"type": "error", "message": "Authentication failed"})
+            await ws.close()
+            return
+
+        poller = self._poller_for(session)
+        queue: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue(maxsize=1)
+        poller.viewers.add(queue)
+        poller.start()
+        if poller.snapshot is not None:
+            queue.put_nowait(poller.frame())
+        # Viewers may send {"type": "refresh"}; reading also notices them leave
+        receiver = asyncio.create_task(self._receive(ws, poller))
+        try:
+            while not receiver.done():
+                frame = asyncio.create_task(queue.get())
+                await asyncio.wait({frame, receiver}, return_when=asyncio.FIRST_COMPLETED)
+                if not frame.done():
+                    frame.cancel()
+                    break
+                if frame.result() is None:
+                    await ws.send_json({"type": "error", "message": "Session ended; log in again"})
+                    await ws.close()
+                    break
+                await ws.send_json(frame.result())
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            receiver.cancel()
+            poller.viewers.discard(queue)
+            poller.last_read = time.monotonic()
+
+    @staticmethod
+    async def _receive(ws: WebSocket, poller: DashboardPoller) -> None:
+        try:
+            while True:
+                data = json.loads(await ws.receive_text())
+                if data.get("type") == "refresh":
+                    poller.refresh()
+        except (WebSocketDisconnect, RuntimeError, ValueError):
+            pass
+
+
+dashboard_hub = DashboardHub()
@@ -0,0 +1,135 @@
+"""Fleet mode — one login managing many nanobot hosts, with bounded parallel fan-out."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+from typing import Any
+
+from auth import UserSession, session_store
+from config import settings
+from ssh_engines import ssh_engine
+from ssh_manager import SSHManager
+from ssh_pool import PoolKey, pool_key, secret_digest
+
+
+def member_id(session: UserSession) -> str:
+    return f"{session.username}@{session.host}:{session.port}"
+
+
+def describe_member(session: UserSession, owner: UserSession) -> dict[str, Any]:
+    return {
+        "id": member_id(session),
+        "host": session.host,
+        "port": session.port,
+        "username": session.username,
+        "self": session == owner,
+    }
+
+
+class FleetRegistry:
+    """The extra hosts each login has added, beside the one it logged in to.
+
+    Credentials stay in memory only, like the sessions themselves; a fleet is
+    dropped once no live session belongs to the login that built it. Idle
+    pooled connections to a dropped member are closed right away rather
+    than left to the reaper.
+    """
+
+    def __init__(self):
+        # login -> (owner session, {member id: session})
+        self._fleets: dict[tuple[PoolKey, str], tuple[UserSession, dict[str, UserSession]]] = {}
+        self._closing: set[asyncio.Task] = set()
+
+    def members(self, owner: UserSession) -> dict[str, UserSession]:
+        """Every host in the owner's fleet, the owner's own host first."""
+        self._prune()
+        added = self._fleets.get((pool_key(owner), secret_digest(owner)), (owner, {}))[1]
+        return {member_id(owner): owner, **added}
+
+    async def add(self, owner: UserSession, session: UserSession) -> str:
+        """Verify the credentials with an SSH handshake, then add the host."""
+        key = (pool_key(owner), secret_digest(owner))
+        _, added = self._fleets.get(key, (owner, {}))
+        mid = member_id(session)
+        if mid not in added and len(added) + 1 >= settings.fleet_max_hosts:
+            raise ValueError(f"A fleet holds at most {settings.fleet_max_hosts} hosts")
+        await ssh_engine.authenticate(session)
+        replaced = self._fleets.setdefault(key, (owner, {}))[1].get(mid)
+        self._fleets[key][1][mid] = session
+        if replaced is not None and replaced != session:
+            self._close_idle([replaced])
+        return mid
+
+    def remove(self, owner: UserSession, mid: str) -> bool:
+        fleet = self._fleets.get((pool_key(owner), secret_digest(owner)))
+        member = fleet[1].pop(mid, None) if fleet is not None else None
+        if member is None:
+            return False
+        self._close_idle([member])
+        return True
+
+    def forget(self, owner: UserSession) -> None:
+        fleet = self._fleets.pop((pool_key(owner), secret_digest(owner)), None)
+        if fleet is not None:
+            self._close_idle(fleet[1].values())
+
+    def _prune(self) -> None:
+        for key, (owner, added) in list(self._fleets.items()):
+            if not session_store.in_use(owner):
+                del self._fleets[key]
+                self._close_idle(added.values())
+
+    def _close_idle(self, members: Iterable[UserSession]) -> None:
+        """Close idle connections of dropped members no live login or other fleet still uses."""
+        held = [m for _, added in self._fleets.values() for m in added.values()]
+        for member in members:
+            if member in held or session_store.in_use(member):
+                continue
+            task = asyncio.create_task(ssh_engine.close_idle(member))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def fan_out(
+        targets: dict[str, UserSession],
+        action: Callable[[SSHManager], Awaitable[Any]],
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Run ``action`` against every target, yielding each host's result as it lands.
+
+        At most ``fleet_concurrency`` hosts are worked on at once, and each
+        gets ``fleet_host_timeout`` seconds; a slow or failing host only
+        costs its own entry. Abandoning the iterator cancels whatever is
+        still running.
+        """
+        limit = asyncio.Semaphore(settings.fleet_concurrency)
+
+        async def run(mid: str, session: UserSession) -> dict[str, Any]:
+            async with limit:
+                started = time.monotonic()
+                ssh = SSHManager(session)
+                entry: dict[str, Any] = {"host": mid}
+                try:
+                    entry["result"] = await asyncio.wait_for(action(ssh), settings.fleet_host_timeout)
+                    entry["ok"] = True
+                except TimeoutError:
+                    entry.update(ok=False, error=f"No answer within {settings.fleet_host_timeout}s")
+                except Exception as e:
+                    entry.update(ok=False, error=str(e) or type(e).__name__)
+                finally:
+                    ssh.close()
+                entry["elapsed_ms"] = round((time.monotonic() - started) * 1000)
+                return entry
+
+        tasks = [asyncio.create_task(run(mid, session)) for mid, session in targets.items()]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+fleet_registry = FleetRegistry()
@@ -0,0 +1,230 @@
+"""SQLite database on the console's own disk for host facts worth keeping across restarts."""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from config import settings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS builtin_skills (
+    host TEXT NOT NULL,
+    port INTEGER NOT NULL,
+    location TEXT NOT NULL,
+    version TEXT NOT NULL,
+    skills TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (host, port)
+);
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    host TEXT NOT NULL,
+    port INTEGER NOT NULL,
+    username TEXT NOT NULL,
+    path TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    UNIQUE (host, port, username, path)
+);
+CREATE TABLE IF NOT EXISTS sections (
+    id INTEGER PRIMARY KEY,
+    document INTEGER NOT NULL,
+    line INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sections_document ON sections (document);
+CREATE VIRTUAL TABLE IF NOT EXISTS sections_fts USING fts5(title, body, tokenize = 'porter unicode61');
+CREATE TABLE IF NOT EXISTS metrics_rollups (
+    host TEXT NOT NULL,
+    port INTEGER NOT NULL,
+    username TEXT NOT NULL,
+    period REAL NOT NULL,
+    stats TEXT NOT NULL,
+    PRIMARY KEY (host, port, username, period)
+);
+"""
+
+# (host, port, username) whose workspace a document or host a metrics rollup belongs to
+Owner = tuple[str, int, str]
+
+
+@dataclass
+class Document:
+    path: str  # relative to the workspace
+    kind: str  # "workspace", "skill" or "memory"
+    title: str
+    key: str  # fingerprint of path, mtime and size on the host
+    hash: str  # of the indexed content
+    # (first line, text) pieces indexed separately; None when only the fingerprint changed
+    sections: list[tuple[int, str]] | None = None
+
+
+@dataclass
+class BuiltinSkills:
+    location: str  # directory holding nanobot's bundled skills on the host
+    version: str  # installed nanobot version the skills were read from
+    skills: list[dict[str, Any]]
+
+
+class LocalStore:
+    """One SQLite file, opened on first use; falls back to memory if it can't be written."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            path = str(Path(self.path).expanduser()) if self.path else ":memory:"
+            try:
+                if path != ":memory:":
+                    Path(path).parent.mkdir(parents=True, exist_ok=True)
+                db = sqlite3.connect(path, check_same_thread=False)
+                db.execute("PRAGMA journal_mode=WAL")
+                db.executescript(_SCHEMA)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning("Local store {} unusable ({}); caching in memory until restart", path, e)
+                db = sqlite3.connect(":memory:", check_same_thread=False)
+                db.executescript(_SCHEMA)
+            self._db = db
+        return self._db
+
+    def builtin_skills(self, host: str, port: int) -> BuiltinSkills | None:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT location, version, skills FROM builtin_skills WHERE host = ? AND port = ?", (host, port)
+            ).fetchone()
+        if row is None:
+            return None
+        return BuiltinSkills(location=row[0], version=row[1], skills=json.loads(row[2]))
+
+    def save_builtin_skills(self, host: str, port: int, entry: BuiltinSkills) -> None:
+        with self._lock, self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO builtin_skills VALUES (?, ?, ?, ?, ?, ?)",
+                (host, port, entry.location, entry.version, json.dumps(entry.skills), time.time()),
+            )
+
+    def forget_builtin_skills(self, host: str, port: int) -> None:
+        with self._lock, self._connect() as db:
+            db.execute("DELETE FROM builtin_skills WHERE host = ? AND port = ?", (host, port))
+
+    def document_keys(self, owner: Owner) -> dict[str, tuple[str, str]]:
+        """Indexed documents of one workspace: path -> (fingerprint, content hash)."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT path, key, hash FROM documents WHERE host = ? AND port = ? AND username = ?", owner
+            ).fetchall()
+        return {path: (key, digest) for path, key, digest in rows}
+
+    def update_documents(self, owner: Owner, changed: list[Document], removed: list[str]) -> None:
+        """Apply one sync of a workspace to the index, in a single transaction."""
+        with self._lock, self._connect() as db:
+
+            def drop_sections(document: int) -> None:
+                db.execute(
+                    "DELETE FROM sections_fts WHERE rowid IN (SELECT id FROM sections WHERE document = ?)", (document,)
+                )
+                db.execute("DELETE FROM sections WHERE document = ?", (document,))
+
+            for path in removed:
+                row = db.execute(
+                    "DELETE FROM documents WHERE host = ? AND port = ? AND username = ? AND path = ? RETURNING id",
+                    (*owner, path),
+                ).fetchone()
+                if row is not None:
+                    drop_sections(row[0])
+            for doc in changed:
+                (document,) = db.execute(
+                    "INSERT INTO documents (host, port, username, path, kind, key, hash) VALUES (?, ?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (host, port, username, path) DO UPDATE SET key = excluded.key, hash = excluded.hash"
+                    " RETURNING id",
+                    (*owner, doc.path, doc.kind, doc.key, doc.hash),
+                ).fetchone()
+                if doc.sections is None:
+                    continue
+                drop_sections(document)
+                for line, text in doc.sections:
+                    (section,) = db.execute(
+                        "INSERT INTO sections (document, line) VALUES (?, ?) RETURNING id", (document, line)
+                    ).fetchone()
+                    db.execute(
+                        "INSERT INTO sections_fts (rowid, title, body) VALUES (?, ?, ?)", (section, doc.title, text)
+                    )
+
+    def search_documents(
+        self, owner: Owner, match: str, kinds: list[str] | None, limit: int
+    ) -> list[tuple[str, str, str, int, str, float]]:
+        """Best documents for an FTS5 query as (path, kind, title, line, snippet, rank).
+
+        Each document is represented by its best section, starting at ``line``.
+        Matched terms in snippets are wrapped in ``\\x02``/``\\x03``; lower rank is better.
+        """
+        # SQLite takes the bare columns of a MIN() aggregate from the minimal row
+        sql = (
+            "SELECT s.id, MIN(sections_fts.rank) AS best FROM sections_fts"
+            " JOIN sections s ON s.id = sections_fts.rowid JOIN documents d ON d.id = s.document"
+            " WHERE sections_fts MATCH ? AND sections_fts.rank MATCH 'bm25(5.0, 1.0)'"
+            " AND d.host = ? AND d.port = ? AND d.username = ?"
+        )
+        params: list[Any] = [match, *owner]
+        if kinds:
+            sql += f" AND d.kind IN ({','.join('?' * len(kinds))})"
+            params += kinds
+        with self._lock:
+            db = self._connect()
+            best = db.execute(sql + " GROUP BY d.id ORDER BY best LIMIT ?", (*params, limit)).fetchall()
+            if not best:
+                return []
+            # Snippets only for the winners; building them is the expensive part
+            rows = db.execute(
+                "SELECT s.id, d.path, d.kind, sections_fts.title, s.line,"
+                " snippet(sections_fts, 1, char(2), char(3), '…', 16)"
+                " FROM sections_fts JOIN sections s ON s.id = sections_fts.rowid JOIN documents d ON d.id = s.document"
+                f" WHERE sections_fts MATCH ? AND sections_fts.rowid IN ({','.join('?' * len(best))})",
+                (match, *(section for section, _ in best)),
+            ).fetchall()
+        found = {row[0]: row[1:] for row in rows}
+        return [(*found[section], rank) for section, rank in best if section in found]
+
+    def metrics_rollups(self, owner: Owner, since: float) -> list[tuple[float, dict[str, float]]]:
+        """Resource rollups of one host from ``since`` on, as (period start, stats), oldest first."""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT period, stats FROM metrics_rollups WHERE host = ? AND port = ? AND username = ?"
+                " AND period >= ? ORDER BY period",
+                (*owner, since),
+            ).fetchall()
+        return [(period, json.loads(stats)) for period, stats in rows]
+
+    def save_metrics_rollups(
+        self, owner: Owner, rollups: list[tuple[float, dict[str, float]]], keep_since: float
+    ) -> None:
+        """Store new rollups of one host and drop its rollups from before ``keep_since``."""
+        with self._lock, self._connect() as db:
+            db.executemany(
+                "INSERT OR REPLACE INTO metrics_rollups VALUES (?, ?, ?, ?, ?)",
+                [(*owner, period, json.dumps(stats)) for period, stats in rollups],
+            )
+            db.execute(
+                "DELETE FROM metrics_rollups WHERE host = ? AND port = ? AND username = ? AND period < ?",
+                (*owner, keep_since),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+local_store = LocalStore(settings.local_store_path)
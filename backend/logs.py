@@ -0,0 +1,202 @@
+"""Live log WebSocket — one remote tail per host, shared by every viewer."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from collections import deque
+
+from fastapi import WebSocket, WebSocketDisconnect
+from loguru import logger
+
+from auth import UserSession, session_from_token
+from config import settings
+from ssh_manager import SSHManager
+from ssh_pool import PoolKey, pool_key, secret_digest
+
+# Follow the journal when nanobot runs as a systemd service, else the file start_nanobot writes to.
+# Neither reads stdin, so a watcher kills it (it keeps the shell's pid via exec) once the channel closes.
+_FOLLOW_COMMAND = (
+    "exec 2>/dev/null; {{ cat; kill $$; }} <&0 >/dev/null & "
+    "if journalctl -u nanobot -n 1 -q --no-pager | grep -q .; "
+    "then exec journalctl -u nanobot --no-pager -f -n {lines}; "
+    "else exec tail -n {lines} -F /tmp/nanobot.log; fi"
+)
+# Most lines sent to a viewer in one frame
+_MAX_BATCH = 500
+
+
+class LogTail:
+    """Follows nanobot's log on one host and fans new lines out to its viewers.
+
+    The remote ``journalctl -f`` / ``tail -F`` runs while anyone is watching.
+    The latest lines are kept in a ring buffer, so a new viewer gets its
+    backfill without another remote command. A viewer that falls too far
+    behind is dropped instead of holding back the others.
+    """
+
+    def __init__(self, key: tuple[PoolKey, str], session: UserSession):
+        self.key = key
+        self.ssh = SSHManager(session, long_lived=True)
+        self.lines: deque[str] = deque(maxlen=settings.logs_buffer_lines)
+        self.viewers: set[asyncio.Queue[str | None]] = set()
+        self.idle_timer: asyncio.TimerHandle | None = None
+        self.ended = False  # the login's session ended; viewers are being disconnected
+        self._task: asyncio.Task | None = None
+
+    def subscribe(self) -> tuple[list[str], asyncio.Queue[str | None]]:
+        """Add a viewer; returns the backfill and the queue new lines arrive on.
+
+        ``None`` on the queue means the viewer was dropped: it fell behind,
+        or the tail ``ended``.
+        """
+        queue: asyncio.Queue[str | None] = asyncio.Queue(maxsize=settings.logs_viewer_buffer)
+        self.viewers.add(queue)
+        if self.idle_timer is not None:
+            self.idle_timer.cancel()
+            self.idle_timer = None
+        if self._task is None:
+            self._task = asyncio.create_task(self._follow())
+        return list(self.lines), queue
+
+    def unsubscribe(self, queue: asyncio.Queue[str | None]) -> None:
+        self.viewers.discard(queue)
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.ssh.close()
+
+    def end(self) -> None:
+        """Stop following and disconnect the viewers; the login's session has ended."""
+        self.ended = True
+        self.stop()
+        for queue in self.viewers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(None)
+        self.viewers.clear()
+
+    async def _follow(self) -> None:
+        host = self.ssh.session.host
+        while True:
+            # After a restart the buffer already holds the backlog
+            backfill = 0 if self.lines else settings.logs_buffer_lines
+            try:
+                proc = await self.ssh.start_command(_FOLLOW_COMMAND.format(lines=backfill))
+                try:
+                    while line := await proc.readline():
+                        self._publish(line.rstrip("\n"))
+                finally:
+                    proc.close()
+                logger.info("Log tail on {} exited ({}); restarting", host, proc.exit_status)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Log tail on {} failed: {}", host, e)
+            await asyncio.sleep(settings.logs_restart_delay)
+
+    def _publish(self, line: str) -> None:
+        self.lines.append(line)
+        for queue in list(self.viewers):
+            try:
+                queue.put_nowait(line)
+            except asyncio.QueueFull:
+                self.viewers.discard(queue)
+                queue.get_nowait()
+                queue.put_nowait(None)
+
+
+class LogHub:
+    """Serves the live log WebSocket, sharing one ``LogTail`` per host and login."""
+
+    def __init__(self):
+        self._tails: dict[tuple[PoolKey, str], LogTail] = {}
+
+    def _tail_for(self, session: UserSession) -> LogTail:
+        key = (pool_key(session), secret_digest(session))
+        tail = self._tails.get(key)
+        if tail is None:
+            tail = self._tails[key] = LogTail(key, session)
+        return tail
+
+    def _release(self, tail: LogTail, queue: asyncio.Queue[str | None]) -> None:
+        tail.unsubscribe(queue)
+        if not tail.viewers and tail.idle_timer is None and not tail.ended:
+            # Linger a little so a page reload picks the same tail back up
+            tail.idle_timer = asyncio.get_running_loop().call_later(
+                settings.logs_idle_timeout, self._expire, tail
+            )
+
+    def _expire(self, tail: LogTail) -> None:
+        tail.idle_timer = None
+        if not tail.viewers:
+            tail.stop()
+            self._tails.pop(tail.key, None)
+
+    def release(self, session: UserSession) -> None:
+        """Stop the tail of a login whose last session ended."""
+        tail = self._tails.pop((pool_key(session), secret_digest(session)), None)
+        if tail is not None:
+            if tail.idle_timer is not None:
+                tail.idle_timer.cancel()
+                tail.idle_timer = None
+            tail.end()
+
+    def close(self) -> None:
+        """Stop every tail; called on shutdown."""
+        for tail in self._tails.values():
+            if tail.idle_timer is not None:
+                tail.idle_timer.cancel()
+            tail.stop()
+        self._tails.clear()
+
+    async def handle(self, ws: WebSocket) -> None:
+        """Handle an incoming WebSocket connection for live logs."""
+        await ws.accept()
+        try:
+            auth_data = json.loads(await ws.receive_text())
+            session = session_from_token(auth_data.get("token", ""))
+        except Exception:
+            await ws.send_json({"type": "error", "message": "Authentication failed"})
+            await ws.close()
+            return
+
+        tail = self._tail_for(session)
+        backfill, queue = tail.subscribe()
+        # Viewers don't send anything after auth; this only notices them leave
+        closed = asyncio.create_task(self._wait_closed(ws))
+        try:
+            await ws.send_json({"type": "lines", "lines": backfill, "backfill": True})
+            while True:
+                line = asyncio.create_task(queue.get())
+                await asyncio.wait({line, closed}, return_when=asyncio.FIRST_COMPLETED)
+                if not line.done():
+                    line.cancel()
+                    return
+                batch = [line.result()]
+                while len(batch) < _MAX_BATCH and not queue.empty():
+                    batch.append(queue.get_nowait())
+                if None in batch:
+                    message = "Session ended; log in again" if tail.ended else "Fell too far behind the log; reconnect"
+                    await ws.send_json({"type": "error", "message": message})
+                    await ws.close()
+                    return
+                await ws.send_json({"type": "lines", "lines": batch})
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            closed.cancel()
+            self._release(tail, queue)
+
+    @staticmethod
+    async def _wait_closed(ws: WebSocket) -> None:
+        try:
+            while True:
+                await ws.receive_text()
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+
+
+log_hub = LogHub()
@@ -2,14 +2,20 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import os
+import re
+import secrets
+import time
+from collections.abc import Callable
 from contextlib import asynccontextmanager
 from typing import Any
 
-from fastapi import Depends, FastAPI, HTTPException, WebSocket
+from fastapi import Body, Depends, FastAPI, HTTPException, Query, Request, Response, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from fastapi.security import HTTPAuthorizationCredentials
 from fastapi.staticfiles import StaticFiles
 from loguru import logger
 from pydantic import BaseModel
@@ -18,19 +24,75 @@ from auth import (
     LoginRequest,
     Token,
     UserSession,
-    create_access_token,
     get_current_session,
+    optional_security,
+    security,
+    session_from_token,
+    session_store,
 )
 from chat import chat_manager
 from config import settings
-from ssh_manager import SSHManager
+from config_patch import PatchError, apply_json_patch, apply_merge_patch
+from cron_runs import cron_runner
+from dashboard import dashboard_hub
+from fleet import describe_member, fleet_registry
+from logs import log_hub
+from local_store import local_store
+from metrics_history import metrics_hub
+from port_scan import port_scanner
+from search import search_index
+from ssh_manager import ConfigConflictError, SSHManager
+from ssh_engines import ssh_engine
+from telemetry import TelemetryMiddleware, metrics
+
+
+# Connection closes started by _end_login, kept referenced until they finish
+_closing: set[asyncio.Task] = set()
+
+
+def _end_login(session: UserSession) -> None:
+    """Release everything kept for a login whose last live session ended.
+
+    Runs on logout, expiry and eviction, so no poller, sampler, tail, chat
+    or connection outlives the session it was started for.
+    """
+    fleet_registry.forget(session)
+    metrics_hub.release(session)
+    dashboard_hub.release(session)
+    log_hub.release(session)
+    chat_manager.release(session)
+    cron_runner.release(session)
+    search_index.release(session)
+    task = asyncio.create_task(ssh_engine.close_idle(session))
+    _closing.add(task)
+    task.add_done_callback(_closing.discard)
+
+
+session_store.on_end(_end_login)
+
+
+async def _expire_sessions() -> None:
+    # Lookups notice expired sessions too, but a login nobody uses any more needs this
+    while True:
+        await asyncio.sleep(60)
+        session_store.expire()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Nanobot Web Management API starting...")
+    await ssh_engine.start()
+    expiry = asyncio.create_task(_expire_sessions())
     yield
     logger.info("Nanobot Web Management API shutting down")
+    expiry.cancel()
+    log_hub.close()
+    dashboard_hub.close()
+    metrics_hub.close()
+    search_index.close()
+    cron_runner.close()
+    await ssh_engine.close()
+    local_store.close()
 
 
 app = FastAPI(
@@ -45,28 +107,89 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Server-Timing"],
 )
+app.add_middleware(TelemetryMiddleware)
 
 
 # ── Helpers ──────────────────────────────────────────────────────────────────
 
 
 def get_ssh(session: UserSession = Depends(get_current_session)) -> SSHManager:
+    # Connections are borrowed lazily from the shared pool; ssh.close() returns them.
     return SSHManager(session)
 
 
+def _etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    candidates = [c.strip().removeprefix("W/") for c in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def versioned_response(request: Request, version: str | None, body: Any) -> Response:
+    """JSON response tagged with the config version; 304 if the client has it."""
+    if version is None:
+        return JSONResponse(body)
+    etag = f'"{version}"'
+    # no-cache: browsers keep the copy but revalidate it with If-None-Match
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(body, headers=headers)
+
+
+def _if_match_version(request: Request) -> str | None:
+    """Config version the client based its change on (None if absent or '*')."""
+    header = request.headers.get("if-match", "").strip()
+    if not header or header == "*":
+        return None
+    return header.split(",")[0].strip().removeprefix("W/").strip('"')
+
+
+def _set_config_value(*keys: str, value: Any) -> Callable[[dict[str, Any]], dict[str, Any]]:
+    def apply(config: dict[str, Any]) -> dict[str, Any]:
+        node = config
+        for key in keys[:-1]:
+            node = node.setdefault(key, {})
+        node[keys[-1]] = value
+        return config
+
+    return apply
+
+
+async def update_config_with(
+    request: Request,
+    ssh: SSHManager,
+    apply: Callable[[dict[str, Any]], dict[str, Any]],
+) -> JSONResponse:
+    """Read-modify-write the config, honouring If-Match; responds with the new ETag."""
+    try:
+        version = await ssh.update_nanobot_config(apply, expected_version=_if_match_version(request))
+    except ConfigConflictError as e:
+        raise HTTPException(
+            status_code=412,
+            detail="Config was changed by someone else; reload and try again",
+            headers={"ETag": f'"{e.current_version}"'} if e.current_version else None,
+        )
+    except PatchError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid patch: {e}")
+    if version is None:
+        raise HTTPException(status_code=500, detail="Failed to save config")
+    dashboard_hub.refresh(ssh.session)
+    return JSONResponse({"status": "ok", "version": version}, headers={"ETag": f'"{version}"'})
+
+
 # ── Auth ─────────────────────────────────────────────────────────────────────
 
 
 @app.post("/api/auth/login", response_model=Token)
-def login(req: LoginRequest):
+async def login(req: LoginRequest):
     """Authenticate by verifying SSH connectivity to the target server."""
-    ssh = SSHManager(
-        UserSession(host=req.host, port=req.port, username=req.username, password=req.password)
-    )
+    session = UserSession(host=req.host, port=req.port, username=req.username, password=req.password)
     try:
-        ssh.connect()
-        ssh.close()
+        # Always do a fresh handshake here; the verified connection then seeds the pool.
+        await ssh_engine.authenticate(session)
     except Exception as e:
         error_msg = str(e)
         
@@ -91,12 +214,18 @@ def login(req: LoginRequest):
         
         raise HTTPException(status_code=401, detail=full_error)
 
-    token = create_access_token(
-        {"host": req.host, "port": req.port, "username": req.username, "password": req.password}
-    )
+    token = session_store.create(session)
+    await metrics_hub.track(session)
     return Token(access_token=token)
 
 
+@app.post("/api/auth/logout")
+async def logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Revoke the session; unless another session shares the login, everything kept for it goes too."""
+    session_store.revoke(credentials.credentials)
+    return {"status": "ok"}
+
+
 @app.get("/api/auth/me")
 def get_me(session: UserSession = Depends(get_current_session)):
     """Return the current session info (no password)."""
@@ -107,69 +236,57 @@ def get_me(session: UserSession = Depends(get_current_session)):
 
 
 @app.get("/api/dashboard")
-def get_dashboard(ssh: SSHManager = Depends(get_ssh)):
-    """Get dashboard overview: status, config summary, channels, skills count."""
+async def get_dashboard(session: UserSession = Depends(get_current_session)):
+    """Get dashboard overview: status, config summary, channels, skills count.
+
+    Served from the host's shared background poller, so concurrent viewers
+    don't each query the host.
+    """
     try:
-        status_info = ssh.get_nanobot_status()
-        config = ssh.get_nanobot_config() or {}
+        return await dashboard_hub.snapshot(session)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        channels_cfg = config.get("channels", {})
-        enabled_channels = [
-            ch for ch in channels_cfg
-            if isinstance(channels_cfg[ch], dict) and channels_cfg[ch].get("enabled")
-        ]
 
-        agents_cfg = config.get("agents", {})
-        defaults = agents_cfg.get("defaults", {})
+@app.websocket("/ws/dashboard")
+async def dashboard_websocket(ws: WebSocket):
+    """WebSocket endpoint pushing each new dashboard snapshot."""
+    await dashboard_hub.handle(ws)
 
-        providers_cfg = config.get("providers", {})
-        active_providers = [
-            p for p in providers_cfg
-            if isinstance(providers_cfg[p], dict) and providers_cfg[p].get("apiKey", providers_cfg[p].get("api_key", ""))
-        ]
 
-        tools_cfg = config.get("tools", {})
-        mcp_servers = list(tools_cfg.get("mcpServers", tools_cfg.get("mcp_servers", {})).keys())
+@app.get("/api/metrics/history")
+async def get_metrics_history(
+    since: float | None = None,
+    until: float | None = None,
+    points: int = 300,
+    session: UserSession = Depends(get_current_session),
+):
+    """Host and nanobot resource history (min/max/avg per bucket) for charts.
 
-        return {
-            "status": status_info,
-            "config_summary": {
-                "model": defaults.get("model", "anthropic/claude-opus-4-5"),
-                "provider": defaults.get("provider", "auto"),
-                "max_tokens": defaults.get("maxTokens", defaults.get("max_tokens", 8192)),
-                "temperature": defaults.get("temperature", 0.1),
-                "workspace": defaults.get("workspace", "~/.nanobot/workspace"),
-            },
-            "channels": {
-                "enabled": enabled_channels,
-                "total": len([ch for ch in channels_cfg if isinstance(channels_cfg[ch], dict)]),
-            },
-            "providers": {
-                "active": active_providers,
-                "total": len([p for p in providers_cfg if isinstance(providers_cfg[p], dict)]),
-            },
-            "tools": {
-                "mcp_servers": mcp_servers,
-                "restrict_to_workspace": tools_cfg.get("restrictToWorkspace", tools_cfg.get("restrict_to_workspace", False)),
-            },
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        ssh.close()
+    Defaults to the last hour. Samples are taken in the background while
+    someone is logged in to the host; rollups are kept across logins and
+    restarts, so gaps show where nobody was.
+    """
+    until = time.time() if until is None else until
+    since = until - 3600 if since is None else since
+    if since >= until:
+        raise HTTPException(status_code=400, detail="since must be before until")
+    if not 1 <= points <= 5000:
+        raise HTTPException(status_code=400, detail="points must be between 1 and 5000")
+    return await metrics_hub.history(session, since, until, points)
 
 
 # ── Config ───────────────────────────────────────────────────────────────────
 
 
 @app.get("/api/config")
-def get_config(ssh: SSHManager = Depends(get_ssh)):
+async def get_config(request: Request, ssh: SSHManager = Depends(get_ssh)):
     """Get the full nanobot config."""
     try:
-        config = ssh.get_nanobot_config()
+        config, version = await ssh.get_nanobot_config_versioned()
         if config is None:
             raise HTTPException(status_code=404, detail="Config file not found on server")
-        return config
+        return versioned_response(request, version, config)
     finally:
         ssh.close()
 
@@ -179,26 +296,42 @@ class ConfigUpdate(BaseModel):
 
 
 @app.put("/api/config")
-def update_config(body: ConfigUpdate, ssh: SSHManager = Depends(get_ssh)):
+async def update_config(body: ConfigUpdate, request: Request, ssh: SSHManager = Depends(get_ssh)):
     """Update the full nanobot config."""
     try:
-        if not ssh.save_nanobot_config(body.config):
-            raise HTTPException(status_code=500, detail="Failed to save config")
-        return {"status": "ok"}
+        return await update_config_with(request, ssh, lambda _: body.config)
+    finally:
+        ssh.close()
+
+
+@app.patch("/api/config")
+async def patch_config(request: Request, body: Any = Body(...), ssh: SSHManager = Depends(get_ssh)):
+    """Apply a JSON Patch (array body) or JSON Merge Patch (object body) to the config.
+
+    Requires If-Match with the version from a previous ETag; a stale version
+    gets 412 and nothing is written.
+    """
+    if "if-match" not in request.headers:
+        raise HTTPException(status_code=428, detail="If-Match header with the config version is required")
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    try:
+        if content_type == "application/json-patch+json" or isinstance(body, list):
+            return await update_config_with(request, ssh, lambda config: apply_json_patch(config, body))
+        return await update_config_with(request, ssh, lambda config: apply_merge_patch(config, body))
     finally:
         ssh.close()
 
 
 @app.get("/api/config/{section}")
-def get_config_section(section: str, ssh: SSHManager = Depends(get_ssh)):
+async def get_config_section(section: str, request: Request, ssh: SSHManager = Depends(get_ssh)):
     """Get a specific config section."""
     try:
-        config = ssh.get_nanobot_config()
+        config, version = await ssh.get_nanobot_config_versioned()
         if config is None:
             raise HTTPException(status_code=404, detail="Config not found")
         if section not in config:
             raise HTTPException(status_code=404, detail=f"Section '{section}' not found")
-        return config[section]
+        return versioned_response(request, version, config[section])
     finally:
         ssh.close()
 
@@ -208,16 +341,12 @@ class SectionUpdate(BaseModel):
 
 
 @app.put("/api/config/{section}")
-def update_config_section(section: str, body: SectionUpdate, ssh: SSHManager = Depends(get_ssh)):
+async def update_config_section(
+    section: str, body: SectionUpdate, request: Request, ssh: SSHManager = Depends(get_ssh)
+):
     """Update a specific config section."""
     try:
-        config = ssh.get_nanobot_config()
-        if config is None:
-            config = {}
-        config[section] = body.data
-        if not ssh.save_nanobot_config(config):
-            raise HTTPException(status_code=500, detail="Failed to save config")
-        return {"status": "ok"}
+        return await update_config_with(request, ssh, _set_config_value(section, value=body.data))
     finally:
         ssh.close()
 
@@ -226,25 +355,20 @@ def update_config_section(section: str, body: SectionUpdate, ssh: SSHManager = D
 
 
 @app.get("/api/channels")
-def get_channels(ssh: SSHManager = Depends(get_ssh)):
+async def get_channels(request: Request, ssh: SSHManager = Depends(get_ssh)):
     """Get all channel configurations."""
     try:
-        config = ssh.get_nanobot_config() or {}
-        return config.get("channels", {})
+        config, version = await ssh.get_nanobot_config_versioned()
+        return versioned_response(request, version, (config or {}).get("channels", {}))
     finally:
         ssh.close()
 
 
 @app.put("/api/channels/{channel}")
-def update_channel(channel: str, body: SectionUpdate, ssh: SSHManager = Depends(get_ssh)):
+async def update_channel(channel: str, body: SectionUpdate, request: Request, ssh: SSHManager = Depends(get_ssh)):
     """Update a specific channel configuration."""
     try:
-        config = ssh.get_nanobot_config() or {}
-        channels = config.setdefault("channels", {})
-        channels[channel] = body.data
-        if not ssh.save_nanobot_config(config):
-            raise HTTPException(status_code=500, detail="Failed to save config")
-        return {"status": "ok"}
+        return await update_config_with(request, ssh, _set_config_value("channels", channel, value=body.data))
     finally:
         ssh.close()
 
@@ -253,14 +377,19 @@ def update_channel(channel: str, body: SectionUpdate, ssh: SSHManager = Depends(
 
 
 @app.get("/api/agents")
-def get_agents(ssh: SSHManager = Depends(get_ssh)):
-    """Get agents configuration and AGENTS.md content."""
+async def get_agents(ssh: SSHManager = Depends(get_ssh)):
+    """Get agents configuration and AGENTS.md content.
+
+    ``version`` is the config version the agents section was read at, for
+    If-Match on ``PUT /api/agents/config``.
+    """
     try:
-        config = ssh.get_nanobot_config() or {}
-        agents_md = ssh.list_agents_md()
+        config, version = await ssh.get_nanobot_config_versioned()
+        agents_md = await ssh.list_agents_md()
         return {
-            "config": config.get("agents", {}),
+            "config": (config or {}).get("agents", {}),
             "agents_md": agents_md,
+            "version": version,
         }
     finally:
         ssh.close()
@@ -271,25 +400,22 @@ class AgentsMdUpdate(BaseModel):
 
 
 @app.put("/api/agents/md")
-def update_agents_md(body: AgentsMdUpdate, ssh: SSHManager = Depends(get_ssh)):
+async def update_agents_md(body: AgentsMdUpdate, ssh: SSHManager = Depends(get_ssh)):
     """Update the AGENTS.md file."""
     try:
-        if not ssh.save_agents_md(body.content):
+        if not await ssh.save_agents_md(body.content):
             raise HTTPException(status_code=500, detail="Failed to save AGENTS.md")
+        search_index.invalidate(ssh.session)
         return {"status": "ok"}
     finally:
         ssh.close()
 
 
 @app.put("/api/agents/config")
-def update_agents_config(body: SectionUpdate, ssh: SSHManager = Depends(get_ssh)):
+async def update_agents_config(body: SectionUpdate, request: Request, ssh: SSHManager = Depends(get_ssh)):
     """Update agents config section."""
     try:
-        config = ssh.get_nanobot_config() or {}
-        config["agents"] = body.data
-        if not ssh.save_nanobot_config(config):
-            raise HTTPException(status_code=500, detail="Failed to save config")
-        return {"status": "ok"}
+        return await update_config_with(request, ssh, _set_config_value("agents", value=body.data))
     finally:
         ssh.close()
 
@@ -298,23 +424,22 @@ def update_agents_config(body: SectionUpdate, ssh: SSHManager = Depends(get_ssh)
 
 
 @app.get("/api/skills")
-def get_skills(ssh: SSHManager = Depends(get_ssh)):
+async def get_skills(ssh: SSHManager = Depends(get_ssh)):
     """List all skills."""
     try:
-        return {"skills": ssh.list_skills()}
+        return {"skills": await ssh.list_skills()}
     finally:
         ssh.close()
 
 
 @app.get("/api/skills/{name}")
-def get_skill(name: str, ssh: SSHManager = Depends(get_ssh)):
+async def get_skill(name: str, ssh: SSHManager = Depends(get_ssh)):
     """Get a specific skill's content."""
     try:
-        skills = ssh.list_skills()
-        for s in skills:
-            if s["name"] == name:
-                return s
-        raise HTTPException(status_code=404, detail=f"Skill '{name}' not found")
+        skill = await ssh.get_skill(name)
+        if skill is None:
+            raise HTTPException(status_code=404, detail=f"Skill '{name}' not found")
+        return skill
     finally:
         ssh.close()
 
@@ -324,13 +449,12 @@ class SkillUpdate(BaseModel):
 
 
 @app.put("/api/skills/{name}")
-def update_skill(name: str, body: SkillUpdate, ssh: SSHManager = Depends(get_ssh)):
+async def update_skill(name: str, body: SkillUpdate, ssh: SSHManager = Depends(get_ssh)):
     """Update a skill's SKILL.md content."""
     try:
-        ws = settings.nanobot_workspace_path
-        path = f"{ws}/skills/{name}/SKILL.md"
-        if not ssh.write_file(path, body.content):
+        if not await ssh.save_skill(name, body.content):
             raise HTTPException(status_code=500, detail="Failed to save skill")
+        search_index.invalidate(ssh.session)
         return {"status": "ok"}
     finally:
         ssh.close()
@@ -342,17 +466,16 @@ class SkillCreate(BaseModel):
 
 
 @app.post("/api/skills")
-def create_skill(body: SkillCreate, ssh: SSHManager = Depends(get_ssh)):
+async def create_skill(body: SkillCreate, ssh: SSHManager = Depends(get_ssh)):
     """Create a new skill."""
     try:
         ws = settings.nanobot_workspace_path
         path = f"{ws}/skills/{body.name}/SKILL.md"
-        # Check if already exists
-        existing = ssh.read_file(path)
-        if existing is not None:
+        if await ssh.exists(path):
             raise HTTPException(status_code=409, detail=f"Skill '{body.name}' already exists")
-        if not ssh.write_file(path, body.content):
+        if not await ssh.save_skill(body.name, body.content):
             raise HTTPException(status_code=500, detail="Failed to create skill")
+        search_index.invalidate(ssh.session)
         return {"status": "ok", "name": body.name}
     finally:
         ssh.close()
@@ -362,25 +485,20 @@ def create_skill(body: SkillCreate, ssh: SSHManager = Depends(get_ssh)):
 
 
 @app.get("/api/providers")
-def get_providers(ssh: SSHManager = Depends(get_ssh)):
+async def get_providers(request: Request, ssh: SSHManager = Depends(get_ssh)):
     """Get all provider configurations."""
     try:
-        config = ssh.get_nanobot_config() or {}
-        return config.get("providers", {})
+        config, version = await ssh.get_nanobot_config_versioned()
+        return versioned_response(request, version, (config or {}).get("providers", {}))
     finally:
         ssh.close()
 
 
 @app.put("/api/providers/{provider}")
-def update_provider(provider: str, body: SectionUpdate, ssh: SSHManager = Depends(get_ssh)):
+async def update_provider(provider: str, body: SectionUpdate, request: Request, ssh: SSHManager = Depends(get_ssh)):
     """Update a specific provider configuration."""
     try:
-        config = ssh.get_nanobot_config() or {}
-        providers = config.setdefault("providers", {})
-        providers[provider] = body.data
-        if not ssh.save_nanobot_config(config):
-            raise HTTPException(status_code=500, detail="Failed to save config")
-        return {"status": "ok"}
+        return await update_config_with(request, ssh, _set_config_value("providers", provider, value=body.data))
     finally:
         ssh.close()
 
@@ -389,24 +507,20 @@ def update_provider(provider: str, body: SectionUpdate, ssh: SSHManager = Depend
 
 
 @app.get("/api/tools")
-def get_tools(ssh: SSHManager = Depends(get_ssh)):
+async def get_tools(request: Request, ssh: SSHManager = Depends(get_ssh)):
     """Get tools configuration."""
     try:
-        config = ssh.get_nanobot_config() or {}
-        return config.get("tools", {})
+        config, version = await ssh.get_nanobot_config_versioned()
+        return versioned_response(request, version, (config or {}).get("tools", {}))
     finally:
         ssh.close()
 
 
 @app.put("/api/tools")
-def update_tools(body: SectionUpdate, ssh: SSHManager = Depends(get_ssh)):
+async def update_tools(body: SectionUpdate, request: Request, ssh: SSHManager = Depends(get_ssh)):
     """Update tools configuration."""
     try:
-        config = ssh.get_nanobot_config() or {}
-        config["tools"] = body.data
-        if not ssh.save_nanobot_config(config):
-            raise HTTPException(status_code=500, detail="Failed to save config")
-        return {"status": "ok"}
+        return await update_config_with(request, ssh, _set_config_value("tools", value=body.data))
     finally:
         ssh.close()
 
@@ -415,10 +529,32 @@ def update_tools(body: SectionUpdate, ssh: SSHManager = Depends(get_ssh)):
 
 
 @app.get("/api/memory")
-def get_memory(ssh: SSHManager = Depends(get_ssh)):
-    """Get memory files."""
+async def get_memory(ssh: SSHManager = Depends(get_ssh)):
+    """List memory files (metadata only; fetch content per file) and the per-read size limit."""
     try:
-        return {"files": ssh.list_memory_files()}
+        return {"files": await ssh.list_memory_files(), "max_read_bytes": settings.memory_max_read_bytes}
+    finally:
+        ssh.close()
+
+
+@app.get("/api/memory/file")
+async def get_memory_file(
+    path: str,
+    offset: int | None = None,
+    length: int | None = None,
+    start_line: int | None = None,
+    lines: int | None = None,
+    tail: int | None = None,
+    ssh: SSHManager = Depends(get_ssh),
+):
+    """Read one memory file, whole or by byte range, line range or tail."""
+    try:
+        result = await ssh.read_memory_file(
+            path, offset=offset, length=length, start_line=start_line, lines=lines, tail=tail
+        )
+        if result is None:
+            raise HTTPException(status_code=404, detail="Memory file not found")
+        return result
     finally:
         ssh.close()
 
@@ -429,28 +565,89 @@ class MemoryUpdate(BaseModel):
 
 
 @app.put("/api/memory")
-def update_memory(body: MemoryUpdate, ssh: SSHManager = Depends(get_ssh)):
+async def update_memory(body: MemoryUpdate, ssh: SSHManager = Depends(get_ssh)):
     """Update a memory file."""
     try:
-        if not ssh.write_file(body.path, body.content):
+        if await ssh.write_file(body.path, body.content) is None:
             raise HTTPException(status_code=500, detail="Failed to save memory file")
+        search_index.invalidate(ssh.session)
         return {"status": "ok"}
     finally:
         ssh.close()
 
 
+# ── Search ───────────────────────────────────────────────────────────────────
+
+SEARCH_KINDS = ("workspace", "skill", "memory")
+
+
+@app.get("/api/search")
+async def search_workspace(
+    q: str,
+    kind: list[str] | None = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    session: UserSession = Depends(get_current_session),
+):
+    """Full-text search over workspace Markdown, skills and memory files.
+
+    Answered from the console's local index; ``kind`` narrows it to some of
+    workspace, skill and memory.
+    """
+    unknown = set(kind or ()) - set(SEARCH_KINDS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown kind: {', '.join(sorted(unknown))}")
+    return await search_index.search(session, q, kind, limit)
+
+
 # ── Logs ─────────────────────────────────────────────────────────────────────
 
 
+_LOG_LEVELS = {"trace", "debug", "info", "success", "warning", "error", "critical"}
+
+
 @app.get("/api/logs")
-def get_logs(lines: int = 100, ssh: SSHManager = Depends(get_ssh)):
-    """Get recent nanobot logs."""
+async def get_logs(
+    lines: int = 100,
+    cursor: str | None = None,
+    level: str | None = None,
+    pattern: str | None = None,
+    since: float | None = None,
+    until: float | None = None,
+    ssh: SSHManager = Depends(get_ssh),
+):
+    """Get nanobot logs: the latest lines, or only those after ``cursor``.
+
+    ``level``, ``pattern`` (a regex) and ``since``/``until`` (Unix time) are
+    applied on the host, so only matching lines are transferred.
+    """
+    if lines < 0:
+        raise HTTPException(status_code=400, detail="lines must not be negative")
+    if level is not None and level.lower() not in _LOG_LEVELS:
+        raise HTTPException(status_code=400, detail=f"Unknown log level: {level}")
+    if pattern:
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise HTTPException(status_code=400, detail=f"Invalid pattern: {e}")
     try:
-        return {"logs": ssh.get_logs(lines)}
+        result = await ssh.get_logs(
+            lines, cursor=cursor, level=level, pattern=pattern, since=since, until=until
+        )
+        if result is None or "error" in result:
+            raise HTTPException(status_code=500, detail=(result or {}).get("error", "Failed to read logs"))
+        if result["source"] is None:
+            return {**result, "logs": "No logs found"}
+        return {**result, "logs": "\n".join(result["lines"])}
     finally:
         ssh.close()
 
 
+@app.websocket("/ws/logs")
+async def logs_websocket(ws: WebSocket):
+    """WebSocket endpoint streaming nanobot's log as it is written."""
+    await log_hub.handle(ws)
+
+
 # ── Cron ─────────────────────────────────────────────────────────────────────
 
 
@@ -470,19 +667,19 @@ class CronToggleRequest(BaseModel):
 
 
 @app.get("/api/cron")
-def get_cron_jobs(ssh: SSHManager = Depends(get_ssh)):
+async def get_cron_jobs(ssh: SSHManager = Depends(get_ssh)):
     """List all scheduled jobs."""
     try:
-        return ssh.get_cron_jobs()
+        return await ssh.get_cron_jobs()
     finally:
         ssh.close()
 
 
 @app.post("/api/cron")
-def add_cron_job(body: CronAddRequest, ssh: SSHManager = Depends(get_ssh)):
+async def add_cron_job(body: CronAddRequest, ssh: SSHManager = Depends(get_ssh)):
     """Add a new scheduled job."""
     try:
-        ok, msg = ssh.add_cron_job(
+        ok, msg = await ssh.add_cron_job(
             name=body.name,
             message=body.message,
             schedule_type=body.schedule_type,
@@ -500,10 +697,10 @@ def add_cron_job(body: CronAddRequest, ssh: SSHManager = Depends(get_ssh)):
 
 
 @app.delete("/api/cron/{job_id}")
-def remove_cron_job(job_id: str, ssh: SSHManager = Depends(get_ssh)):
+async def remove_cron_job(job_id: str, ssh: SSHManager = Depends(get_ssh)):
     """Remove a scheduled job."""
     try:
-        ok, msg = ssh.remove_cron_job(job_id)
+        ok, msg = await ssh.remove_cron_job(job_id)
         if not ok:
             raise HTTPException(status_code=500, detail=msg)
         return {"status": "ok", "message": msg}
@@ -512,10 +709,10 @@ def remove_cron_job(job_id: str, ssh: SSHManager = Depends(get_ssh)):
 
 
 @app.put("/api/cron/{job_id}/toggle")
-def toggle_cron_job(job_id: str, body: CronToggleRequest, ssh: SSHManager = Depends(get_ssh)):
+async def toggle_cron_job(job_id: str, body: CronToggleRequest, ssh: SSHManager = Depends(get_ssh)):
     """Enable or disable a scheduled job."""
     try:
-        ok, msg = ssh.toggle_cron_job(job_id, body.enabled)
+        ok, msg = await ssh.toggle_cron_job(job_id, body.enabled)
         if not ok:
             raise HTTPException(status_code=500, detail=msg)
         return {"status": "ok", "message": msg}
@@ -523,65 +720,217 @@ def toggle_cron_job(job_id: str, body: CronToggleRequest, ssh: SSHManager = Depe
         ssh.close()
 
 
-@app.post("/api/cron/{job_id}/run")
-def run_cron_job(job_id: str, ssh: SSHManager = Depends(get_ssh)):
-    """Manually run a scheduled job."""
+@app.post("/api/cron/{job_id}/run", status_code=202)
+async def run_cron_job(job_id: str, session: UserSession = Depends(get_current_session)):
+    """Start a scheduled job now and return its run handle right away.
+
+    Output streams on ``/ws/cron/runs/{run_id}``; the result is also at
+    ``GET /api/cron/runs/{run_id}``.
+    """
     try:
-        ok, msg = ssh.run_cron_job(job_id)
-        if not ok:
-            raise HTTPException(status_code=500, detail=msg)
-        return {"status": "ok", "message": msg}
-    finally:
-        ssh.close()
+        run = cron_runner.start(session, job_id)
+    except RuntimeError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return {"status": "started", "run": run.as_dict()}
+
+
+@app.get("/api/cron/runs")
+async def get_cron_runs(job_id: str | None = None, session: UserSession = Depends(get_current_session)):
+    """Recent manual runs on this host, newest first, without their output."""
+    return {"runs": [run.as_dict() for run in cron_runner.runs(session, job_id)]}
+
+
+@app.get("/api/cron/runs/{run_id}")
+async def get_cron_run(run_id: str, session: UserSession = Depends(get_current_session)):
+    """One run with its status, exit code, duration and output so far."""
+    run = cron_runner.get(session, run_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return run.as_dict(output=True)
+
+
+@app.websocket("/ws/cron/runs/{run_id}")
+async def cron_run_websocket(ws: WebSocket, run_id: str):
+    """WebSocket endpoint streaming a run's output, then its result."""
+    await cron_runner.handle(ws, run_id)
 
 
 # ── Service Control ──────────────────────────────────────────────────────────
 
 
 @app.post("/api/service/restart")
-def restart_service(ssh: SSHManager = Depends(get_ssh)):
+async def restart_service(ssh: SSHManager = Depends(get_ssh)):
     """Restart the nanobot service on the remote server."""
     try:
-        ok, msg = ssh.restart_nanobot()
+        ok, msg = await ssh.restart_nanobot()
         if not ok:
             raise HTTPException(status_code=500, detail=msg)
+        dashboard_hub.refresh(ssh.session)
         return {"status": "ok", "message": msg}
     finally:
         ssh.close()
 
 
+# ── Fleet ────────────────────────────────────────────────────────────────────
+
+
+@app.get("/api/fleet")
+async def get_fleet(session: UserSession = Depends(get_current_session)):
+    """List the hosts this login manages, its own host first."""
+    return {"hosts": [describe_member(m, session) for m in fleet_registry.members(session).values()]}
+
+
+@app.post("/api/fleet/hosts")
+async def add_fleet_host(req: LoginRequest, session: UserSession = Depends(get_current_session)):
+    """Add a host to the fleet after checking its SSH credentials."""
+    member = UserSession(host=req.host, port=req.port, username=req.username, password=req.password)
+    try:
+        await fleet_registry.add(session, member)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Cannot log in to {req.host}: {e}")
+    return describe_member(member, session)
+
+
+@app.delete("/api/fleet/hosts/{member_id}")
+async def remove_fleet_host(member_id: str, session: UserSession = Depends(get_current_session)):
+    """Remove a host from the fleet."""
+    if not fleet_registry.remove(session, member_id):
+        raise HTTPException(status_code=404, detail=f"'{member_id}' is not in the fleet")
+    return {"status": "ok"}
+
+
+class FleetRun(BaseModel):
+    # "status", "config", "patch" (JSON Merge Patch), "restart" or "cron"
+    action: str
+    hosts: list[str] | None = None  # member ids; default every host
+    patch: dict[str, Any] | None = None
+
+
+def _fleet_action(body: FleetRun) -> Callable[[SSHManager], Any]:
+    async def status(ssh: SSHManager) -> Any:
+        return await ssh.get_nanobot_status()
+
+    async def config(ssh: SSHManager) -> Any:
+        config, version = await ssh.get_nanobot_config_versioned()
+        if config is None:
+            raise RuntimeError("Config file not found on server")
+        return {"config": config, "version": version}
+
+    async def patch(ssh: SSHManager) -> Any:
+        version = await ssh.update_nanobot_config(lambda config: apply_merge_patch(config, body.patch))
+        if version is None:
+            raise RuntimeError("Failed to save config")
+        dashboard_hub.refresh(ssh.session)
+        return {"version": version}
+
+    async def restart(ssh: SSHManager) -> Any:
+        ok, msg = await ssh.restart_nanobot()
+        if not ok:
+            raise RuntimeError(msg)
+        dashboard_hub.refresh(ssh.session)
+        return {"message": msg}
+
+    async def cron(ssh: SSHManager) -> Any:
+        return await ssh.get_cron_jobs()
+
+    actions = {"status": status, "config": config, "patch": patch, "restart": restart, "cron": cron}
+    if body.action not in actions:
+        raise HTTPException(status_code=400, detail=f"Unknown action '{body.action}' (expected one of {', '.join(actions)})")
+    if body.action == "patch" and not body.patch:
+        raise HTTPException(status_code=400, detail="'patch' action needs a non-empty patch object")
+    return actions[body.action]
+
+
+@app.post("/api/fleet/run")
+async def run_fleet_action(body: FleetRun, session: UserSession = Depends(get_current_session)):
+    """Run one action on many hosts in parallel, streaming results as they arrive.
+
+    The response is NDJSON: one ``{"host", "ok", "result" | "error",
+    "elapsed_ms"}`` line per host in the order they answer, then a
+    ``{"done": true, ...}`` summary line.
+    """
+    action = _fleet_action(body)
+    members = fleet_registry.members(session)
+    if body.hosts is not None:
+        unknown = [mid for mid in body.hosts if mid not in members]
+        if unknown:
+            raise HTTPException(status_code=404, detail=f"Not in the fleet: {', '.join(unknown)}")
+        members = {mid: members[mid] for mid in dict.fromkeys(body.hosts)}
+
+    async def lines():
+        started = time.monotonic()
+        ok = failed = 0
+        async for entry in fleet_registry.fan_out(members, action):
+            if entry["ok"]:
+                ok += 1
+            else:
+                failed += 1
+            yield json.dumps(entry, default=str) + "\n"
+        elapsed_ms = round((time.monotonic() - started) * 1000)
+        yield json.dumps({"done": True, "ok": ok, "failed": failed, "elapsed_ms": elapsed_ms}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 # ── Connectivity Testing ─────────────────────────────────────────────────────
 
 
 @app.post("/api/test-connectivity")
-def test_connectivity(req: dict):
-    """Test SSH connectivity to a host on different ports."""
+async def test_connectivity(
+    req: dict, credentials: HTTPAuthorizationCredentials | None = Depends(optional_security)
+):
+    """Scan a host for ports that answer with an SSH banner, all ports at once.
+
+    Open to anyone for the configured ``port_scan_ports``, since the login
+    page uses it before there is a session. A custom ``ports`` list needs a
+    session token, so the backend can't be used as an open port scanner.
+    """
     host = req.get("host", "").strip()
     if not host:
         raise HTTPException(status_code=400, detail="Host is required")
-    
-    ports_to_try = [22, 2222, 222, 22022, 8022, 1022, 22222, 21098, 2288]
-    results = {}
-    
-    for port in ports_to_try:
-        try:
-            # Test basic TCP connectivity
-            import socket
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(5)
-            result = sock.connect_ex((host, port))
-            sock.close()
-            results[str(port)] = result == 0
-        except Exception:
-            results[str(port)] = False
-    
-    open_ports = [int(p) for p, open in results.items() if open]
-    
+    ports = req.get("ports")
+    if not ports:
+        ports = settings.port_scan_ports
+    else:
+        if credentials is None:
+            raise HTTPException(status_code=401, detail="Log in to scan ports other than the defaults")
+        session_from_token(credentials.credentials)
+        if not isinstance(ports, list) or not all(isinstance(p, int) and 0 < p < 65536 for p in ports) or len(ports) > 64:
+            raise HTTPException(status_code=400, detail="ports must be a list of up to 64 port numbers")
+
+    try:
+        scan = await port_scanner.scan(host, ports)
+    except (OSError, TimeoutError):
+        raise HTTPException(status_code=400, detail=f"Cannot resolve host: {host}")
+
+    results = {str(r.port): r.state == "ssh" for r in scan}
+    open_ports = [r.port for r in scan if r.state == "ssh"]
+    other_ports = [r.port for r in scan if r.state == "open"]
+
+    if open_ports:
+        suggestion = f"Try ports: {', '.join(map(str, open_ports))}"
+    elif other_ports:
+        suggestion = f"Ports {', '.join(map(str, other_ports))} are open but not running SSH."
+    else:
+        suggestion = "No open SSH ports found. Server may be down or firewalled."
     return {
         "host": host,
         "results": results,
+        "details": {str(r.port): r._asdict() for r in scan},
         "open_ports": open_ports,
-        "suggestion": f"Try ports: {', '.join(map(str, open_ports))}" if open_ports else "No open SSH ports found. Server may be down or firewalled."
+        "suggestion": suggestion,
+    }
+
+
+@app.get("/api/connection")
+async def get_connection_health(session: UserSession = Depends(get_current_session)):
+    """Health and round-trip times of the pooled SSH connections for this host."""
+    return {
+        "host": session.host,
+        "port": session.port,
+        "connections": ssh_engine.connection_info(session),
     }
 
 
@@ -602,6 +951,44 @@ def health():
     return {"status": "ok", "version": "1.0.0"}
 
 
+def _live_gauges():
+    # Pool stats are keyed user@host:port; fold logins together so no username reaches a label
+    hosts: dict[str, dict[str, int]] = {}
+    for key, counts in ssh_engine.stats().items():
+        totals = hosts.setdefault(key.rpartition("@")[2], {})
+        for state, count in counts.items():
+            totals[state] = totals.get(state, 0) + count
+    for host, counts in hosts.items():
+        for state in ("in_use", "idle"):
+            yield "nanobot_web_ssh_pool_connections", "Pooled SSH connections.", {"host": host, "state": state}, counts[state]
+        if "channels" in counts:
+            yield "nanobot_web_ssh_pool_channels", "Channels open over pooled connections.", {"host": host}, counts["channels"]
+    chat = chat_manager.stats()
+    yield "nanobot_web_chat_sessions", "Open chat WebSockets.", {}, chat["connections"]
+    yield "nanobot_web_chat_messages_in_flight", "Chat messages running or queued.", {}, chat["messages"]
+    yield "nanobot_web_login_sessions", "Live login sessions.", {}, session_store.live()
+
+
+metrics.gauges(_live_gauges)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(
+    credentials: HTTPAuthorizationCredentials | None = Depends(optional_security),
+):
+    """Prometheus metrics: per-route request latency and remote work, pool and chat gauges.
+
+    Scrapes need ``metrics_token`` when one is set, and a login token otherwise.
+    """
+    token = credentials.credentials if credentials is not None else ""
+    if settings.metrics_token:
+        if not secrets.compare_digest(token.encode(), settings.metrics_token.encode()):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+    else:
+        session_from_token(token)
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 # ── Static Files ─────────────────────────────────────────────────────────────
 
 
@@ -611,9 +998,10 @@ if os.path.exists("static"):
 
 
 @app.exception_handler(404)
-async def custom_404_handler(request, __):
+async def custom_404_handler(request, exc):
+    detail = getattr(exc, "detail", "Not Found")
     if request.url.path.startswith("/api"):
-        return {"detail": "Not Found"}
+        return JSONResponse({"detail": detail}, status_code=404)
     if os.path.exists("static/index.html"):
         return FileResponse("static/index.html")
-    return {"detail": "Not Found"}
+    return JSONResponse({"detail": detail}, status_code=404)
@@ -0,0 +1,334 @@
+"""Resource history — a background sampler per host recording into ring buffers."""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from array import array
+from collections.abc import Iterator
+from typing import Any
+
+from loguru import logger
+
+from auth import UserSession, session_store
+from config import settings
+from local_store import local_store
+from remote_scripts import METRICS_SCRIPT
+from ssh_manager import SSHManager
+from ssh_pool import PoolKey, pool_key
+
+# Host CPU %, 1-minute load, memory and disk in use (bytes),
+# nanobot's resident memory (bytes) and CPU % (of one core)
+FIELDS = ("cpu", "load", "mem_used", "disk_used", "proc_rss", "proc_cpu")
+_STATS = ("min", "max", "avg")
+_NAN = float("nan")
+
+# A stretch of samples: (start time, sample count, {field: (min, max, avg)})
+Span = tuple[float, int, dict[str, tuple[float, float, float]]]
+
+
+class Ring:
+    """Fixed-capacity circular buffer of timestamped rows, one typed array per column.
+
+    Times are doubles and values 32-bit floats (NaN for "no data"), so a row
+    costs a few bytes per column rather than a dict.
+    """
+
+    def __init__(self, capacity: int, columns: tuple[str, ...]):
+        self.capacity = capacity
+        self.times = array("d", [0.0]) * capacity
+        self.columns = {name: array("f", [0.0]) * capacity for name in columns}
+        self.start = 0
+        self.size = 0
+
+    def append(self, t: float, row: dict[str, float]) -> None:
+        if self.size < self.capacity:
+            i = (self.start + self.size) % self.capacity
+            self.size += 1
+        else:
+            i = self.start
+            self.start = (self.start + 1) % self.capacity
+        self.times[i] = t
+        for name, column in self.columns.items():
+            column[i] = row.get(name, _NAN)
+
+    def oldest(self) -> float | None:
+        return self.times[self.start] if self.size else None
+
+    def newest(self) -> float | None:
+        return self.times[(self.start + self.size - 1) % self.capacity] if self.size else None
+
+    def rows(self, since: float, until: float) -> Iterator[int]:
+        """Physical indexes of the rows timed within [since, until], oldest first."""
+        lo, hi = 0, self.size
+        while lo < hi:  # rows are in time order
+            mid = (lo + hi) // 2
+            if self.times[(self.start + mid) % self.capacity] < since:
+                lo = mid + 1
+            else:
+                hi = mid
+        for k in range(lo, self.size):
+            i = (self.start + k) % self.capacity
+            if self.times[i] > until:
+                break
+            yield i
+
+
+class MetricsSampler:
+    """Samples one host every ``metrics_sample_interval`` seconds.
+
+    Raw samples cover the recent past (``metrics_raw_samples`` of them).
+    Each ``metrics_rollup_seconds`` period is also folded into a min/max/avg
+    rollup; ``metrics_rollup_samples`` of those reach back days. Rollups are
+    also written to the local store and read back on first use, so they
+    survive restarts. Sampling runs while a live session is logged in with
+    the attached credentials; after that the sampler lets go of them but
+    keeps its history for the next login.
+    """
+
+    def __init__(self, key: PoolKey):
+        self.key = key
+        self.session: UserSession | None = None
+        self.ssh: SSHManager | None = None
+        self.raw = Ring(settings.metrics_raw_samples, FIELDS)
+        self.rollups = Ring(
+            settings.metrics_rollup_samples,
+            tuple(f"{field}_{stat}" for field in FIELDS for stat in _STATS) + ("n",),
+        )
+        self.latest: dict[str, Any] = {}
+        self._prev: tuple[float, dict[str, Any]] | None = None
+        self._period: float | None = None  # start of the rollup period being accumulated
+        self._acc: dict[str, list[float]] = {}  # field -> [min, max, sum, count]
+        self._count = 0
+        self._unsaved: list[tuple[float, dict[str, float]]] = []  # rollups not yet in the local store
+        self._restored: asyncio.Task | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def attach(self, session: UserSession) -> None:
+        """Sample with these credentials from the next sample on (whoever logged in last)."""
+        if session != self.session:
+            self.session, self.ssh = session, SSHManager(session)
+
+    def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        """Stop sampling and let go of the credentials; the history stays."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._detach()
+
+    def _detach(self) -> None:
+        if self.ssh is not None:
+            self.ssh.close()
+        self.session = self.ssh = None
+        self._prev = None  # the next login starts after a gap
+
+    async def restore(self) -> None:
+        """Load the rollups kept in the local store by earlier runs; only the first call reads."""
+        if self._restored is None:
+            self._restored = asyncio.create_task(self._restore())
+        await asyncio.shield(self._restored)
+
+    async def _restore(self) -> None:
+        since = time.time() - settings.metrics_rollup_samples * settings.metrics_rollup_seconds
+        try:
+            rollups = await asyncio.to_thread(local_store.metrics_rollups, self.key, since)
+        except Exception as e:
+            logger.warning("Loading metrics history of {} failed: {}", self.key[0], e)
+            return
+        for period, rollup in rollups:
+            self.rollups.append(period, rollup)
+
+    async def _save(self) -> None:
+        rollups, self._unsaved = self._unsaved, []
+        keep_since = time.time() - settings.metrics_rollup_samples * settings.metrics_rollup_seconds
+        try:
+            await asyncio.to_thread(local_store.save_metrics_rollups, self.key, rollups, keep_since)
+        except Exception as e:
+            logger.warning("Saving metrics history of {} failed: {}", self.key[0], e)
+
+    async def _run(self) -> None:
+        await self.restore()  # stored rollups go in before any new one
+        loop = asyncio.get_running_loop()
+        next_at = loop.time()
+        while self.session is not None and session_store.in_use(self.session):
+            ssh = self.ssh  # attach() may swap it during the sample
+            try:
+                data = await ssh.run_script(METRICS_SCRIPT)
+            except Exception as e:
+                logger.warning("Metrics sample on {} failed: {}", self.key[0], e)
+                data = None
+            finally:
+                ssh.close()
+            if data is None:
+                self._prev = None  # don't compute rates across the gap
+            else:
+                self.record(time.time(), data)
+            if self._unsaved:
+                await self._save()
+            next_at = max(next_at + settings.metrics_sample_interval, loop.time())
+            await asyncio.sleep(next_at - loop.time())
+        # Logged out or expired everywhere
+        self._detach()
+
+    def record(self, t: float, data: dict[str, Any]) -> None:
+        """Turn one ``METRICS_SCRIPT`` reading into a sample and store it."""
+        prev, self._prev = self._prev, (t, data)
+        row = {"load": data["load"], "mem_used": data["mem_used"], "disk_used": data["disk_used"]}
+        proc = data["proc"]
+        if proc is not None:
+            row["proc_rss"] = proc[1]
+        # CPU counters are cumulative, so usage comes from the change since the last sample
+        if prev is not None:
+            prev_t, prev_data = prev
+            elapsed = data["cpu"][0] - prev_data["cpu"][0]
+            if elapsed > 0:
+                row["cpu"] = 100 * (1 - (data["cpu"][1] - prev_data["cpu"][1]) / elapsed)
+            if proc is not None and prev_data["proc"] is not None and data["pid"] == prev_data["pid"] and t > prev_t:
+                row["proc_cpu"] = 100 * (proc[0] - prev_data["proc"][0]) / data["clk_tck"] / (t - prev_t)
+        self.latest = {
+            "time": t,
+            "pid": data["pid"],
+            "mem_total": data["mem_total"],
+            "disk_total": data["disk_total"],
+            **row,
+        }
+        self.raw.append(t, row)
+        self._roll_up(t, row)
+
+    def _roll_up(self, t: float, row: dict[str, float]) -> None:
+        period = t - t % settings.metrics_rollup_seconds
+        if self._period is not None and period != self._period:
+            self._flush_period()
+        self._period = period
+        self._count += 1
+        for name, value in row.items():
+            acc = self._acc.get(name)
+            if acc is None:
+                self._acc[name] = [value, value, value, 1]
+            else:
+                acc[0] = min(acc[0], value)
+                acc[1] = max(acc[1], value)
+                acc[2] += value
+                acc[3] += 1
+
+    def _flush_period(self) -> None:
+        rollup: dict[str, float] = {"n": self._count}
+        for name, (lo, hi, total, count) in self._acc.items():
+            rollup[f"{name}_min"], rollup[f"{name}_max"], rollup[f"{name}_avg"] = lo, hi, total / count
+        self.rollups.append(self._period, rollup)
+        self._unsaved.append((self._period, rollup))
+        self._acc, self._count = {}, 0
+
+    def _spans(self, since: float, until: float) -> tuple[Iterator[Span], float]:
+        """Stored data within the range, and its resolution in seconds."""
+        raw, rollups = self.raw, self.rollups
+        oldest_raw = raw.oldest()
+        if not rollups.size or (oldest_raw is not None and oldest_raw <= since):
+            raw_since, resolution = since, float(settings.metrics_sample_interval)
+            rollup_rows: Iterator[int] = iter(())
+        else:
+            # Rollups as far as they go, then raw samples for the period still being accumulated
+            raw_since = rollups.newest() + settings.metrics_rollup_seconds
+            resolution = float(settings.metrics_rollup_seconds)
+            rollup_rows = rollups.rows(since, until)
+
+        def spans() -> Iterator[Span]:
+            for i in rollup_rows:
+                stats = {}
+                for field in FIELDS:
+                    stats[field] = tuple(rollups.columns[f"{field}_{stat}"][i] for stat in _STATS)
+                yield rollups.times[i], int(rollups.columns["n"][i]), stats
+            for i in raw.rows(max(since, raw_since), until):
+                yield raw.times[i], 1, {f: (raw.columns[f][i],) * 3 for f in FIELDS}
+
+        return spans(), resolution
+
+    def history(self, since: float, until: float, points: int) -> dict[str, Any]:
+        """Min/max/avg of every field in up to ``points`` equal buckets over [since, until]."""
+        spans, resolution = self._spans(since, until)
+        width = max((until - since) / max(points, 1), resolution)
+        buckets: dict[int, dict[str, list[float]]] = {}
+        for t, n, stats in spans:
+            bucket = buckets.setdefault(int((t - since) // width), {})
+            for field, (lo, hi, avg) in stats.items():
+                if math.isnan(avg):
+                    continue
+                acc = bucket.get(field)
+                if acc is None:
+                    bucket[field] = [lo, hi, avg * n, n]
+                else:
+                    acc[0] = min(acc[0], lo)
+                    acc[1] = max(acc[1], hi)
+                    acc[2] += avg * n
+                    acc[3] += n
+
+        order = sorted(buckets)
+        series: dict[str, dict[str, list[float | None]]] = {f: {s: [] for s in _STATS} for f in FIELDS}
+        for index in order:
+            bucket = buckets[index]
+            for field in FIELDS:
+                acc = bucket.get(field)
+                column = series[field]
+                # Stored as 32-bit floats; more digits would only be noise
+                column["min"].append(round(acc[0], 3) if acc else None)
+                column["max"].append(round(acc[1], 3) if acc else None)
+                column["avg"].append(round(acc[2] / acc[3], 3) if acc else None)
+        return {
+            "since": since,
+            "until": until,
+            "interval": width,
+            "t": [since + index * width for index in order],
+            "series": series,
+            "latest": self.latest,
+        }
+
+
+class MetricsHub:
+    """One ``MetricsSampler`` per host account, sampling while that account has a live login.
+
+    Samplers and their history are kept after sampling stops, so the next
+    login to the same account continues the same history instead of
+    starting an empty one.
+    """
+
+    def __init__(self):
+        self._samplers: dict[PoolKey, MetricsSampler] = {}
+
+    async def track(self, session: UserSession) -> MetricsSampler:
+        """The sampler for the session's host account, started if it isn't running."""
+        key = pool_key(session)
+        sampler = self._samplers.get(key)
+        if sampler is None:
+            sampler = self._samplers[key] = MetricsSampler(key)
+        sampler.attach(session)
+        sampler.start()
+        await sampler.restore()
+        return sampler
+
+    async def history(self, session: UserSession, since: float, until: float, points: int) -> dict[str, Any]:
+        return (await self.track(session)).history(since, until, points)
+
+    def release(self, session: UserSession) -> None:
+        """Stop sampling with a login that no live session uses any more; its history stays."""
+        sampler = self._samplers.get(pool_key(session))
+        # Another login to the same account may have taken over sampling
+        if sampler is not None and sampler.session == session:
+            sampler.stop()
+
+    def close(self) -> None:
+        """Stop every sampler; called on shutdown."""
+        for sampler in self._samplers.values():
+            sampler.stop()
+        self._samplers.clear()
+
+
+metrics_hub = MetricsHub()
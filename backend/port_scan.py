@@ -0,0 +1,104 @@
+"""Concurrent SSH port scanning — finds which ports on a host really run sshd."""
+
+from __future__ import annotations
+
+import asyncio
+import socket
+import time
+from typing import NamedTuple
+
+from config import settings
+
+
+class PortResult(NamedTuple):
+    port: int
+    # "ssh": sshd answered with its banner; "open": something else accepted the
+    # connection; "closed": refused or unreachable; "timeout": no answer in time
+    state: str
+    banner: str | None = None
+    rtt_ms: float | None = None
+
+
+class PortScanner:
+    """Probes many ports at once under a single deadline, caching results briefly.
+
+    sshd sends its identification line (``SSH-2.0-...``) as soon as a client
+    connects, so a port only counts as SSH if that banner arrives; anything
+    else that merely accepts the connection is reported as "open".
+    """
+
+    def __init__(self):
+        self._cache: dict[tuple[str, int], tuple[float, PortResult]] = {}
+
+    async def scan(self, host: str, ports: list[int] | None = None, timeout: float | None = None) -> list[PortResult]:
+        """Probe ``ports`` (default ``settings.port_scan_ports``) in parallel.
+
+        Returns one result per port, in the order given, within ``timeout``
+        seconds overall. Raises ``socket.gaierror`` if the host doesn't resolve.
+        """
+        ports = list(dict.fromkeys(ports or settings.port_scan_ports))
+        timeout = settings.port_scan_timeout if timeout is None else timeout
+        now = time.monotonic()
+        results: dict[int, PortResult] = {}
+        for port in ports:
+            cached = self._cache.get((host, port))
+            if cached is not None and now - cached[0] < settings.port_scan_cache_ttl:
+                results[port] = cached[1]
+
+        todo = [port for port in ports if port not in results]
+        if todo:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            # Resolve once rather than once per port
+            infos = await asyncio.wait_for(
+                loop.getaddrinfo(host, None, type=socket.SOCK_STREAM), timeout
+            )
+            addr = infos[0][4][0]
+            probes = [asyncio.create_task(self._probe(addr, port, deadline, results)) for port in todo]
+            _, pending = await asyncio.wait(probes, timeout=max(deadline - loop.time(), 0))
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            now = time.monotonic()
+            for port in todo:
+                result = results.setdefault(port, PortResult(port, "timeout"))
+                self._cache[(host, port)] = (now, result)
+            self._prune(now)
+        return [results[port] for port in ports]
+
+    async def find_ssh_port(self, host: str, ports: list[int] | None = None) -> int | None:
+        """First port, in the order given, that answers with an SSH banner."""
+        try:
+            results = await self.scan(host, ports)
+        except (OSError, TimeoutError):
+            return None
+        return next((r.port for r in results if r.state == "ssh"), None)
+
+    async def _probe(self, addr: str, port: int, deadline: float, results: dict[int, PortResult]) -> None:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            reader, writer = await asyncio.open_connection(addr, port)
+        except OSError:
+            results[port] = PortResult(port, "closed")
+            return
+        rtt_ms = round((loop.time() - started) * 1000, 1)
+        # Recorded now so a deadline hit while waiting for the banner still reports "open"
+        results[port] = PortResult(port, "open", rtt_ms=rtt_ms)
+        try:
+            line = await asyncio.wait_for(reader.readline(), max(deadline - loop.time(), 0))
+            if line.startswith(b"SSH-"):
+                banner = line.decode("ascii", "replace").strip()
+                results[port] = PortResult(port, "ssh", banner, rtt_ms)
+        except (OSError, TimeoutError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _prune(self, now: float) -> None:
+        expired = [k for k, (at, _) in self._cache.items() if now - at >= settings.port_scan_cache_ttl]
+        for key in expired:
+            del self._cache[key]
+
+
+port_scanner = PortScanner()
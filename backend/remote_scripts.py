@@ -0,0 +1,701 @@
+"""Python snippets executed on the nanobot host by ``SSHManager.run_script``.
+
+Each script reads its arguments from ``sys.argv`` (and bulk input, if any, as
+JSON on stdin) and prints exactly one JSON document to stdout, so a whole
+batch of lookups costs a single round trip.
+They only use the standard library and must stay compatible with old system
+Python 3 interpreters.
+"""
+
+# Shared prelude: find_nanobot_pid() -> lowest pid of a python process running nanobot, or None
+_FIND_NANOBOT = r'''
+import os, re
+
+
+def find_nanobot_pid():
+    # Skip this interpreter and the shell that launched it
+    skip = {os.getpid(), os.getppid()}
+    pattern = re.compile(r"python.*nanobot")
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit() or int(entry) in skip:
+            continue
+        try:
+            with open("/proc/%s/cmdline" % entry, "rb") as f:
+                cmdline = f.read().replace(b"\0", b" ").decode("utf-8", "replace")
+        except Exception:
+            continue
+        if pattern.search(cmdline):
+            pids.append(int(entry))
+    return min(pids) if pids else None
+'''
+
+STATUS_SCRIPT = _FIND_NANOBOT + r'''
+import json, os, platform, re, sys, time
+
+want_static = "static" in sys.argv[1:]
+pid = find_nanobot_pid()
+out = {"running": pid is not None, "pid": pid}
+
+with open("/proc/uptime") as f:
+    out["uptime_seconds"] = float(f.read().split()[0])
+
+with open("/proc/loadavg") as f:
+    out["load"] = [float(x) for x in f.read().split()[:3]]
+
+meminfo = {}
+with open("/proc/meminfo") as f:
+    for line in f:
+        key, _, rest = line.partition(":")
+        meminfo[key] = int(rest.split()[0]) * 1024
+total = meminfo.get("MemTotal", 0)
+available = meminfo.get("MemAvailable", meminfo.get("MemFree", 0))
+out["memory"] = {"total": total, "used": total - available, "free": meminfo.get("MemFree", 0), "available": available}
+
+st = os.statvfs("/")
+disk_total = st.f_blocks * st.f_frsize
+disk_free = st.f_bavail * st.f_frsize
+disk_used = (st.f_blocks - st.f_bfree) * st.f_frsize
+out["disk"] = {"total": disk_total, "used": disk_used, "free": disk_free}
+
+if want_static:
+    uname = platform.uname()
+    out["static"] = {
+        "os": "%s %s %s" % (uname[0], uname[2], uname[4]),
+        "python": "Python %s" % platform.python_version(),
+    }
+
+print(json.dumps(out))
+'''
+
+SKILLS_SCRIPT = r'''
+import glob, json, os, subprocess, sys
+
+workspace_dir = os.path.expanduser(sys.argv[1])
+# Where the builtin skills were found last time, and the nanobot version they came from
+builtin_dir = sys.argv[2] if len(sys.argv) > 2 and sys.argv[2] != "-" else None
+known_version = sys.argv[3] if len(sys.argv) > 3 and sys.argv[3] != "-" else None
+
+
+def resolve_builtin_dir():
+    """Locate nanobot's bundled skills without shelling out to pip if possible."""
+    probe = "import nanobot, os; print(os.path.dirname(nanobot.__file__))"
+    interpreters = []
+    # The console script's shebang points at the interpreter nanobot is installed in
+    for d in os.environ.get("PATH", "").split(os.pathsep):
+        exe = os.path.join(d, "nanobot")
+        if os.path.isfile(exe):
+            try:
+                with open(exe, "rb") as f:
+                    first = f.readline().decode("utf-8", "replace").strip()
+                if first.startswith("#!"):
+                    interpreters.append(first[2:].split()[0])
+            except Exception:
+                pass
+            break
+    interpreters.append(sys.executable)
+    for py in interpreters:
+        try:
+            out = subprocess.check_output([py, "-c", probe], stderr=subprocess.DEVNULL, timeout=15)
+        except Exception:
+            continue
+        candidate = os.path.join(out.decode().strip(), "skills")
+        if os.path.isdir(candidate):
+            return candidate
+    for pattern in [
+        "/usr/local/lib/python*/dist-packages/nanobot/skills",
+        os.path.expanduser("~/.local/lib/python*/dist-packages/nanobot/skills"),
+    ]:
+        matches = sorted(glob.glob(pattern))
+        if matches:
+            return matches[-1]
+    try:
+        out = subprocess.check_output(["pip", "show", "nanobot"], stderr=subprocess.DEVNULL, timeout=30)
+        for line in out.decode().splitlines():
+            if line.startswith("Location:"):
+                candidate = os.path.join(line.split(":", 1)[1].strip(), "nanobot", "skills")
+                if os.path.isdir(candidate):
+                    return candidate
+    except Exception:
+        pass
+    return None
+
+
+def installed_version(skills_dir):
+    """Version of the nanobot install owning skills_dir, from one directory listing."""
+    package = os.path.dirname(skills_dir)
+    try:
+        for name in os.listdir(os.path.dirname(package)):
+            project, _, rest = name.partition("-")
+            if name.endswith(".dist-info") and project.lower() in ("nanobot", "nanobot_ai"):
+                return rest[: -len(".dist-info")]
+    except OSError:
+        pass
+    # Source checkouts have no dist-info next to the package; their files change in place
+    try:
+        return "mtime:%d" % max(os.stat(p).st_mtime for p in (skills_dir, os.path.join(package, "__init__.py")))
+    except OSError:
+        return None
+
+
+def collect(base, source):
+    found = []
+    try:
+        names = sorted(os.listdir(base))
+    except OSError:
+        return found
+    for name in names:
+        path = os.path.join(base, name, "SKILL.md")
+        try:
+            with open(path, "rb") as f:
+                content = f.read().decode("utf-8", "replace")
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            continue
+        found.append({"name": name, "source": source, "path": path, "mtime": mtime, "content": content.strip()})
+    return found
+
+
+if builtin_dir is not None and not os.path.isdir(builtin_dir):
+    builtin_dir = None  # uninstalled or moved since
+if builtin_dir is None:
+    builtin_dir = resolve_builtin_dir()
+version = installed_version(builtin_dir) if builtin_dir else None
+
+out = {"builtin_dir": builtin_dir, "version": version, "skills": collect(os.path.join(workspace_dir, "skills"), "workspace")}
+# Builtin skills only change with nanobot itself; null tells the caller its copy is current
+out["builtin"] = None if version is not None and version == known_version else (
+    collect(builtin_dir, "builtin") if builtin_dir else []
+)
+print(json.dumps(out))
+'''
+
+METRICS_SCRIPT = _FIND_NANOBOT + r'''
+import json, os
+
+out = {"clk_tck": os.sysconf("SC_CLK_TCK")}
+
+with open("/proc/stat") as f:
+    ticks = [int(x) for x in f.readline().split()[1:]]
+# idle + iowait against everything (guest time is already counted in user)
+out["cpu"] = [sum(ticks[:8]), ticks[3] + (ticks[4] if len(ticks) > 4 else 0)]
+
+with open("/proc/loadavg") as f:
+    out["load"] = float(f.read().split()[0])
+
+meminfo = {}
+with open("/proc/meminfo") as f:
+    for line in f:
+        key, _, rest = line.partition(":")
+        meminfo[key] = int(rest.split()[0]) * 1024
+total = meminfo.get("MemTotal", 0)
+out["mem_total"] = total
+out["mem_used"] = total - meminfo.get("MemAvailable", meminfo.get("MemFree", 0))
+
+st = os.statvfs("/")
+out["disk_total"] = st.f_blocks * st.f_frsize
+out["disk_used"] = (st.f_blocks - st.f_bfree) * st.f_frsize
+
+out["pid"] = pid = find_nanobot_pid()
+out["proc"] = None
+if pid is not None:
+    try:
+        with open("/proc/%d/stat" % pid) as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/%d/statm" % pid) as f:
+            resident = int(f.read().split()[1])
+        # utime + stime in clock ticks, resident set in bytes
+        out["proc"] = [int(fields[11]) + int(fields[12]), resident * os.sysconf("SC_PAGE_SIZE")]
+    except (OSError, IndexError, ValueError):
+        pass
+
+print(json.dumps(out))
+'''
+
+MEMORY_LIST_SCRIPT = r'''
+import hashlib, json, os, sys
+
+root = os.path.expanduser(sys.argv[1])
+files = []
+for dirpath, dirnames, filenames in os.walk(root):
+    dirnames.sort()
+    for name in sorted(filenames):
+        path = os.path.join(dirpath, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        # Fingerprint of path, mtime and size: changes with the file, without reading it
+        key = "%s\0%d\0%d" % (path, st.st_mtime_ns, st.st_size)
+        files.append({
+            "name": name,
+            "path": path,
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+            "hash": hashlib.sha1(key.encode()).hexdigest()[:16],
+        })
+print(json.dumps(files))
+'''
+
+SEARCH_SYNC_SCRIPT = r'''
+import glob, hashlib, json, os, sys
+
+# Workspace Markdown the search index covers; files whose fingerprint the caller
+# already has (a JSON list on stdin) come back without content
+workspace = os.path.expanduser(sys.argv[1])
+max_bytes = int(sys.argv[2])
+known = set(json.load(sys.stdin))
+
+paths = glob.glob(os.path.join(workspace, "*.md"))
+paths += glob.glob(os.path.join(workspace, "skills", "*", "SKILL.md"))
+for dirpath, dirnames, filenames in os.walk(os.path.join(workspace, "memory")):
+    dirnames.sort()
+    paths += [os.path.join(dirpath, n) for n in filenames if n.endswith(".md")]
+
+files = []
+for path in sorted(paths):
+    rel = os.path.relpath(path, workspace)
+    try:
+        st = os.stat(path)
+        key = hashlib.sha1(("%s\0%d\0%d" % (rel, st.st_mtime_ns, st.st_size)).encode()).hexdigest()[:16]
+        entry = {"path": rel, "key": key}
+        if key not in known:
+            with open(path, "rb") as f:
+                entry["content"] = f.read(max_bytes).decode("utf-8", "replace")
+    except OSError:
+        continue
+    files.append(entry)
+print(json.dumps(files))
+'''
+
+MEMORY_READ_SCRIPT = r'''
+import json, os, sys
+
+root = os.path.realpath(os.path.expanduser(sys.argv[1]))
+opts = json.loads(sys.argv[2])
+path = os.path.realpath(os.path.expanduser(opts["path"]))
+max_bytes = opts["max_bytes"]
+
+if not path.startswith(root + os.sep):
+    print(json.dumps({"error": "outside"}))
+    sys.exit(0)
+try:
+    st = os.stat(path)
+    f = open(path, "rb")
+except OSError:
+    print(json.dumps({"error": "missing"}))
+    sys.exit(0)
+
+size = st.st_size
+with f:
+    if opts.get("tail") is not None:
+        # Walk backwards in blocks until enough newlines have been seen
+        want = opts["tail"]
+        pos, data = size, b""
+        while pos > 0 and data.count(b"\n") <= want and len(data) < max_bytes:
+            step = min(1 << 16, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+        lines = data.splitlines(True)
+        if pos > 0 or len(lines) > want:
+            keep = lines[-want:] if want else []
+            data = b"".join(keep)
+        if len(data) > max_bytes:
+            data = data[-max_bytes:]
+        start = size - len(data)
+    elif opts.get("start_line") is not None:
+        first = max(opts["start_line"], 1)
+        count = opts.get("lines")
+        chunks, n, used, start = [], 0, 0, None
+        offset = 0
+        for line in f:
+            n += 1
+            if n >= first and (count is None or n < first + count) and used + len(line) <= max_bytes:
+                if start is None:
+                    start = offset
+                chunks.append(line)
+                used += len(line)
+            elif n >= first:
+                if not chunks and count != 0:
+                    # The first line alone is over the limit: return its head so the range still advances
+                    start = offset
+                    chunks.append(line[:max_bytes])
+                break
+            offset += len(line)
+        data = b"".join(chunks)
+        if start is None:
+            start = offset
+    else:
+        start = min(max(opts.get("offset") or 0, 0), size)
+        length = opts.get("length")
+        length = max_bytes if length is None else min(length, max_bytes)
+        f.seek(start)
+        data = f.read(length)
+
+end = start + len(data)
+print(json.dumps({
+    "path": path,
+    "size": size,
+    "mtime": st.st_mtime,
+    "offset": start,
+    "end": end,
+    "truncated": start > 0 or end < size,
+    "content": data.decode("utf-8", "replace"),
+}))
+'''
+
+AGENT_SCRIPT = r'''
+import asyncio, codecs, inspect, json, os, subprocess, sys
+
+session_key = sys.argv[1]
+turn_timeout = float(sys.argv[2])
+
+# stdout carries the JSON-lines protocol; whatever nanobot prints goes to stderr
+proto = os.fdopen(os.dup(1), "w")
+os.dup2(2, 1)
+sys.stdout = sys.stderr
+
+
+def emit(**msg):
+    proto.write(json.dumps(msg) + "\n")
+    proto.flush()
+
+
+def lookup(obj, dotted):
+    for attr in dotted.split("."):
+        obj = getattr(obj, attr, None)
+        if obj is None:
+            return None
+    return obj
+
+
+def build_agent():
+    """Set up an in-process agent the way ``nanobot agent`` does."""
+    from nanobot.agent.loop import AgentLoop
+    from nanobot.bus.queue import MessageBus
+    from nanobot.cli import commands
+    from nanobot.config.loader import load_config
+
+    config = load_config()
+    candidates = {
+        "bus": MessageBus(),
+        "provider": commands._make_provider(config),
+        "workspace": lookup(config, "workspace_path"),
+        "model": lookup(config, "agents.defaults.model"),
+        "temperature": lookup(config, "agents.defaults.temperature"),
+        "max_tokens": lookup(config, "agents.defaults.max_tokens"),
+        "max_iterations": lookup(config, "agents.defaults.max_tool_iterations"),
+        "memory_window": lookup(config, "agents.defaults.memory_window"),
+        "brave_api_key": lookup(config, "tools.web.search.api_key"),
+        "exec_config": lookup(config, "tools.exec"),
+        "restrict_to_workspace": lookup(config, "tools.restrict_to_workspace"),
+        "mcp_servers": lookup(config, "tools.mcp_servers"),
+    }
+    params = inspect.signature(AgentLoop).parameters
+    return AgentLoop(**{k: v for k, v in candidates.items() if k in params and v is not None})
+
+
+async def run_cli(request_id, message):
+    """Fallback when nanobot can't be imported here: one CLI run per turn, stdout streamed."""
+    proc = None
+    for argv in (["nanobot"], [sys.executable, "-m", "nanobot"]):
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *argv, "agent", "--message", message, "--session", session_key,
+                stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            )
+            break
+        except OSError:
+            continue  # not on PATH; try the module
+    if proc is None:
+        return 127, "nanobot not found"
+
+    stderr_task = asyncio.ensure_future(proc.stderr.read())
+    decoder = codecs.getincrementaldecoder("utf-8")("replace")
+    try:
+        while True:
+            chunk = await proc.stdout.read(4096)
+            text = decoder.decode(chunk, final=not chunk)
+            if text:
+                emit(id=request_id, type="delta", content=text)
+            if not chunk:
+                break
+        err = await stderr_task
+        return await proc.wait(), err.decode("utf-8", "replace")
+    except BaseException:
+        # Timed out or cancelled: don't leave the CLI running
+        stderr_task.cancel()
+        proc.kill()
+        raise
+
+
+async def run_agent(agent, request_id, message):
+    kwargs = {}
+    if "on_progress" in inspect.signature(agent.process_direct).parameters:
+        async def on_progress(content, *args, **kw):
+            emit(id=request_id, type="progress", content=content)
+        kwargs["on_progress"] = on_progress
+    content = await agent.process_direct(message, session_key, **kwargs)
+    if content:
+        emit(id=request_id, type="delta", content=content)
+    return 0, ""
+
+
+async def handle(agent, request_id, message):
+    try:
+        run = run_agent(agent, request_id, message) if agent is not None else run_cli(request_id, message)
+        code, err = await asyncio.wait_for(run, turn_timeout)
+    except asyncio.TimeoutError:
+        code, err = 124, "Timed out after %ds" % turn_timeout
+    except asyncio.CancelledError:
+        emit(id=request_id, type="done", code=130, stderr="Cancelled", cancelled=True)
+        return
+    except Exception as e:
+        code, err = 1, "%s: %s" % (type(e).__name__, e)
+    emit(id=request_id, type="done", code=code, stderr=err)
+
+
+async def main():
+    try:
+        agent = build_agent()
+        emit(type="ready", mode="agent")
+    except BaseException as e:
+        agent = None
+        emit(type="ready", mode="cli", reason="%s: %s" % (type(e).__name__, e))
+
+    # Requests run concurrently; {"cancel": id} stops one, EOF on stdin stops all
+    running = {}
+    loop = asyncio.get_running_loop()
+    while True:
+        line = await loop.run_in_executor(None, sys.stdin.readline)
+        if not line:
+            break
+        request = json.loads(line)
+        if "cancel" in request:
+            task = running.get(request["cancel"])
+            if task is not None:
+                task.cancel()
+            continue
+        request_id = request["id"]
+        task = asyncio.ensure_future(handle(agent, request_id, request["message"]))
+        running[request_id] = task
+        task.add_done_callback(lambda _, request_id=request_id: running.pop(request_id, None))
+
+    for task in list(running.values()):
+        task.cancel()
+    await asyncio.gather(*running.values(), return_exceptions=True)
+
+
+asyncio.run(main())
+# Don't linger on threads nanobot may have left behind
+os._exit(0)
+'''
+
+LOGS_SCRIPT = r'''
+import itertools, json, os, re, subprocess, sys, time
+
+opts = json.loads(sys.argv[1])
+LOG_FILE = "/tmp/nanobot.log"
+LEVELS = {"TRACE": 5, "DEBUG": 10, "INFO": 20, "SUCCESS": 25, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+LEVEL_RE = re.compile(r"\b(TRACE|DEBUG|INFO|SUCCESS|WARNING|ERROR|CRITICAL)\b")
+TIME_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2}:\d{2})")
+MAX_RECORD = 1000
+
+want = opts["lines"]
+max_bytes = opts["max_bytes"]
+min_level = LEVELS.get((opts.get("level") or "").upper(), 0)
+try:
+    pattern = re.compile(opts["pattern"]) if opts.get("pattern") else None
+except re.error as e:
+    print(json.dumps({"error": "Invalid pattern: %s" % e}))
+    sys.exit(0)
+since, until = opts.get("since"), opts.get("until")
+cursor = opts.get("cursor") or ""
+procs = []
+
+
+def line_time(line):
+    m = TIME_RE.match(line)
+    if not m:
+        return None
+    try:
+        return time.mktime(time.strptime(m.group(1) + " " + m.group(2), "%Y-%m-%d %H:%M:%S"))
+    except ValueError:
+        return None
+
+
+# A record is a line carrying a level plus the lines after it that don't
+# (tracebacks), so filters keep or drop a whole entry at once.
+def new_record(line, pos, ts):
+    m = LEVEL_RE.search(line)
+    return {"lines": [line], "level": LEVELS[m.group(1)] if m else None,
+            "time": ts if ts is not None else line_time(line), "pos": pos}
+
+
+def records_forward(entries):
+    record = None
+    for line, pos, ts in entries:
+        if record is None or record["level"] is None or len(record["lines"]) >= MAX_RECORD or LEVEL_RE.search(line):
+            if record is not None:
+                yield record
+            record = new_record(line, pos, ts)
+        else:
+            record["lines"].append(line)
+            record["pos"] = pos
+    if record is not None:
+        yield record
+
+
+def records_backward(entries):
+    pending = []  # newest first
+    for line, pos, ts in entries:
+        if LEVEL_RE.search(line):
+            record = new_record(line, pos, ts)
+            record["lines"] += [item[0] for item in reversed(pending)]
+            pending = []
+            yield record
+        else:
+            pending.append((line, pos, ts))
+            if len(pending) >= MAX_RECORD:
+                for item in pending:
+                    yield new_record(*item)
+                pending = []
+    for item in pending:
+        yield new_record(*item)
+
+
+def matches(record):
+    if min_level and (record["level"] or 0) < min_level:
+        return False
+    if since is not None and record["time"] is not None and record["time"] < since:
+        return False
+    if until is not None and record["time"] is not None and record["time"] > until:
+        return False
+    return pattern is None or any(pattern.search(line) for line in record["lines"])
+
+
+def journal_entries(*args):
+    cmd = ["journalctl", "-u", "nanobot", "--no-pager", "-o", "json"]
+    if since is not None:
+        cmd.append("--since=@%d" % since)
+    if until is not None:
+        cmd.append("--until=@%d" % (until + 1))
+    proc = subprocess.Popen(cmd + list(args), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    procs.append(proc)
+    for raw in proc.stdout:
+        try:
+            entry = json.loads(raw)
+        except ValueError:
+            continue
+        msg = entry.get("MESSAGE") or ""
+        if isinstance(msg, list):
+            msg = bytes(msg).decode("utf-8", "replace")
+        ts = int(entry.get("__REALTIME_TIMESTAMP", 0)) / 1e6
+        ident = entry.get("SYSLOG_IDENTIFIER") or "nanobot"
+        pid = entry.get("_PID")
+        prefix = "%s %s%s: " % (time.strftime("%b %d %H:%M:%S", time.localtime(ts)), ident, "[%s]" % pid if pid else "")
+        for part in msg.splitlines() or [""]:
+            yield prefix + part, "j:" + entry["__CURSOR"], ts
+
+
+def file_backward(f, end):
+    pos, rest = end - 1, b""  # skip the final newline
+    while pos > 0:
+        step = min(1 << 16, pos)
+        pos -= step
+        f.seek(pos)
+        parts = (f.read(step) + rest).split(b"\n")
+        rest = parts[0]
+        for part in reversed(parts[1:]):
+            yield part.decode("utf-8", "replace"), None, None
+    if end > 0:
+        yield rest.decode("utf-8", "replace"), None, None
+
+
+def file_forward(f, pos):
+    f.seek(pos)
+    for raw in f:
+        if not raw.endswith(b"\n"):
+            break  # still being written
+        pos += len(raw)
+        yield raw[:-1].decode("utf-8", "replace"), pos, None
+
+
+def journal_has_nanobot():
+    try:
+        out = subprocess.run(["journalctl", "-u", "nanobot", "-n", "1", "-q", "--no-pager", "-o", "cat"],
+                             stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return out.returncode == 0 and bool(out.stdout.strip())
+
+
+def newer(records, start):
+    """Matching records after the cursor, oldest first, up to the limit."""
+    out, used, more, last = [], 0, False, start
+    for record in records:
+        if until is not None and record["time"] is not None and record["time"] > until:
+            break
+        if matches(record):
+            if out and (len(out) + len(record["lines"]) > want or used >= max_bytes):
+                more = True
+                break
+            out += record["lines"]
+            used += sum(len(line) for line in record["lines"])
+        last = record["pos"]
+    return out, last, more
+
+
+def latest(records):
+    """The last matching records, oldest first."""
+    picked, count, used = [], 0, 0
+    for record in records:
+        if since is not None and record["time"] is not None and record["time"] < since:
+            break  # everything older is out of range too
+        if matches(record):
+            picked.append(record)
+            count += len(record["lines"])
+            used += sum(len(line) for line in record["lines"])
+            if count >= want or used >= max_bytes:
+                break
+    lines = [line for record in reversed(picked) for line in record["lines"]]
+    return lines[-want:] if want else []
+
+
+source, lines, new_cursor, more = None, [], None, False
+if cursor.startswith("j:") or (not cursor and journal_has_nanobot()):
+    source = "journal"
+    if cursor:
+        lines, new_cursor, more = newer(records_forward(journal_entries("--after-cursor=" + cursor[2:])), cursor)
+    else:
+        entries = journal_entries("-r")
+        first = next(entries, None)
+        if first is not None:
+            new_cursor = first[1]
+            lines = latest(records_backward(itertools.chain([first], entries)))
+elif os.path.exists(LOG_FILE):
+    source = "file"
+    st = os.stat(LOG_FILE)
+    ino, _, offset = cursor[2:].partition(":") if cursor.startswith("f:") else ("", "", "")
+    with open(LOG_FILE, "rb") as f:
+        if ino == str(st.st_ino) and offset.isdigit() and int(offset) <= st.st_size:
+            lines, end, more = newer(records_forward(file_forward(f, int(offset))), int(offset))
+        elif cursor:
+            # Rotated or truncated since the cursor was handed out: start over
+            lines, end, more = newer(records_forward(file_forward(f, 0)), 0)
+        else:
+            # Leave a line that is still being written for the next call
+            end = st.st_size
+            while end > 0:
+                f.seek(end - 1)
+                if f.read(1) == b"\n":
+                    break
+                end -= 1
+            lines = latest(records_backward(file_backward(f, end)))
+    new_cursor = "f:%d:%d" % (st.st_ino, end)
+
+for proc in procs:
+    proc.kill()
+print(json.dumps({"source": source, "lines": lines, "cursor": new_cursor, "more": more}))
+'''
@@ -0,0 +1,201 @@
+"""Workspace search — a local full-text index of skills, memory files and workspace Markdown."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import re
+import time
+from typing import Any
+
+from loguru import logger
+
+from auth import UserSession, session_store
+from config import settings
+from local_store import Document, local_store
+from remote_scripts import SEARCH_SYNC_SCRIPT
+from ssh_manager import SSHManager
+from ssh_pool import PoolKey, pool_key
+
+
+def fts_query(text: str) -> str:
+    """FTS5 query matching every word of ``text``, the last one as a prefix (search as you type)."""
+    terms = re.findall(r"\w+", text)
+    return " ".join(f'"{t}"' for t in terms) + "*" if terms else ""
+
+
+def _describe(path: str) -> tuple[str, str]:
+    """(kind, title) of a workspace-relative path."""
+    parts = path.split("/")
+    if parts[0] == "skills" and len(parts) == 3:
+        return "skill", parts[1]
+    if parts[0] == "memory":
+        return "memory", "/".join(parts[1:])
+    return "workspace", path
+
+
+def _sections(text: str, size: int = 4096) -> list[tuple[int, str]]:
+    """Split text into (first line, text) pieces of about ``size`` characters at line breaks.
+
+    Indexed separately so snippets come from a small piece rather than a
+    multi-MB memory file, and results can point at a line.
+    """
+    sections, lines, length, first = [], [], 0, 1
+    for number, line in enumerate(text.splitlines(keepends=True), 1):
+        if length + len(line) > size and lines:
+            sections.append((first, "".join(lines)))
+            lines, length, first = [], 0, number
+        lines.append(line)
+        length += len(line)
+    if lines or not sections:
+        sections.append((first, "".join(lines)))
+    return sections
+
+
+def _highlights(snippet: str) -> tuple[str, list[tuple[int, int]]]:
+    """Strip the match markers from a snippet; returns the text and the matched ranges."""
+    text, ranges, start = [], [], 0
+    for i, piece in enumerate(re.split("[\x02\x03]", snippet)):
+        if i % 2:
+            ranges.append((start, start + len(piece)))
+        text.append(piece)
+        start += len(piece)
+    return "".join(text), ranges
+
+
+class _Workspace:
+    """Index state of one host's workspace."""
+
+    def __init__(self, session: UserSession):
+        self.session = session
+        self.synced_at: float | None = None  # monotonic time of the last good sync
+        self.indexed_at: float | None = None  # and the same as a Unix timestamp
+        self.error: str | None = None
+        self.dirty = False
+        self.task: asyncio.Task | None = None
+
+
+class SearchIndex:
+    """Keeps each host's workspace Markdown in the local FTS index and answers queries from it.
+
+    A sync lists the workspace in one round trip and downloads only files
+    whose mtime or size changed. The first query after start-up, and the
+    first after a write through this API, wait for a sync. Otherwise queries
+    are answered from the index right away, and an index older than
+    ``search_refresh_interval`` is refreshed in the background.
+    """
+
+    def __init__(self):
+        self._workspaces: dict[PoolKey, _Workspace] = {}
+
+    def _workspace(self, session: UserSession) -> _Workspace:
+        workspace = self._workspaces.get(pool_key(session))
+        if workspace is None:
+            workspace = self._workspaces[pool_key(session)] = _Workspace(session)
+        # Background syncs log in with whoever searched last
+        workspace.session = session
+        return workspace
+
+    def invalidate(self, session: UserSession) -> None:
+        """Make the next search on the session's workspace sync first (after a write)."""
+        workspace = self._workspaces.get(pool_key(session))
+        if workspace is not None:
+            workspace.dirty = True
+
+    def release(self, session: UserSession) -> None:
+        """Forget a workspace's login once its last session ended; the index itself stays on disk."""
+        workspace = self._workspaces.get(pool_key(session))
+        # Another login to the same account may have searched since; it keeps the workspace
+        if workspace is None or workspace.session != session:
+            return
+        del self._workspaces[pool_key(session)]
+        if workspace.task is not None:
+            workspace.task.cancel()
+
+    def close(self) -> None:
+        """Cancel running syncs; called on shutdown."""
+        for workspace in self._workspaces.values():
+            if workspace.task is not None:
+                workspace.task.cancel()
+        self._workspaces.clear()
+
+    async def search(
+        self, session: UserSession, query: str, kinds: list[str] | None = None, limit: int = 20
+    ) -> dict[str, Any]:
+        """Ranked matches with highlighted snippets, best first."""
+        workspace = self._workspace(session)
+        if workspace.synced_at is None or workspace.dirty:
+            await asyncio.shield(self._start_sync(workspace))
+        elif time.monotonic() - workspace.synced_at > settings.search_refresh_interval:
+            self._start_sync(workspace)
+
+        match = fts_query(query)
+        rows = await asyncio.to_thread(local_store.search_documents, pool_key(session), match, kinds, limit) if match else []
+        results = []
+        for path, kind, title, line, snippet, rank in rows:
+            text, ranges = _highlights(snippet)
+            results.append({
+                "path": path,
+                "kind": kind,
+                "name": title,
+                "line": line,
+                "snippet": text,
+                "highlights": ranges,
+                "score": -rank,
+            })
+        return {"results": results, "indexed_at": workspace.indexed_at, "error": workspace.error}
+
+    def _start_sync(self, workspace: _Workspace) -> asyncio.Task:
+        if workspace.task is None or workspace.task.done():
+            workspace.task = asyncio.create_task(self._sync(workspace))
+        return workspace.task
+
+    async def _sync(self, workspace: _Workspace) -> None:
+        session = workspace.session
+        if not session_store.in_use(session):
+            return  # logged out or expired since the search; don't log in on its behalf
+        owner = pool_key(session)
+        workspace.dirty = False
+        started = time.perf_counter()
+        ssh = SSHManager(session)
+        try:
+            known = await asyncio.to_thread(local_store.document_keys, owner)
+            files = await ssh.run_script(
+                SEARCH_SYNC_SCRIPT,
+                settings.nanobot_workspace_path,
+                str(settings.search_max_file_bytes),
+                input=[key for key, _ in known.values()],
+                timeout=120,
+            )
+            if files is None:
+                raise RuntimeError("Failed to list workspace files")
+
+            changed = []
+            for f in files:
+                old = known.get(f["path"])
+                if "content" not in f or (old is not None and old[0] == f["key"]):
+                    continue
+                digest = hashlib.sha256(f["content"].encode()).hexdigest()
+                kind, title = _describe(f["path"])
+                # Touched but unchanged files only get their new fingerprint
+                sections = None if old is not None and old[1] == digest else _sections(f["content"])
+                changed.append(Document(f["path"], kind, title, f["key"], digest, sections))
+            present = {f["path"] for f in files}
+            removed = [path for path in known if path not in present]
+            await asyncio.to_thread(local_store.update_documents, owner, changed, removed)
+
+            workspace.synced_at, workspace.indexed_at, workspace.error = time.monotonic(), time.time(), None
+            if changed or removed:
+                logger.info(
+                    "Search index for {}: {} changed, {} removed of {} files in {:.0f}ms",
+                    session.host, len(changed), len(removed), len(files), (time.perf_counter() - started) * 1000,
+                )
+        except Exception as e:
+            # Keep answering from what is indexed; callers see the error
+            logger.warning("Search index sync on {} failed: {}", session.host, e)
+            workspace.error = str(e) or type(e).__name__
+        finally:
+            ssh.close()
+
+
+search_index = SearchIndex()
@@ -0,0 +1,870 @@
+"""SSH transport engines behind SSHManager.
+
+``SSHManager`` only talks to a ``RemoteConnection``: run a command, and a
+handful of SFTP primitives. Two engines provide one:
+
+* ``asyncssh`` — asyncio-native; nothing blocks a thread, and one connection
+  carries several concurrent channels.
+* ``paramiko`` — the original blocking client and pool (``ssh_pool``), with
+  each operation pushed to a worker thread.
+
+The engine is chosen with ``NANOBOT_WEB_SSH_ENGINE``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Iterable
+from dataclasses import dataclass, field
+from typing import Any, NamedTuple
+
+import asyncssh
+import paramiko
+from loguru import logger
+
+from auth import UserSession
+from config import settings
+from ssh_pool import PoolKey, describe_connect_error, open_client, pool_key, secret_digest, ssh_pool
+
+
+class ChannelOpenError(Exception):
+    """A channel could not be opened, so nothing ran remotely; safe to retry."""
+
+
+class FileStat(NamedTuple):
+    st_size: int
+    st_mtime: int
+    st_mode: int
+
+
+class RemoteProcess(ABC):
+    """A long-running remote command whose stdin stays open."""
+
+    @abstractmethod
+    async def write(self, data: str) -> None: ...
+
+    @abstractmethod
+    async def readline(self) -> str:
+        """Next line of stdout; "" once the command has exited."""
+
+    @abstractmethod
+    async def read_stderr(self) -> str:
+        """Next line of stderr; "" at EOF. Keep draining it or the channel stalls."""
+
+    @property
+    @abstractmethod
+    def exit_status(self) -> int | None: ...
+
+    @abstractmethod
+    def close(self) -> None:
+        """Close the channel; the remote command sees EOF on stdin."""
+
+
+class RemoteConnection(ABC):
+    """A connection leased from an engine's pool.
+
+    File primitives take paths the SFTP server understands (relative paths
+    are resolved against the home directory) and raise ``OSError`` on failure.
+    """
+
+    @abstractmethod
+    def is_alive(self) -> bool: ...
+
+    @property
+    @abstractmethod
+    def rtt(self) -> float | None: ...
+
+    @abstractmethod
+    def release(self, discard: bool = False) -> None: ...
+
+    @abstractmethod
+    async def exec(self, cmd: str, timeout: float, input: str | None = None) -> tuple[str, str, int]:
+        """Run a command to completion, feeding it ``input`` then EOF on stdin if given."""
+
+    @abstractmethod
+    async def open_process(self, cmd: str) -> RemoteProcess: ...
+
+    @abstractmethod
+    async def stat(self, path: str) -> FileStat | None: ...
+
+    @abstractmethod
+    async def listdir(self, path: str) -> dict[str, FileStat] | None:
+        """Entries of a directory by name, or None if it does not exist."""
+
+    @abstractmethod
+    def read_chunks(self, path: str, chunk_size: int) -> AsyncIterator[bytes]: ...
+
+    @abstractmethod
+    async def write_chunks(self, path: str, chunks: Iterable[bytes], mode: int | None = None) -> FileStat:
+        """Create or truncate a file, with permissions ``mode`` if given; returns its stat before closing."""
+
+    @abstractmethod
+    async def mkdir(self, path: str) -> None: ...
+
+    @abstractmethod
+    async def chmod(self, path: str, mode: int) -> None: ...
+
+    @abstractmethod
+    async def replace(self, src: str, dst: str) -> None:
+        """Rename ``src`` over ``dst``, replacing it."""
+
+    @abstractmethod
+    async def remove(self, path: str) -> None: ...
+
+
+# ── paramiko (threaded) ──────────────────────────────────────────────────────
+
+
+class ParamikoProcess(RemoteProcess):
+    # Each stream is read by a thread of its own: reads block until the command
+    # prints, which can be hours, and would otherwise pin the shared worker
+    # threads every other request needs. The queues are bounded, so a slow
+    # reader still stalls the channel rather than buffering without limit.
+    def __init__(self, chan: paramiko.Channel):
+        self.chan = chan
+        self._loop = asyncio.get_running_loop()
+        self._closed = False
+        self._stdout: asyncio.Queue[str] = asyncio.Queue(maxsize=256)
+        self._stderr: asyncio.Queue[str] = asyncio.Queue(maxsize=256)
+        for stream, queue in ((chan.makefile("r"), self._stdout), (chan.makefile_stderr("r"), self._stderr)):
+            threading.Thread(target=self._pump, args=(stream, queue), daemon=True).start()
+
+    def _pump(self, stream: paramiko.ChannelFile, queue: asyncio.Queue[str]) -> None:
+        try:
+            for line in stream:
+                if not self._put(queue, line):
+                    return
+        except (paramiko.SSHException, OSError):
+            pass
+        self._put(queue, "")
+
+    def _put(self, queue: asyncio.Queue[str], line: str) -> bool:
+        try:
+            future = asyncio.run_coroutine_threadsafe(queue.put(line), self._loop)
+        except RuntimeError:
+            return False  # the loop is gone
+        while not self._closed:
+            try:
+                future.result(timeout=1)
+                return True
+            except concurrent.futures.TimeoutError:
+                continue
+        future.cancel()
+        return False
+
+    @staticmethod
+    async def _next(queue: asyncio.Queue[str]) -> str:
+        line = await queue.get()
+        if not line:
+            queue.put_nowait(line)  # EOF stays EOF for later reads
+        return line
+
+    async def write(self, data: str) -> None:
+        try:
+            await asyncio.to_thread(self.chan.sendall, data.encode())
+        except (paramiko.SSHException, OSError) as e:
+            raise ConnectionError(str(e)) from e
+
+    async def readline(self) -> str:
+        return await self._next(self._stdout)
+
+    async def read_stderr(self) -> str:
+        return await self._next(self._stderr)
+
+    @property
+    def exit_status(self) -> int | None:
+        return self.chan.exit_status if self.chan.exit_status_ready() else None
+
+    def close(self) -> None:
+        self._closed = True
+        self.chan.close()
+
+
+class ParamikoConnection(RemoteConnection):
+    def __init__(self, client: paramiko.SSHClient, slot: asyncio.Semaphore):
+        self.client = client
+        self._slot: asyncio.Semaphore | None = slot
+
+    def is_alive(self) -> bool:
+        transport = self.client.get_transport()
+        return transport is not None and transport.is_active()
+
+    @property
+    def rtt(self) -> float | None:
+        return ssh_pool.rtt(self.client)
+
+    def release(self, discard: bool = False) -> None:
+        if self._slot is not None:
+            ssh_pool.release(self.client, discard=discard)
+            self._slot.release()
+            self._slot = None
+
+    def _sftp(self) -> paramiko.SFTPClient:
+        return ssh_pool.sftp(self.client)
+
+    async def _sftp_call(self, method: str, *args: Any) -> Any:
+        # Opening the SFTP session itself blocks, so resolve it in the thread too
+        return await asyncio.to_thread(lambda: getattr(self._sftp(), method)(*args))
+
+    async def exec(self, cmd: str, timeout: float, input: str | None = None) -> tuple[str, str, int]:
+        return await asyncio.to_thread(self._exec, cmd, timeout, input)
+
+    def _exec(self, cmd: str, timeout: float, input: str | None) -> tuple[str, str, int]:
+        start = time.monotonic()
+        try:
+            chan = self.client.get_transport().open_session(timeout=timeout)
+        except (paramiko.SSHException, EOFError, OSError) as e:
+            raise ChannelOpenError(str(e)) from e
+        ssh_pool.record_rtt(self.client, time.monotonic() - start)
+        try:
+            chan.settimeout(timeout)
+            chan.exec_command(cmd)
+            if input is not None:
+                chan.sendall(input.encode())
+                chan.shutdown_write()
+            stdout = chan.makefile("rb").read()
+            stderr = chan.makefile_stderr("rb").read()
+            return stdout.decode(), stderr.decode(), chan.recv_exit_status()
+        except paramiko.SSHException as e:
+            raise ConnectionError(str(e)) from e
+        finally:
+            chan.close()
+
+    async def open_process(self, cmd: str) -> RemoteProcess:
+        def _open() -> paramiko.Channel:
+            try:
+                chan = self.client.get_transport().open_session(timeout=30)
+            except (paramiko.SSHException, EOFError, OSError) as e:
+                raise ChannelOpenError(str(e)) from e
+            try:
+                chan.exec_command(cmd)
+            except paramiko.SSHException as e:
+                chan.close()
+                raise ConnectionError(str(e)) from e
+            return chan
+
+        return ParamikoProcess(await asyncio.to_thread(_open))
+
+    async def stat(self, path: str) -> FileStat | None:
+        def _stat() -> FileStat | None:
+            try:
+                attrs = self._sftp().stat(path)
+            except IOError:
+                return None
+            return FileStat(attrs.st_size, attrs.st_mtime, attrs.st_mode)
+
+        return await asyncio.to_thread(_stat)
+
+    async def listdir(self, path: str) -> dict[str, FileStat] | None:
+        def _listdir() -> dict[str, FileStat] | None:
+            try:
+                entries = self._sftp().listdir_attr(path)
+            except IOError:
+                return None
+            return {a.filename: FileStat(a.st_size or 0, a.st_mtime or 0, a.st_mode or 0) for a in entries}
+
+        return await asyncio.to_thread(_listdir)
+
+    async def read_chunks(self, path: str, chunk_size: int) -> AsyncIterator[bytes]:
+        def _open() -> paramiko.SFTPFile:
+            f = self._sftp().open(path, "rb")
+            try:
+                # Without a size, prefetch stats the file first: keep that round trip off the loop
+                f.prefetch()
+            except Exception:
+                f.close()
+                raise
+            return f
+
+        f = await asyncio.to_thread(_open)
+        try:
+            while chunk := await asyncio.to_thread(f.read, chunk_size):
+                yield chunk
+        finally:
+            await asyncio.to_thread(f.close)
+
+    async def write_chunks(self, path: str, chunks: Iterable[bytes], mode: int | None = None) -> FileStat:
+        def _write() -> FileStat:
+            with self._sftp().open(path, "wb") as f:
+                f.set_pipelined(True)
+                for chunk in chunks:
+                    f.write(chunk)
+                if mode is not None:
+                    f.chmod(mode)
+                attrs = f.stat()
+            return FileStat(attrs.st_size, attrs.st_mtime, attrs.st_mode)
+
+        return await asyncio.to_thread(_write)
+
+    async def mkdir(self, path: str) -> None:
+        await self._sftp_call("mkdir", path)
+
+    async def chmod(self, path: str, mode: int) -> None:
+        await self._sftp_call("chmod", path, mode)
+
+    async def replace(self, src: str, dst: str) -> None:
+        def _replace() -> None:
+            sftp = self._sftp()
+            try:
+                sftp.posix_rename(src, dst)
+            except IOError:
+                # Server lacks posix-rename@openssh.com; plain rename won't overwrite
+                try:
+                    sftp.remove(dst)
+                except FileNotFoundError:
+                    pass
+                sftp.rename(src, dst)
+
+        await asyncio.to_thread(_replace)
+
+    async def remove(self, path: str) -> None:
+        await self._sftp_call("remove", path)
+
+
+class DedicatedParamikoConnection(ParamikoConnection):
+    """A connection of its own, outside the pool and its per-host cap, closed on release.
+
+    For channels that stay open for minutes or hours: with exclusive leases,
+    a chat, a log tail and a couple of cron runs would otherwise hold every
+    pooled connection to the host and leave requests waiting for a slot.
+    """
+
+    def __init__(self, client: paramiko.SSHClient):
+        self.client = client
+        self._sftp_client: paramiko.SFTPClient | None = None
+        self._released = False
+
+    @property
+    def rtt(self) -> float | None:
+        return None
+
+    def release(self, discard: bool = False) -> None:
+        if not self._released:
+            self._released = True
+            self.client.close()
+
+    def _sftp(self) -> paramiko.SFTPClient:
+        if self._sftp_client is None:
+            self._sftp_client = self.client.open_sftp()
+        return self._sftp_client
+
+
+class ParamikoEngine:
+    """Blocking paramiko client; every remote operation runs in a worker thread."""
+
+    name = "paramiko"
+
+    def __init__(self):
+        # Callers queue here rather than inside ssh_pool.acquire(), where each
+        # waiter would pin a worker thread that lease holders need to finish.
+        self._slots: dict[PoolKey, asyncio.Semaphore] = {}
+
+    async def acquire(self, session: UserSession) -> RemoteConnection:
+        slot = self._slots.setdefault(pool_key(session), asyncio.Semaphore(ssh_pool.max_per_host))
+        try:
+            await asyncio.wait_for(slot.acquire(), ssh_pool.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise Exception(
+                f"Too many concurrent SSH connections to {session.host}:{session.port}. Try again shortly."
+            )
+        try:
+            client = await asyncio.to_thread(ssh_pool.acquire, session)
+        except BaseException:
+            slot.release()
+            raise
+        return ParamikoConnection(client, slot)
+
+    async def acquire_long_lived(self, session: UserSession) -> RemoteConnection:
+        """A connection for a channel kept open indefinitely; leases are exclusive, so not a pooled one."""
+        client = await asyncio.to_thread(open_client, session)
+        logger.debug("Opened dedicated SSH connection to {}@{}:{}", session.username, session.host, session.port)
+        return DedicatedParamikoConnection(client)
+
+    async def authenticate(self, session: UserSession) -> None:
+        await asyncio.to_thread(ssh_pool.authenticate, session)
+
+    async def start(self) -> None:
+        ssh_pool.start()
+
+    async def close_idle(self, session: UserSession) -> int:
+        return await asyncio.to_thread(ssh_pool.close_idle, session)
+
+    async def close(self) -> None:
+        await asyncio.to_thread(ssh_pool.close_all)
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return ssh_pool.stats()
+
+    def connection_info(self, session: UserSession) -> list[dict[str, Any]]:
+        return ssh_pool.connection_info(session)
+
+
+# ── asyncssh (native asyncio) ────────────────────────────────────────────────
+
+
+async def open_asyncssh_connection(session: UserSession) -> asyncssh.SSHClientConnection:
+    """Open and authenticate a new asyncssh connection."""
+    try:
+        return await asyncssh.connect(
+            session.host,
+            port=session.port,
+            username=session.username,
+            password=session.password,
+            known_hosts=None,
+            client_keys=None,
+            agent_path=None,
+            connect_timeout=30,
+            login_timeout=30,
+            keepalive_interval=settings.ssh_keepalive_interval,
+            keepalive_count_max=3,
+        )
+    except asyncssh.PermissionDenied:
+        raise Exception("Authentication failed. Check username/password.")
+    except asyncssh.HostKeyNotVerifiable:
+        raise Exception("Host key verification failed.")
+    except asyncssh.Error as e:
+        raise Exception(f"SSH protocol error: {e}")
+    except Exception as e:
+        raise Exception(describe_connect_error(session, e))
+
+
+@dataclass
+class AsyncPooledConnection:
+    conn: asyncssh.SSHClientConnection
+    secret: str
+    created: float
+    last_used: float
+    leases: int = 0
+    rtt: float | None = None
+    _sftp: asyncssh.SFTPClient | None = field(default=None, repr=False)
+    _sftp_lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+
+    def is_alive(self) -> bool:
+        return not self.conn.is_closed()
+
+    def record_rtt(self, seconds: float) -> None:
+        self.rtt = seconds if self.rtt is None else 0.8 * self.rtt + 0.2 * seconds
+
+    async def sftp(self) -> asyncssh.SFTPClient:
+        async with self._sftp_lock:
+            if self._sftp is None:
+                self._sftp = await self.conn.start_sftp_client()
+            return self._sftp
+
+    def close(self) -> None:
+        if self._sftp is not None:
+            self._sftp.exit()
+        self.conn.close()
+
+
+class AsyncSSHPool:
+    """Pool of asyncssh connections, keyed like ``SSHPool``.
+
+    Unlike the paramiko pool, a connection is shared: up to ``max_sessions``
+    leases run channels over it concurrently before another connection
+    (at most ``max_per_host``) is opened. Dead peers are detected by
+    asyncssh's own keepalives; a monitor task reaps idle connections and
+    measures RTT with an SFTP stat.
+    """
+
+    def __init__(
+        self,
+        max_per_host: int = 4,
+        max_sessions: int = 8,
+        idle_timeout: float = 300,
+        acquire_timeout: float = 30,
+        health_interval: float = 30,
+        probe_timeout: float = 10,
+    ):
+        self.max_per_host = max_per_host
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.health_interval = health_interval
+        self.probe_timeout = probe_timeout
+        self._conns: dict[PoolKey, list[AsyncPooledConnection]] = {}
+        self._opening: dict[PoolKey, int] = {}
+        self._changed: asyncio.Event | None = None
+        self._monitor: asyncio.Task | None = None
+
+    def _event(self) -> asyncio.Event:
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        return self._changed
+
+    def _notify(self) -> None:
+        event = self._event()
+        event.set()
+        event.clear()
+
+    async def acquire(self, session: UserSession) -> AsyncPooledConnection:
+        key = pool_key(session)
+        secret = secret_digest(session)
+        deadline = time.monotonic() + self.acquire_timeout
+
+        while True:
+            conns = self._conns.setdefault(key, [])
+            for entry in [e for e in conns if e.leases == 0 and (e.secret != secret or not e.is_alive())]:
+                conns.remove(entry)
+                entry.close()
+            usable = [e for e in conns if e.secret == secret and e.is_alive() and e.leases < self.max_sessions]
+            if usable:
+                entry = min(usable, key=lambda e: e.leases)
+                entry.leases += 1
+                return entry
+            if len(conns) + self._opening.get(key, 0) < self.max_per_host:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise Exception(
+                    f"Too many concurrent SSH connections to {session.host}:{session.port}. Try again shortly."
+                )
+            try:
+                await asyncio.wait_for(self._event().wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+        self._opening[key] = self._opening.get(key, 0) + 1
+        try:
+            conn = await open_asyncssh_connection(session)
+        except Exception:
+            self._opening[key] -= 1
+            self._notify()
+            raise
+
+        self._opening[key] -= 1
+        now = time.monotonic()
+        entry = AsyncPooledConnection(conn=conn, secret=secret, created=now, last_used=now, leases=1)
+        self._conns.setdefault(key, []).append(entry)
+        # Waiters may share the new connection's spare sessions
+        self._notify()
+        logger.debug("Opened asyncssh connection to {}@{}:{}", session.username, session.host, session.port)
+        return entry
+
+    def release(self, entry: AsyncPooledConnection, discard: bool = False) -> None:
+        entry.leases -= 1
+        entry.last_used = time.monotonic()
+        if discard or not entry.is_alive():
+            for conns in self._conns.values():
+                if entry in conns:
+                    conns.remove(entry)
+            entry.close()
+        self._notify()
+
+    async def authenticate(self, session: UserSession) -> None:
+        """Verify credentials with a fresh handshake and keep the connection warm."""
+        conn = await open_asyncssh_connection(session)
+        key = pool_key(session)
+        conns = self._conns.setdefault(key, [])
+        if len(conns) + self._opening.get(key, 0) < self.max_per_host:
+            now = time.monotonic()
+            conns.append(AsyncPooledConnection(conn=conn, secret=secret_digest(session), created=now, last_used=now))
+            self._notify()
+        else:
+            conn.close()
+
+    async def probe(self, entry: AsyncPooledConnection) -> bool:
+        start = time.monotonic()
+        try:
+            sftp = await asyncio.wait_for(entry.sftp(), self.probe_timeout)
+            await asyncio.wait_for(sftp.stat("."), self.probe_timeout)
+        except Exception as e:
+            logger.warning("SSH health probe failed: {}", e)
+            entry.close()
+            return False
+        entry.record_rtt(time.monotonic() - start)
+        return True
+
+    async def check_health(self) -> None:
+        for key, conns in list(self._conns.items()):
+            for entry in list(conns):
+                # Probes yield to the loop, so later entries may have been leased or dropped meanwhile
+                if entry.leases or entry not in conns:
+                    continue
+                idle = time.monotonic() - entry.last_used
+                if idle > self.idle_timeout or not entry.is_alive():
+                    conns.remove(entry)
+                    entry.close()
+                elif idle > self.health_interval:
+                    await self.probe(entry)
+            if not conns and not self._opening.get(key) and self._conns.get(key) is conns:
+                self._conns.pop(key, None)
+        self._notify()
+
+    async def _monitor_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.check_health()
+            except Exception as e:
+                logger.error("SSH pool monitor error: {}", e)
+
+    def start(self) -> None:
+        if self._monitor is None or self._monitor.done():
+            self._monitor = asyncio.create_task(self._monitor_loop())
+
+    def close_idle(self, session: UserSession) -> int:
+        key = pool_key(session)
+        secret = secret_digest(session)
+        conns = self._conns.get(key, [])
+        closed = [e for e in conns if e.secret == secret and not e.leases]
+        for entry in closed:
+            conns.remove(entry)
+            entry.close()
+        if closed:
+            self._notify()
+        return len(closed)
+
+    async def close_all(self) -> None:
+        if self._monitor is not None:
+            self._monitor.cancel()
+            self._monitor = None
+        for conns in self._conns.values():
+            for entry in conns:
+                entry.close()
+        self._conns.clear()
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {
+            f"{key[2]}@{key[0]}:{key[1]}": {
+                "in_use": sum(1 for e in conns if e.leases),
+                "idle": sum(1 for e in conns if not e.leases),
+                "channels": sum(e.leases for e in conns),
+            }
+            for key, conns in self._conns.items()
+            if conns
+        }
+
+    def connection_info(self, session: UserSession) -> list[dict[str, Any]]:
+        now = time.monotonic()
+        return [
+            {
+                "state": "in_use" if entry.leases else "idle",
+                "alive": entry.is_alive(),
+                "rtt_ms": round(entry.rtt * 1000, 1) if entry.rtt is not None else None,
+                "age": round(now - entry.created),
+                "idle_for": 0 if entry.leases else round(now - entry.last_used),
+                "channels": entry.leases,
+            }
+            for entry in self._conns.get(pool_key(session), [])
+        ]
+
+
+class AsyncSSHProcess(RemoteProcess):
+    def __init__(self, proc: asyncssh.SSHClientProcess):
+        self.proc = proc
+
+    async def write(self, data: str) -> None:
+        try:
+            self.proc.stdin.write(data)
+            await self.proc.stdin.drain()
+        except (asyncssh.Error, BrokenPipeError) as e:
+            raise ConnectionError(str(e)) from e
+
+    async def readline(self) -> str:
+        try:
+            return await self.proc.stdout.readline()
+        except (asyncssh.Error, BrokenPipeError):
+            return ""
+
+    async def read_stderr(self) -> str:
+        try:
+            return await self.proc.stderr.readline()
+        except (asyncssh.Error, BrokenPipeError):
+            return ""
+
+    @property
+    def exit_status(self) -> int | None:
+        return self.proc.exit_status
+
+    def close(self) -> None:
+        self.proc.close()
+
+
+class AsyncSSHConnection(RemoteConnection):
+    def __init__(self, pool: AsyncSSHPool, entry: AsyncPooledConnection):
+        self.pool = pool
+        self.entry = entry
+        self._released = False
+
+    def is_alive(self) -> bool:
+        return self.entry.is_alive()
+
+    @property
+    def rtt(self) -> float | None:
+        return self.entry.rtt
+
+    def release(self, discard: bool = False) -> None:
+        if not self._released:
+            self._released = True
+            self.pool.release(self.entry, discard=discard)
+
+    async def exec(self, cmd: str, timeout: float, input: str | None = None) -> tuple[str, str, int]:
+        try:
+            result = await self.entry.conn.run(
+                cmd, input=input, check=False, timeout=timeout, encoding="utf-8", errors="replace"
+            )
+        except asyncssh.ChannelOpenError as e:
+            raise ChannelOpenError(str(e)) from e
+        except asyncssh.TimeoutError as e:
+            raise TimeoutError(f"Remote command timed out after {timeout}s") from e
+        except (asyncssh.ConnectionLost, asyncssh.DisconnectError) as e:
+            raise ConnectionError(str(e)) from e
+        code = result.exit_status if result.exit_status is not None else -1
+        return result.stdout or "", result.stderr or "", code
+
+    async def open_process(self, cmd: str) -> RemoteProcess:
+        try:
+            proc = await self.entry.conn.create_process(cmd, encoding="utf-8", errors="replace")
+        except asyncssh.ChannelOpenError as e:
+            raise ChannelOpenError(str(e)) from e
+        except (asyncssh.ConnectionLost, asyncssh.DisconnectError) as e:
+            raise ConnectionError(str(e)) from e
+        return AsyncSSHProcess(proc)
+
+    async def _sftp(self) -> asyncssh.SFTPClient:
+        try:
+            return await self.entry.sftp()
+        except asyncssh.Error as e:
+            raise ConnectionError(str(e)) from e
+
+    async def stat(self, path: str) -> FileStat | None:
+        sftp = await self._sftp()
+        start = time.monotonic()
+        try:
+            attrs = await sftp.stat(path)
+        except asyncssh.SFTPNoSuchFile:
+            return None
+        except asyncssh.SFTPError as e:
+            raise OSError(str(e)) from e
+        # A stat is a single request/response, so it doubles as an RTT sample
+        self.entry.record_rtt(time.monotonic() - start)
+        return FileStat(attrs.size or 0, attrs.mtime or 0, attrs.permissions or 0)
+
+    async def listdir(self, path: str) -> dict[str, FileStat] | None:
+        sftp = await self._sftp()
+        try:
+            entries = await sftp.readdir(path)
+        except asyncssh.SFTPNoSuchFile:
+            return None
+        except asyncssh.SFTPError as e:
+            raise OSError(str(e)) from e
+        return {
+            e.filename: FileStat(e.attrs.size or 0, e.attrs.mtime or 0, e.attrs.permissions or 0)
+            for e in entries
+            if e.filename not in (".", "..")
+        }
+
+    async def read_chunks(self, path: str, chunk_size: int) -> AsyncIterator[bytes]:
+        sftp = await self._sftp()
+        try:
+            async with sftp.open(path, "rb") as f:
+                while chunk := await f.read(chunk_size):
+                    yield chunk
+        except asyncssh.SFTPError as e:
+            raise OSError(str(e)) from e
+
+    async def write_chunks(self, path: str, chunks: Iterable[bytes], mode: int | None = None) -> FileStat:
+        sftp = await self._sftp()
+        try:
+            async with sftp.open(path, "wb") as f:
+                for chunk in chunks:
+                    await f.write(chunk)
+                if mode is not None:
+                    # The server answers in order, so the stat already sees the new mode
+                    _, attrs = await asyncio.gather(f.chmod(mode), f.stat())
+                else:
+                    attrs = await f.stat()
+        except asyncssh.SFTPNoSuchFile as e:
+            raise FileNotFoundError(str(e)) from e
+        except asyncssh.SFTPError as e:
+            raise OSError(str(e)) from e
+        return FileStat(attrs.size or 0, attrs.mtime or 0, attrs.permissions or 0)
+
+    async def mkdir(self, path: str) -> None:
+        try:
+            await (await self._sftp()).mkdir(path)
+        except asyncssh.SFTPError as e:
+            raise OSError(str(e)) from e
+
+    async def chmod(self, path: str, mode: int) -> None:
+        try:
+            await (await self._sftp()).chmod(path, mode)
+        except asyncssh.SFTPError as e:
+            raise OSError(str(e)) from e
+
+    async def replace(self, src: str, dst: str) -> None:
+        sftp = await self._sftp()
+        try:
+            try:
+                await sftp.posix_rename(src, dst)
+            except asyncssh.SFTPOpUnsupported:
+                # Plain SFTP rename won't overwrite an existing file
+                try:
+                    await sftp.remove(dst)
+                except asyncssh.SFTPNoSuchFile:
+                    pass
+                await sftp.rename(src, dst)
+        except asyncssh.SFTPError as e:
+            raise OSError(str(e)) from e
+
+    async def remove(self, path: str) -> None:
+        try:
+            await (await self._sftp()).remove(path)
+        except asyncssh.SFTPError as e:
+            raise OSError(str(e)) from e
+
+
+class AsyncSSHEngine:
+    """asyncssh client; remote I/O never occupies a thread."""
+
+    name = "asyncssh"
+
+    def __init__(self):
+        self.pool = AsyncSSHPool(
+            max_per_host=settings.ssh_pool_max_per_host,
+            max_sessions=settings.ssh_pool_max_sessions,
+            idle_timeout=settings.ssh_pool_idle_timeout,
+            acquire_timeout=settings.ssh_pool_acquire_timeout,
+            health_interval=settings.ssh_health_interval,
+        )
+
+    async def acquire(self, session: UserSession) -> RemoteConnection:
+        return AsyncSSHConnection(self.pool, await self.pool.acquire(session))
+
+    async def acquire_long_lived(self, session: UserSession) -> RemoteConnection:
+        """A connection for a channel kept open indefinitely; pooled ones multiplex, so it takes one lease."""
+        return await self.acquire(session)
+
+    async def authenticate(self, session: UserSession) -> None:
+        await self.pool.authenticate(session)
+
+    async def start(self) -> None:
+        self.pool.start()
+
+    async def close_idle(self, session: UserSession) -> int:
+        return self.pool.close_idle(session)
+
+    async def close(self) -> None:
+        await self.pool.close_all()
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return self.pool.stats()
+
+    def connection_info(self, session: UserSession) -> list[dict[str, Any]]:
+        return self.pool.connection_info(session)
+
+
+def create_engine(name: str) -> ParamikoEngine | AsyncSSHEngine:
+    if name == "paramiko":
+        return ParamikoEngine()
+    if name == "asyncssh":
+        return AsyncSSHEngine()
+    raise ValueError(f"Unknown SSH engine '{name}' (expected 'asyncssh' or 'paramiko')")
+
+
+ssh_engine = create_engine(settings.ssh_engine)
@@ -1,262 +1,692 @@
 from __future__ import annotations
 
+import asyncio
+import copy
+import hashlib
 import json
-import paramiko
+import math
+import shlex
+import time
+import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable, Iterator
+from dataclasses import dataclass
+from stat import S_IMODE, S_ISDIR
+from typing import Any, TypeVar
+
 from loguru import logger
 
+import telemetry
 from auth import UserSession
 from config import settings
+from local_store import BuiltinSkills, local_store
+from port_scan import port_scanner
+from remote_scripts import LOGS_SCRIPT, MEMORY_LIST_SCRIPT, MEMORY_READ_SCRIPT, SKILLS_SCRIPT, STATUS_SCRIPT
+from ssh_engines import ChannelOpenError, FileStat, RemoteConnection, RemoteProcess, ssh_engine
+from ssh_pool import pool_key
+
+T = TypeVar("T")
+
+# Ensure common local bin paths are in PATH for non-interactive sessions
+_PATH_PREFIX = "export PATH=$PATH:$HOME/.local/bin:/usr/local/bin && "
+_PYTHON = "$(command -v python3 || command -v python)"
+# The interpreter nanobot is installed into, taken from its console script's shebang
+NANOBOT_PYTHON = f"""$(sed -n '1s/^#!//p' "$(command -v nanobot)" 2>/dev/null | grep python || echo {_PYTHON})"""
+
+
+class ConfigConflictError(Exception):
+    """config.json changed since the version the caller based its update on."""
+
+    def __init__(self, current_version: str | None):
+        super().__init__("Config was modified by someone else")
+        self.current_version = current_version
+
+
+@dataclass
+class CachedConfig:
+    mtime: int
+    size: int
+    mode: int
+    version: str
+    config: dict[str, Any]
+
+
+# (host, port) -> (fetched_at, {"os": ..., "python": ...}); these rarely change
+_static_facts: dict[tuple[str, int], tuple[float, dict[str, str]]] = {}
+
+# (host, port, username, config path) -> last parsed config.json. The path is
+# relative to the login's home, so each login on a host has its own file.
+_config_cache: dict[tuple[str, int, str, str], CachedConfig] = {}
+_config_locks: dict[tuple[str, int, str, str], asyncio.Lock] = {}
+
+# (host, port) -> when resolution last found no install; retried after a while.
+# Found installs and their skills are kept in the local store, keyed by version.
+_builtin_skill_misses: dict[tuple[str, int], float] = {}
+_BUILTIN_MISS_TTL = 300
+
+
+@dataclass
+class SkillEntry:
+    path: str
+    source: str  # "workspace" or "builtin"
+    mtime: float
+
+
+# (host, port, username) -> skill name -> where its SKILL.md lives. Rebuilt by
+# list_skills() and refreshed from a listing of the skills directory otherwise.
+_skill_index: dict[tuple[str, int, str], dict[str, SkillEntry]] = {}
+
+
+def _format_bytes(num: float, suffix: str = "") -> str:
+    """Human-readable size in the style of ``free -h`` / ``df -h``."""
+    if abs(num) < 1024:
+        return f"{int(num)}B"
+    for unit in ["K", "M", "G", "T"]:
+        num /= 1024
+        if abs(num) < 1024 or unit == "T":
+            break
+    return f"{num:.1f}{unit}{suffix}" if abs(num) < 10 else f"{num:.0f}{unit}{suffix}"
+
+
+def _format_uptime(seconds: float) -> str:
+    """Format seconds like ``uptime -p``."""
+    minutes = int(seconds // 60)
+    days, minutes = divmod(minutes, 1440)
+    hours, minutes = divmod(minutes, 60)
+    parts = []
+    if days:
+        parts.append(f"{days} day{'s' if days != 1 else ''}")
+    if hours:
+        parts.append(f"{hours} hour{'s' if hours != 1 else ''}")
+    if minutes or not parts:
+        parts.append(f"{minutes} minute{'s' if minutes != 1 else ''}")
+    return "up " + ", ".join(parts)
 
 
 class SSHManager:
-    """Manages SSH connections to nanobot servers."""
+    """Manages SSH connections to nanobot servers.
+
+    ``long_lived`` is for managers that hold one channel open for as long as
+    a WebSocket or job lasts (chat agents, log tails, cron runs); the engine
+    then gives them a connection that doesn't take a pooled one out of use.
+    """
 
-    def __init__(self, session: UserSession):
+    def __init__(self, session: UserSession, long_lived: bool = False):
         self.session = session
-        self._client: paramiko.SSHClient | None = None
+        self.long_lived = long_lived
+        self._conn: RemoteConnection | None = None
+
+    async def connect(self) -> RemoteConnection:
+        """Borrow a connection from the shared pool."""
+        if self._conn is not None:
+            if self._conn.is_alive():
+                return self._conn
+            self._discard()
+
+        with telemetry.remote(self.session, "connect"):
+            if self.long_lived:
+                self._conn = await ssh_engine.acquire_long_lived(self.session)
+            else:
+                self._conn = await ssh_engine.acquire(self.session)
+        return self._conn
 
-    def connect(self) -> paramiko.SSHClient:
-        """Establish SSH connection."""
-        if self._client is not None:
-            try:
-                self._client.exec_command("echo ok", timeout=5)
-                return self._client
-            except Exception:
-                self._client = None
+    def _discard(self) -> None:
+        if self._conn is not None:
+            self._conn.release(discard=True)
+            self._conn = None
 
-        client = paramiko.SSHClient()
-        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        
-        # Try to connect with better error handling
-        try:
-            client.connect(
-                hostname=self.session.host,
-                port=self.session.port,
-                username=self.session.username,
-                password=self.session.password,
-                timeout=30,  # Increased timeout
-                look_for_keys=False,
-                allow_agent=False,
-                banner_timeout=30,
-                auth_timeout=30,
-            )
-        except paramiko.AuthenticationException:
-            raise Exception("Authentication failed. Check username/password.")
-        except paramiko.SSHException as e:
-            raise Exception(f"SSH protocol error: {e}")
-        except paramiko.BadHostKeyException:
-            raise Exception("Host key verification failed.")
-        except Exception as e:
-            error_msg = str(e).lower()
-            if "timeout" in error_msg or "connection refused" in error_msg:
-                raise Exception(f"Cannot connect to {self.session.host}:{self.session.port}. Server may be down, port may be blocked, or SSH service not running.")
-            elif "no route to host" in error_msg:
-                raise Exception(f"No route to host {self.session.host}. Check the IP address and network connectivity.")
-            elif "network is unreachable" in error_msg:
-                raise Exception(f"Network unreachable. Check your internet connection.")
-            else:
-                raise Exception(f"Connection failed: {e}")
-        
-        self._client = client
-        return client
+    @property
+    def rtt(self) -> float | None:
+        """Smoothed round-trip time of the current connection, in seconds."""
+        return self._conn.rtt if self._conn is not None else None
 
     @staticmethod
-    def test_connectivity(host: str, port: int = 22, timeout: int = 10) -> bool:
-        """Test basic TCP connectivity to a host:port."""
-        import socket
+    async def test_connectivity(host: str, port: int = 22, timeout: float = 10) -> bool:
+        """Check whether sshd answers on host:port."""
         try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(timeout)
-            result = sock.connect_ex((host, port))
-            sock.close()
-            return result == 0
-        except Exception:
+            [result] = await port_scanner.scan(host, [port], timeout=timeout)
+        except (OSError, TimeoutError):
             return False
+        return result.state == "ssh"
 
     @staticmethod
-    def find_ssh_port(host: str, ports: list[int] = None) -> int | None:
-        """Try to find an open SSH port on the host."""
-        if ports is None:
-            ports = [22, 2222, 222, 22022, 8022, 1022]  # Common SSH ports
-        
-        for port in ports:
-            if SSHManager.test_connectivity(host, port, timeout=5):
-                return port
-        return None
+    async def find_ssh_port(host: str, ports: list[int] | None = None) -> int | None:
+        """Try to find an open SSH port on the host (all candidates probed at once)."""
+        return await port_scanner.find_ssh_port(host, ports)
 
     def close(self) -> None:
-        if self._client:
-            self._client.close()
-            self._client = None
-
-    def exec_command(self, cmd: str, timeout: int = 30) -> tuple[str, str, int]:
-        """Execute a command and return (stdout, stderr, exit_code)."""
-        client = self.connect()
-        # Ensure common local bin paths are in PATH for non-interactive sessions
-        path_prefix = "export PATH=$PATH:$HOME/.local/bin:/usr/local/bin && "
-        _, stdout, stderr = client.exec_command(f"{path_prefix}{cmd}", timeout=timeout)
-        exit_code = stdout.channel.recv_exit_status()
-        return stdout.read().decode(), stderr.read().decode(), exit_code
-
-    def read_file(self, path: str) -> str | None:
-        """Read a file from the remote server."""
-        stdout, stderr, code = self.exec_command(f"cat {path}")
+        """Hand the borrowed connection back to the pool."""
+        if self._conn:
+            self._conn.release()
+            self._conn = None
+
+    async def _on_channel(self, open_channel: Callable[[RemoteConnection], Awaitable[T]]) -> T:
+        """Run ``open_channel`` on the pooled connection, reconnecting once if it died."""
+        for attempt in range(2):
+            conn = await self.connect()
+            try:
+                with telemetry.remote(self.session, "command"):
+                    return await open_channel(conn)
+            except ChannelOpenError:
+                # Nothing has run remotely yet, so retrying on a fresh connection is safe
+                self._discard()
+                if attempt:
+                    raise
+            except (ConnectionError, TimeoutError):
+                # Never return a connection in an unknown state to the pool
+                self._discard()
+                raise
+        raise AssertionError("unreachable")
+
+    async def exec_command(self, cmd: str, timeout: int = 30, input: str | None = None) -> tuple[str, str, int]:
+        """Execute a command, with ``input`` on its stdin if given, and return (stdout, stderr, exit_code)."""
+        full = f"{_PATH_PREFIX}{cmd}"
+        stdout, stderr, code = await self._on_channel(lambda conn: conn.exec(full, timeout, input))
+        sent = len(full.encode()) + (len(input.encode()) if input is not None else 0)
+        received = len(stdout.encode()) + len(stderr.encode())
+        telemetry.transferred(self.session, sent=sent, received=received)
+        return stdout, stderr, code
+
+    async def run_script(self, script: str, *args: str, input: Any = None, timeout: int = 30) -> Any:
+        """Run a Python script on the remote host and parse its JSON output.
+
+        ``input`` goes to the script's stdin as JSON, for data too big for a
+        command line (Linux caps a single argument at 128 KiB).
+        """
+        if input is None:
+            quoted = " ".join(shlex.quote(a) for a in args)
+            stdout, stderr, code = await self.exec_command(
+                f"{_PYTHON} - {quoted} << 'NANOBOT_PY'\n{script}\nNANOBOT_PY",
+                timeout=timeout,
+            )
+        else:
+            # stdin carries the input, so the script goes on the command line
+            quoted = " ".join(shlex.quote(a) for a in (script, *args))
+            stdout, stderr, code = await self.exec_command(
+                f"{_PYTHON} -c {quoted}", timeout=timeout, input=json.dumps(input)
+            )
         if code != 0:
-            return None
-        return stdout
-
-    def write_file(self, path: str, content: str) -> bool:
-        """Write content to a file on the remote server."""
-        # Escape single quotes in content
-        escaped = content.replace("'", "'\\''")
-        _, stderr, code = self.exec_command(
-            f"mkdir -p $(dirname {path}) && cat > {path} << 'NANOBOT_EOF'\n{escaped}\nNANOBOT_EOF"
-        )
-        return code == 0
-
-    def get_nanobot_config(self) -> dict[str, Any] | None:
-        """Read and parse the nanobot config.json."""
-        raw = self.read_file(settings.nanobot_config_path)
-        if not raw:
+            logger.warning("Remote script failed on {} ({}): {}", self.session.host, code, stderr.strip())
             return None
         try:
-            return json.loads(raw)
+            return json.loads(stdout)
         except json.JSONDecodeError:
+            logger.warning("Remote script on {} returned invalid JSON", self.session.host)
             return None
 
-    def save_nanobot_config(self, config: dict[str, Any]) -> bool:
-        """Save the nanobot config.json."""
-        content = json.dumps(config, indent=2, ensure_ascii=False)
-        return self.write_file(settings.nanobot_config_path, content)
+    async def start_command(self, cmd: str) -> RemoteProcess:
+        """Start a long-running command whose output is read as it arrives."""
+        return await self._on_channel(lambda conn: conn.open_process(f"{_PATH_PREFIX}{cmd}"))
 
-    def get_nanobot_status(self) -> dict[str, Any]:
-        """Get nanobot process status and system info."""
-        info: dict[str, Any] = {"running": False, "pid": None, "uptime": None, "system": {}}
+    async def start_script(self, script: str, *args: str, python: str = _PYTHON) -> RemoteProcess:
+        """Start a long-running Python script that talks over its stdin and stdout."""
+        quoted = " ".join(shlex.quote(a) for a in (script, *args))
+        return await self.start_command(f"{python} -u -c {quoted}")
+
+    # ── Files (SFTP) ─────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _sftp_path(path: str) -> str:
+        # SFTP sessions start in the home directory but don't expand "~"
+        if path == "~":
+            return "."
+        if path.startswith("~/"):
+            return path[2:]
+        return path
+
+    async def stat(self, path: str) -> FileStat | None:
+        """Stat a remote file, or None if it does not exist."""
+        conn = await self.connect()
+        try:
+            with telemetry.remote(self.session, "file"):
+                return await conn.stat(self._sftp_path(path))
+        except OSError:
+            return None
 
-        # Check if nanobot is running
-        stdout, _, _ = self.exec_command("pgrep -f 'python.*nanobot' || true")
-        pids = [p.strip() for p in stdout.strip().split("\n") if p.strip()]
-        if pids:
-            info["running"] = True
-            info["pid"] = pids[0]
+    async def listdir(self, path: str) -> dict[str, FileStat] | None:
+        """Entries of a remote directory by name, or None if it does not exist."""
+        conn = await self.connect()
+        try:
+            with telemetry.remote(self.session, "file"):
+                return await conn.listdir(self._sftp_path(path))
+        except OSError:
+            return None
 
-        # Get uptime
-        stdout, _, _ = self.exec_command("uptime -p 2>/dev/null || uptime")
-        info["uptime"] = stdout.strip()
+    async def exists(self, path: str) -> bool:
+        return await self.stat(path) is not None
 
-        # Get system info
-        stdout, _, _ = self.exec_command("uname -srm")
-        info["system"]["os"] = stdout.strip()
+    async def iter_file(self, path: str, chunk_size: int = 32768) -> AsyncIterator[bytes]:
+        """Stream a remote file in chunks."""
+        conn = await self.connect()
+        with telemetry.remote(self.session, "file"):
+            async for chunk in conn.read_chunks(self._sftp_path(path), chunk_size):
+                telemetry.transferred(self.session, received=len(chunk))
+                yield chunk
 
-        stdout, _, _ = self.exec_command("free -h 2>/dev/null | grep Mem | awk '{print $2, $3, $4}'")
-        if stdout.strip():
-            parts = stdout.strip().split()
-            info["system"]["memory"] = {"total": parts[0] if parts else "?", "used": parts[1] if len(parts) > 1 else "?", "free": parts[2] if len(parts) > 2 else "?"}
+    async def read_bytes(self, path: str) -> bytes:
+        """Read a whole remote file; raises OSError if it cannot be read."""
+        return b"".join([chunk async for chunk in self.iter_file(path)])
 
-        stdout, _, _ = self.exec_command("df -h / | tail -1 | awk '{print $2, $3, $5}'")
-        if stdout.strip():
-            parts = stdout.strip().split()
-            info["system"]["disk"] = {"total": parts[0] if parts else "?", "used": parts[1] if len(parts) > 1 else "?", "usage": parts[2] if len(parts) > 2 else "?"}
+    async def read_file(self, path: str) -> str | None:
+        """Read a file from the remote server."""
+        try:
+            return (await self.read_bytes(path)).decode("utf-8", "replace")
+        except (OSError, ConnectionError):
+            return None
 
-        stdout, _, _ = self.exec_command("python3 --version 2>/dev/null || python --version 2>/dev/null")
-        info["system"]["python"] = stdout.strip()
+    async def makedirs(self, path: str) -> None:
+        """Create a remote directory and its parents if missing."""
+        conn = await self.connect()
+        target = self._sftp_path(path)
+        prefix = "/" if target.startswith("/") else ""
+        parts = [p for p in target.split("/") if p and p != "."]
+        for i in range(len(parts)):
+            current = prefix + "/".join(parts[: i + 1])
+            with telemetry.remote(self.session, "file"):
+                missing = await conn.stat(current) is None
+            if missing:
+                with telemetry.remote(self.session, "file"):
+                    await conn.mkdir(current)
+
+    async def write_file(
+        self, path: str, content: str | bytes | Iterable[bytes], chunk_size: int = 32768, mode: int | None = None
+    ) -> FileStat | None:
+        """Write a remote file atomically: stream to a temp file, then rename over.
+
+        Readers (and nanobot itself) never see a half-written file. The file
+        gets permissions ``mode``; without it the original file's are kept,
+        which costs a stat first. Returns the new file's stat, None if the
+        write failed.
+        """
+        target = self._sftp_path(path)
+        directory, _, name = target.rpartition("/")
+        tmp = f"{directory}/.{name}.{uuid.uuid4().hex[:8]}.tmp" if directory else f".{name}.{uuid.uuid4().hex[:8]}.tmp"
+
+        if isinstance(content, str):
+            content = content.encode()
+        if isinstance(content, bytes):
+            data = content
+            content = (data[i:i + chunk_size] for i in range(0, len(data), chunk_size))
+
+        def counted(chunks: Iterable[bytes]) -> Iterator[bytes]:
+            for chunk in chunks:
+                telemetry.transferred(self.session, sent=len(chunk))
+                yield chunk
+
+        conn = None
+        try:
+            conn = await self.connect()
+            if mode is None:
+                with telemetry.remote(self.session, "file"):
+                    existing = await conn.stat(target)
+                if existing is not None:
+                    mode = S_IMODE(existing.st_mode)
+            try:
+                with telemetry.remote(self.session, "file"):
+                    attrs = await conn.write_chunks(tmp, counted(content), mode)
+            except FileNotFoundError:
+                # Nothing was consumed from ``content`` yet: the open itself failed
+                if not directory:
+                    raise
+                await self.makedirs(directory)
+                with telemetry.remote(self.session, "file"):
+                    attrs = await conn.write_chunks(tmp, counted(content), mode)
+            with telemetry.remote(self.session, "file"):
+                await conn.replace(tmp, target)
+            return attrs
+        except (OSError, ConnectionError) as e:
+            logger.error("Failed to write {} on {}: {}", path, self.session.host, e)
+            if conn is not None:
+                try:
+                    await conn.remove(tmp)
+                except Exception:
+                    pass
+            return None
 
-        return info
+    async def get_nanobot_config(self) -> dict[str, Any] | None:
+        """Read and parse the nanobot config.json."""
+        config, _ = await self.get_nanobot_config_versioned()
+        return config
+
+    async def get_nanobot_config_versioned(self) -> tuple[dict[str, Any] | None, str | None]:
+        """Return (config, version), re-reading config.json only if it changed.
+
+        The parsed config is cached per host and validated with a single
+        SFTP stat (mtime + size). The version is a hash of the raw file and
+        serves as the ETag of every config-derived response. Callers get a
+        private copy they are free to mutate.
+        """
+        key = self._config_cache_key()
+        attrs = await self.stat(settings.nanobot_config_path)
+        if attrs is None:
+            _config_cache.pop(key, None)
+            return None, None
+
+        cached = _config_cache.get(key)
+        if cached is None or (cached.mtime, cached.size) != (attrs.st_mtime, attrs.st_size):
+            try:
+                raw = await self.read_bytes(settings.nanobot_config_path)
+                config = json.loads(raw)
+            except (OSError, ConnectionError, ValueError):
+                return None, None
+            cached = CachedConfig(
+                mtime=attrs.st_mtime,
+                size=attrs.st_size,
+                mode=attrs.st_mode,
+                version=hashlib.sha256(raw).hexdigest()[:16],
+                config=config,
+            )
+            _config_cache[key] = cached
+        return copy.deepcopy(cached.config), cached.version
 
-    def list_skills(self) -> list[dict[str, str]]:
-        """List skills from the workspace."""
-        skills = []
-        ws = settings.nanobot_workspace_path
+    async def save_nanobot_config(self, config: dict[str, Any]) -> bool:
+        """Save the nanobot config.json."""
+        return await self._write_config(config) is not None
 
-        # Workspace skills
-        stdout, _, code = self.exec_command(
-            f"find {ws}/skills -maxdepth 2 -name 'SKILL.md' 2>/dev/null || true"
+    async def update_nanobot_config(
+        self,
+        apply: Callable[[dict[str, Any]], dict[str, Any]],
+        expected_version: str | None = None,
+    ) -> str | None:
+        """Read-modify-write config.json; returns the new version, None if the write failed.
+
+        ``apply`` gets a private copy of the current config (``{}`` if there is
+        none) and returns the config to save. The current config comes from the
+        cache, so only a stat precedes the write. If ``expected_version`` is
+        given and the file changed since, ``ConfigConflictError`` is raised and
+        nothing is written. Updates from this process are serialised per host and login.
+        """
+        key = self._config_cache_key()
+        lock = _config_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            config, version = await self.get_nanobot_config_versioned()
+            if expected_version is not None and expected_version != version:
+                raise ConfigConflictError(version)
+            return await self._write_config(apply(config if config is not None else {}))
+
+    async def _write_config(self, config: dict[str, Any]) -> str | None:
+        key = self._config_cache_key()
+        content = json.dumps(config, indent=2, ensure_ascii=False).encode()
+        # Drop the cache whatever the outcome; it is re-primed below on success
+        cached = _config_cache.pop(key, None)
+        # The cached stat already has the permissions to keep, saving another
+        attrs = await self.write_file(
+            settings.nanobot_config_path, content, mode=S_IMODE(cached.mode) if cached is not None else None
         )
-        for line in stdout.strip().split("\n"):
-            line = line.strip()
-            if line:
-                name = line.rsplit("/SKILL.md", 1)[0].rsplit("/", 1)[-1]
-                content, _, _ = self.exec_command(f"cat '{line}'")
-                skills.append({"name": name, "source": "workspace", "path": line, "content": content.strip()})
-
-        # Builtin skills (check common install locations)
-        for base in ["/usr/local/lib/python*/dist-packages/nanobot/skills", "/root/.local/lib/python*/dist-packages/nanobot/skills", "$(pip show nanobot 2>/dev/null | grep Location | cut -d' ' -f2)/nanobot/skills"]:
-            stdout, _, code = self.exec_command(
-                f"find {base} -maxdepth 2 -name 'SKILL.md' 2>/dev/null || true"
+        if attrs is None:
+            return None
+        version = hashlib.sha256(content).hexdigest()[:16]
+        if attrs.st_size == len(content):
+            _config_cache[key] = CachedConfig(
+                mtime=attrs.st_mtime, size=attrs.st_size, mode=attrs.st_mode, version=version,
+                config=copy.deepcopy(config),
             )
-            for line in stdout.strip().split("\n"):
-                line = line.strip()
-                if line and not any(s["name"] == line.rsplit("/SKILL.md", 1)[0].rsplit("/", 1)[-1] for s in skills):
-                    name = line.rsplit("/SKILL.md", 1)[0].rsplit("/", 1)[-1]
-                    content, _, _ = self.exec_command(f"cat '{line}'")
-                    skills.append({"name": name, "source": "builtin", "path": line, "content": content.strip()})
+        return version
+
+    def _config_cache_key(self) -> tuple[str, int, str, str]:
+        return (*pool_key(self.session), settings.nanobot_config_path)
+
+    async def get_nanobot_status(self) -> dict[str, Any]:
+        """Get nanobot process status and system info in one round trip."""
+        info: dict[str, Any] = {"running": False, "pid": None, "uptime": None, "system": {}}
+
+        key = (self.session.host, self.session.port)
+        cached = _static_facts.get(key)
+        fresh_static = cached is not None and time.monotonic() - cached[0] < settings.status_static_ttl
+
+        data = await self.run_script(STATUS_SCRIPT, *([] if fresh_static else ["static"]))
+        if data is None:
+            return info
 
+        if "static" in data:
+            _static_facts[key] = (time.monotonic(), data["static"])
+            static = data["static"]
+        else:
+            static = cached[1]
+
+        info["running"] = data["running"]
+        info["pid"] = str(data["pid"]) if data["pid"] is not None else None
+        info["uptime"] = _format_uptime(data["uptime_seconds"])
+        info["uptime_seconds"] = data["uptime_seconds"]
+
+        mem = data["memory"]
+        disk = data["disk"]
+        disk_usage = disk["used"] * 100 / (disk["used"] + disk["free"]) if disk["used"] + disk["free"] else 0
+        info["system"] = {
+            "os": static.get("os", ""),
+            "python": static.get("python", ""),
+            "load": data["load"],
+            "memory": {
+                "total": _format_bytes(mem["total"], "i"),
+                "used": _format_bytes(mem["used"], "i"),
+                "free": _format_bytes(mem["free"], "i"),
+                "bytes": mem,
+            },
+            "disk": {
+                "total": _format_bytes(disk["total"]),
+                "used": _format_bytes(disk["used"]),
+                "usage": f"{math.ceil(disk_usage)}%",
+                "bytes": disk,
+            },
+        }
+        return info
+
+    async def list_skills(self) -> list[dict[str, Any]]:
+        """List workspace and builtin skills with their content in one round trip.
+
+        Builtin skills come from the local store while the host's nanobot
+        version is unchanged; the host only sends them again after an upgrade.
+        """
+        host, port = self.session.host, self.session.port
+        cached = local_store.builtin_skills(host, port)
+        builtin_dir = cached.location if cached else None
+        if cached is None and time.monotonic() - _builtin_skill_misses.get((host, port), -_BUILTIN_MISS_TTL) < _BUILTIN_MISS_TTL:
+            builtin_dir = ""  # recently looked and found nothing; don't search again yet
+
+        data = await self.run_script(
+            SKILLS_SCRIPT,
+            settings.nanobot_workspace_path,
+            "-" if builtin_dir is None else builtin_dir,
+            cached.version if cached else "-",
+            timeout=60,
+        )
+        if data is None:
+            return []
+        builtin = data["builtin"]
+        if builtin is None:
+            builtin = cached.skills
+            if data["builtin_dir"] != cached.location:
+                local_store.save_builtin_skills(host, port, BuiltinSkills(data["builtin_dir"], cached.version, builtin))
+        elif not data["builtin_dir"]:
+            if builtin_dir != "":
+                local_store.forget_builtin_skills(host, port)
+                _builtin_skill_misses[(host, port)] = time.monotonic()
+        elif data["version"]:
+            logger.info("nanobot {} on {}: cached {} builtin skills", data["version"], host, len(builtin))
+            local_store.save_builtin_skills(host, port, BuiltinSkills(data["builtin_dir"], data["version"], builtin))
+
+        skills = data["skills"]
+        seen = {s["name"] for s in skills}
+        skills += [s for s in builtin if s["name"] not in seen]
+        _skill_index[self._skill_index_key()] = {s["name"]: SkillEntry(s["path"], s["source"], s["mtime"]) for s in skills}
         return skills
 
-    def list_memory_files(self) -> list[dict[str, str]]:
-        """List memory files in the workspace."""
-        ws = settings.nanobot_workspace_path
-        files = []
-        stdout, _, _ = self.exec_command(f"find {ws}/memory -type f 2>/dev/null || true")
-        for line in stdout.strip().split("\n"):
-            line = line.strip()
-            if line:
-                content, _, _ = self.exec_command(f"cat '{line}'")
-                files.append({
-                    "name": line.rsplit("/", 1)[-1],
-                    "path": line,
-                    "content": content.strip(),
-                })
-        return files
-
-    def restart_nanobot(self) -> tuple[bool, str]:
+    def _skill_index_key(self) -> tuple[str, int, str]:
+        return (self.session.host, self.session.port, self.session.username)
+
+    async def _refresh_skill_index(self) -> dict[str, SkillEntry]:
+        """Bring the skill index up to date from one listing of the workspace skills directory.
+
+        Builtin skills come from the local store; only the first lookup on a
+        host without them there fetches the full list.
+        """
+        key = self._skill_index_key()
+        cached = local_store.builtin_skills(self.session.host, self.session.port)
+        if cached is None and key not in _skill_index:
+            await self.list_skills()
+            return _skill_index.get(key, {})
+
+        skills_dir = f"{settings.nanobot_workspace_path}/skills"
+        listing = await self.listdir(skills_dir) or {}
+        old = _skill_index.get(key, {})
+        index = {s["name"]: SkillEntry(s["path"], "builtin", s["mtime"]) for s in cached.skills} if cached else {}
+        for name, st in listing.items():
+            if not S_ISDIR(st.st_mode):
+                continue
+            known = old.get(name)
+            if known is not None and known.source == "workspace":
+                index[name] = known
+            else:
+                # The directory's mtime until the file itself is read
+                index[name] = SkillEntry(f"{skills_dir}/{name}/SKILL.md", "workspace", st.st_mtime)
+        _skill_index[key] = index
+        return index
+
+    async def get_skill(self, name: str) -> dict[str, Any] | None:
+        """One skill with its content, read straight from its SKILL.md.
+
+        Where it lives comes from the skill index, so the other skills are
+        never fetched. Returns None if there is no such skill.
+        """
+        index = _skill_index.get(self._skill_index_key())
+        for attempt in range(2):
+            if index is None or name not in index or attempt:
+                index = await self._refresh_skill_index()
+            entry = index.get(name)
+            if entry is None:
+                return None
+            if entry.source == "builtin":
+                # A workspace skill of the same name may have appeared since; it wins
+                path = f"{settings.nanobot_workspace_path}/skills/{name}/SKILL.md"
+                if await self.exists(path):
+                    entry = index[name] = SkillEntry(path, "workspace", 0)
+                else:
+                    cached = local_store.builtin_skills(self.session.host, self.session.port)
+                    for skill in cached.skills if cached else []:
+                        if skill["name"] == name:
+                            return skill
+            st = await self.stat(entry.path)
+            content = await self.read_file(entry.path) if st is not None else None
+            if content is not None:
+                entry.mtime = st.st_mtime
+                return {"name": name, "source": entry.source, "path": entry.path, "mtime": st.st_mtime, "content": content.strip()}
+            # Deleted or moved since it was indexed; look again once
+        return None
+
+    async def save_skill(self, name: str, content: str) -> bool:
+        """Write a workspace skill's SKILL.md and record it in the skill index."""
+        path = f"{settings.nanobot_workspace_path}/skills/{name}/SKILL.md"
+        if await self.write_file(path, content) is None:
+            return False
+        index = _skill_index.get(self._skill_index_key())
+        if index is not None:
+            index[name] = SkillEntry(path, "workspace", time.time())
+        return True
+
+    async def list_memory_files(self) -> list[dict[str, Any]]:
+        """List memory files (name, path, size, mtime, hash) without their content."""
+        files = await self.run_script(MEMORY_LIST_SCRIPT, f"{settings.nanobot_workspace_path}/memory")
+        return files or []
+
+    async def read_memory_file(
+        self,
+        path: str,
+        offset: int | None = None,
+        length: int | None = None,
+        start_line: int | None = None,
+        lines: int | None = None,
+        tail: int | None = None,
+    ) -> dict[str, Any] | None:
+        """Read a memory file, optionally a byte range, a line range or its last lines.
+
+        At most ``settings.memory_max_read_bytes`` are returned per call; the
+        result carries ``offset``/``end``/``size`` so callers can page on.
+        Returns None if the file does not exist or lies outside the memory dir.
+        """
+        opts = {
+            "path": path,
+            "offset": offset,
+            "length": length,
+            "start_line": start_line,
+            "lines": lines,
+            "tail": tail,
+            "max_bytes": settings.memory_max_read_bytes,
+        }
+        data = await self.run_script(
+            MEMORY_READ_SCRIPT, f"{settings.nanobot_workspace_path}/memory", json.dumps(opts)
+        )
+        if data is None or "error" in data:
+            return None
+        return data
+
+    async def restart_nanobot(self) -> tuple[bool, str]:
         """Restart the nanobot service."""
         # Try systemctl first, then direct kill+start
-        _, _, code = self.exec_command("systemctl restart nanobot 2>/dev/null")
+        _, _, code = await self.exec_command("systemctl restart nanobot 2>/dev/null")
         if code == 0:
             return True, "Restarted via systemctl"
 
         # Kill existing
-        self.exec_command("pkill -f 'nanobot' 2>/dev/null || true")
-        self.exec_command("pkill -f 'python.*nanobot' 2>/dev/null || true")
+        await self.exec_command("pkill -f 'nanobot' 2>/dev/null || true")
+        await self.exec_command("pkill -f 'python.*nanobot' 2>/dev/null || true")
         
         # Determine command
-        _, _, code = self.exec_command("command -v nanobot")
+        _, _, code = await self.exec_command("command -v nanobot")
         if code == 0:
             cmd = "nanobot gateway"
         else:
             cmd = "python3 -m nanobot gateway"
 
-        stdout, stderr, code = self.exec_command(
+        stdout, stderr, code = await self.exec_command(
             f"nohup {cmd} > /tmp/nanobot.log 2>&1 & echo $!"
         )
         if code == 0 and stdout.strip():
             return True, f"Started with PID {stdout.strip()}"
         return False, stderr or "Failed to start nanobot"
 
-    def get_logs(self, lines: int = 100) -> str:
-        """Get recent nanobot logs."""
-        stdout, _, _ = self.exec_command(
-            f"journalctl -u nanobot --no-pager -n {lines} 2>/dev/null || tail -n {lines} /tmp/nanobot.log 2>/dev/null || echo 'No logs found'"
-        )
-        return stdout
-
-    def list_agents_md(self) -> str | None:
+    async def get_logs(
+        self,
+        lines: int = 100,
+        cursor: str | None = None,
+        level: str | None = None,
+        pattern: str | None = None,
+        since: float | None = None,
+        until: float | None = None,
+    ) -> dict[str, Any] | None:
+        """Get nanobot log lines, filtered on the host so only matches are sent back.
+
+        Without a cursor this returns the last ``lines`` matching lines; with
+        one, up to ``lines`` matching lines written after it (``more`` says
+        whether there are further ones). Either way the result carries the
+        cursor to pass next time. ``level`` is a minimum loguru level and
+        ``since``/``until`` are Unix timestamps. Returns None on failure.
+        """
+        opts = {
+            "lines": lines,
+            "cursor": cursor,
+            "level": level,
+            "pattern": pattern,
+            "since": since,
+            "until": until,
+            "max_bytes": settings.logs_max_read_bytes,
+        }
+        return await self.run_script(LOGS_SCRIPT, json.dumps(opts), timeout=60)
+
+    async def list_agents_md(self) -> str | None:
         """Read the AGENTS.md file from workspace."""
         ws = settings.nanobot_workspace_path
-        content = self.read_file(f"{ws}/AGENTS.md")
+        content = await self.read_file(f"{ws}/AGENTS.md")
         return content
 
-    def save_agents_md(self, content: str) -> bool:
+    async def save_agents_md(self, content: str) -> bool:
         """Save the AGENTS.md file to workspace."""
         ws = settings.nanobot_workspace_path
-        return self.write_file(f"{ws}/AGENTS.md", content)
+        return await self.write_file(f"{ws}/AGENTS.md", content) is not None
 
     # ── Cron ─────────────────────────────────────────────────────────────────
 
-    def get_cron_jobs(self) -> list[dict[str, Any]]:
+    async def get_cron_jobs(self) -> list[dict[str, Any]]:
         """Read and parse the cron jobs.json."""
-        raw = self.read_file("~/.nanobot/cron/jobs.json")
+        raw = await self.read_file("~/.nanobot/cron/jobs.json")
         if not raw:
             return []
         try:
@@ -265,7 +695,7 @@ class SSHManager:
         except json.JSONDecodeError:
             return []
 
-    def add_cron_job(
+    async def add_cron_job(
         self,
         name: str,
         message: str,
@@ -294,35 +724,29 @@ class SSHManager:
             if channel:
                 cmd += f" --channel '{channel}'"
         
-        stdout, stderr, code = self.exec_command(cmd)
+        stdout, stderr, code = await self.exec_command(cmd)
         if code == 0:
             return True, stdout.strip()
         return False, stderr or stdout.strip()
 
-    def remove_cron_job(self, job_id: str) -> tuple[bool, str]:
+    async def remove_cron_job(self, job_id: str) -> tuple[bool, str]:
         """Remove a scheduled job via CLI."""
-        stdout, stderr, code = self.exec_command(f"nanobot cron remove {job_id}")
+        stdout, stderr, code = await self.exec_command(f"nanobot cron remove {job_id}")
         if code == 0:
             return True, stdout.strip()
         return False, stderr or stdout.strip()
 
-    def toggle_cron_job(self, job_id: str, enabled: bool) -> tuple[bool, str]:
+    async def toggle_cron_job(self, job_id: str, enabled: bool) -> tuple[bool, str]:
         """Enable or disable a scheduled job via CLI."""
         cmd = f"nanobot cron enable {job_id}"
         if not enabled:
             cmd += " --disable"
         
-        stdout, stderr, code = self.exec_command(cmd)
+        stdout, stderr, code = await self.exec_command(cmd)
         if code == 0:
             return True, stdout.strip()
         return False, stderr or stdout.strip()
 
-    def run_cron_job(self, job_id: str) -> tuple[bool, str]:
-        """Manually run a scheduled job via CLI."""
-        # Use --force to run even if disabled, and we run it in background so it doesn't block the UI
-        # But we want to see the output maybe? The CLI run command is synchronous.
-        # For now, let's run it synchronously with a timeout.
-        stdout, stderr, code = self.exec_command(f"nanobot cron run {job_id} --force", timeout=60)
-        if code == 0:
-            return True, stdout.strip()
-        return False, stderr or stdout.strip()
+    async def start_cron_run(self, job_id: str) -> RemoteProcess:
+        """Start running a scheduled job now (even if disabled); its output is read as it arrives."""
+        return await self.start_command(f"nanobot cron run {shlex.quote(job_id)} --force")
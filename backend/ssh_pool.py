@@ -0,0 +1,385 @@
+"""Process-wide pool of authenticated SSH connections, shared across requests."""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+import paramiko
+from loguru import logger
+
+from auth import UserSession
+from config import settings
+
+PoolKey = tuple[str, int, str]
+
+
+def pool_key(session: UserSession) -> PoolKey:
+    return (session.host, session.port, session.username)
+
+
+def secret_digest(session: UserSession) -> str:
+    return hashlib.sha256(session.password.encode()).hexdigest()
+
+
+def describe_connect_error(session: UserSession, e: Exception) -> str:
+    """User-facing explanation for a network-level connection failure."""
+    error_msg = str(e).lower()
+    if isinstance(e, TimeoutError) or "timeout" in error_msg or "connection refused" in error_msg:
+        return f"Cannot connect to {session.host}:{session.port}. Server may be down, port may be blocked, or SSH service not running."
+    elif "no route to host" in error_msg:
+        return f"No route to host {session.host}. Check the IP address and network connectivity."
+    elif "network is unreachable" in error_msg:
+        return f"Network unreachable. Check your internet connection."
+    else:
+        return f"Connection failed: {e}"
+
+
+def open_client(session: UserSession) -> paramiko.SSHClient:
+    """Open and authenticate a brand-new SSH connection."""
+    client = paramiko.SSHClient()
+    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+
+    # Try to connect with better error handling
+    try:
+        client.connect(
+            hostname=session.host,
+            port=session.port,
+            username=session.username,
+            password=session.password,
+            timeout=30,  # Increased timeout
+            look_for_keys=False,
+            allow_agent=False,
+            banner_timeout=30,
+            auth_timeout=30,
+        )
+    except paramiko.AuthenticationException:
+        raise Exception("Authentication failed. Check username/password.")
+    except paramiko.SSHException as e:
+        raise Exception(f"SSH protocol error: {e}")
+    except paramiko.BadHostKeyException:
+        raise Exception("Host key verification failed.")
+    except Exception as e:
+        raise Exception(describe_connect_error(session, e))
+
+    # Transport-level keepalives stop NAT/firewall idle timeouts from silently
+    # killing pooled connections between requests.
+    client.get_transport().set_keepalive(settings.ssh_keepalive_interval)
+    return client
+
+
+@dataclass
+class PooledClient:
+    client: paramiko.SSHClient
+    secret: str
+    created: float
+    last_used: float
+    rtt: float | None = None  # seconds, latest channel-open round trip
+    rtt_samples: int = field(default=0, repr=False)
+    sftp: paramiko.SFTPClient | None = field(default=None, repr=False)
+
+    def record_rtt(self, seconds: float) -> None:
+        # Exponentially weighted so one slow sample doesn't dominate
+        self.rtt = seconds if self.rtt is None else 0.8 * self.rtt + 0.2 * seconds
+        self.rtt_samples += 1
+
+    def is_alive(self) -> bool:
+        transport = self.client.get_transport()
+        return transport is not None and transport.is_active()
+
+    def open_sftp(self) -> paramiko.SFTPClient:
+        """SFTP session on this connection, opened once and kept with it."""
+        if self.sftp is None or self.sftp.sock.closed:
+            self.sftp = self.client.open_sftp()
+        return self.sftp
+
+    def close(self) -> None:
+        try:
+            if self.sftp is not None:
+                self.sftp.close()
+            self.client.close()
+        except Exception:
+            pass
+
+
+class SSHPool:
+    """Keeps authenticated SSH connections alive between HTTP requests.
+
+    Connections are keyed by (host, port, username) and leased exclusively:
+    a caller borrows one with ``acquire()`` and hands it back with
+    ``release()``. At most ``max_per_host`` connections (leased plus idle)
+    exist per key, and idle ones are closed after ``idle_timeout`` seconds.
+    A pooled connection is only handed out to a session presenting the same
+    password it was authenticated with.
+
+    A background monitor probes idle connections every ``health_interval``
+    seconds by opening and closing a bare channel (no remote process), which
+    both detects dead transports and measures round-trip time.
+    """
+
+    def __init__(
+        self,
+        max_per_host: int = 4,
+        idle_timeout: float = 300,
+        acquire_timeout: float = 30,
+        health_interval: float = 30,
+        probe_timeout: float = 10,
+    ):
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        self.acquire_timeout = acquire_timeout
+        self.health_interval = health_interval
+        self.probe_timeout = probe_timeout
+        self._cond = threading.Condition()
+        self._idle: dict[PoolKey, list[PooledClient]] = {}
+        self._leased: dict[int, tuple[PoolKey, PooledClient]] = {}
+        self._in_use: dict[PoolKey, int] = {}
+        self._stop = threading.Event()
+        self._monitor: threading.Thread | None = None
+
+    # ── Leasing ──────────────────────────────────────────────────────────────
+
+    def acquire(self, session: UserSession) -> paramiko.SSHClient:
+        """Borrow a live connection for the session, opening one if needed."""
+        key = pool_key(session)
+        secret = secret_digest(session)
+        deadline = time.monotonic() + self.acquire_timeout
+        stale: list[PooledClient] = []
+
+        with self._cond:
+            while True:
+                idle = self._idle.get(key, [])
+                reused = None
+                while idle and reused is None:
+                    entry = idle.pop()
+                    if entry.secret == secret and entry.is_alive():
+                        reused = self._lease_locked(key, entry)
+                    else:
+                        stale.append(entry)
+                if reused is not None:
+                    break
+
+                if self._count_locked(key) < self.max_per_host:
+                    # Reserve the slot before dropping the lock to connect.
+                    self._in_use[key] = self._in_use.get(key, 0) + 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._close_all(stale)
+                    raise Exception(
+                        f"Too many concurrent SSH connections to {session.host}:{session.port}. Try again shortly."
+                    )
+                self._cond.wait(remaining)
+
+        self._close_all(stale)
+        if reused is not None:
+            return reused
+
+        try:
+            client = open_client(session)
+        except Exception:
+            with self._cond:
+                self._in_use[key] -= 1
+                self._cond.notify()
+            raise
+
+        now = time.monotonic()
+        entry = PooledClient(client=client, secret=secret, created=now, last_used=now)
+        with self._cond:
+            self._leased[id(client)] = (key, entry)
+        logger.debug("Opened pooled SSH connection to {}@{}:{}", session.username, session.host, session.port)
+        return client
+
+    def release(self, client: paramiko.SSHClient, discard: bool = False) -> None:
+        """Return a borrowed connection; broken or discarded ones are closed."""
+        with self._cond:
+            leased = self._leased.pop(id(client), None)
+            if leased is None:
+                return
+            key, entry = leased
+            self._in_use[key] -= 1
+            if not discard and entry.is_alive():
+                entry.last_used = time.monotonic()
+                self._idle.setdefault(key, []).append(entry)
+                entry = None
+            self._cond.notify()
+        if entry is not None:
+            entry.close()
+
+    def authenticate(self, session: UserSession) -> None:
+        """Verify credentials with a fresh handshake and keep the connection warm."""
+        client = open_client(session)
+        key = pool_key(session)
+        now = time.monotonic()
+        entry = PooledClient(client=client, secret=secret_digest(session), created=now, last_used=now)
+        with self._cond:
+            if self._count_locked(key) < self.max_per_host:
+                self._idle.setdefault(key, []).append(entry)
+                self._cond.notify()
+                return
+        entry.close()
+
+    def _lease_locked(self, key: PoolKey, entry: PooledClient) -> paramiko.SSHClient:
+        self._in_use[key] = self._in_use.get(key, 0) + 1
+        self._leased[id(entry.client)] = (key, entry)
+        return entry.client
+
+    def _count_locked(self, key: PoolKey) -> int:
+        return self._in_use.get(key, 0) + len(self._idle.get(key, []))
+
+    def record_rtt(self, client: paramiko.SSHClient, seconds: float) -> None:
+        """Feed a round-trip measurement taken while the client was leased."""
+        with self._cond:
+            leased = self._leased.get(id(client))
+        if leased is not None:
+            leased[1].record_rtt(seconds)
+
+    def rtt(self, client: paramiko.SSHClient) -> float | None:
+        with self._cond:
+            leased = self._leased.get(id(client))
+        return leased[1].rtt if leased is not None else None
+
+    def sftp(self, client: paramiko.SSHClient) -> paramiko.SFTPClient:
+        """SFTP session bound to a leased connection, reused across leases."""
+        with self._cond:
+            leased = self._leased.get(id(client))
+        if leased is None:
+            raise ValueError("Connection is not leased from this pool")
+        return leased[1].open_sftp()
+
+    # ── Health & eviction ────────────────────────────────────────────────────
+
+    def probe(self, entry: PooledClient) -> bool:
+        """Check one connection with a bare channel open; close it if dead."""
+        transport = entry.client.get_transport()
+        if transport is None or not transport.is_active():
+            return False
+        start = time.monotonic()
+        try:
+            chan = transport.open_session(timeout=self.probe_timeout)
+            chan.close()
+        except Exception as e:
+            logger.warning("SSH health probe failed for {}: {}", transport.getpeername(), e)
+            entry.close()
+            return False
+        entry.record_rtt(time.monotonic() - start)
+        return True
+
+    def check_health(self) -> None:
+        """Probe idle connections that have not been used since the last check."""
+        cutoff = time.monotonic() - self.health_interval
+        with self._cond:
+            entries = [entry for idle in self._idle.values() for entry in idle if entry.last_used < cutoff]
+        for entry in entries:
+            self.probe(entry)
+
+    def reap(self) -> int:
+        """Close idle connections that expired or whose transport died."""
+        now = time.monotonic()
+        expired: list[PooledClient] = []
+        with self._cond:
+            for key, idle in list(self._idle.items()):
+                keep = []
+                for entry in idle:
+                    if now - entry.last_used > self.idle_timeout or not entry.is_alive():
+                        expired.append(entry)
+                    else:
+                        keep.append(entry)
+                if keep:
+                    self._idle[key] = keep
+                else:
+                    del self._idle[key]
+            if expired:
+                self._cond.notify_all()
+        self._close_all(expired)
+        return len(expired)
+
+    def close_idle(self, session: UserSession) -> int:
+        """Close the idle connections authenticated with this session's credentials."""
+        key = pool_key(session)
+        secret = secret_digest(session)
+        with self._cond:
+            idle = self._idle.get(key, [])
+            closed = [entry for entry in idle if entry.secret == secret]
+            keep = [entry for entry in idle if entry.secret != secret]
+            if keep:
+                self._idle[key] = keep
+            else:
+                self._idle.pop(key, None)
+            if closed:
+                self._cond.notify_all()
+        self._close_all(closed)
+        return len(closed)
+
+    def start(self) -> None:
+        """Start the background health monitor thread."""
+        if self._monitor is not None and self._monitor.is_alive():
+            return
+        self._stop.clear()
+        self._monitor = threading.Thread(target=self._monitor_loop, name="ssh-pool-monitor", daemon=True)
+        self._monitor.start()
+
+    def _monitor_loop(self) -> None:
+        while not self._stop.wait(self.health_interval):
+            try:
+                self.check_health()
+                closed = self.reap()
+                if closed:
+                    logger.debug("Reaped {} idle SSH connection(s)", closed)
+            except Exception as e:
+                logger.error("SSH pool monitor error: {}", e)
+
+    def close_all(self) -> None:
+        """Stop the monitor and close every idle connection."""
+        self._stop.set()
+        with self._cond:
+            entries = [entry for idle in self._idle.values() for entry in idle]
+            self._idle.clear()
+        self._close_all(entries)
+
+    @staticmethod
+    def _close_all(entries: list[PooledClient]) -> None:
+        for entry in entries:
+            entry.close()
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Per-host counts of leased and idle connections."""
+        with self._cond:
+            keys = set(self._idle) | {k for k, n in self._in_use.items() if n}
+            return {
+                f"{key[2]}@{key[0]}:{key[1]}": {
+                    "in_use": self._in_use.get(key, 0),
+                    "idle": len(self._idle.get(key, [])),
+                }
+                for key in keys
+            }
+
+    def connection_info(self, session: UserSession) -> list[dict[str, Any]]:
+        """Health details for every pooled connection belonging to a host."""
+        key = pool_key(session)
+        now = time.monotonic()
+        with self._cond:
+            entries = [("idle", e) for e in self._idle.get(key, [])]
+            entries += [("in_use", e) for k, e in self._leased.values() if k == key]
+        return [
+            {
+                "state": state,
+                "alive": entry.is_alive(),
+                "rtt_ms": round(entry.rtt * 1000, 1) if entry.rtt is not None else None,
+                "age": round(now - entry.created),
+                "idle_for": round(now - entry.last_used) if state == "idle" else 0,
+            }
+            for state, entry in entries
+        ]
+
+
+ssh_pool = SSHPool(
+    max_per_host=settings.ssh_pool_max_per_host,
+    idle_timeout=settings.ssh_pool_idle_timeout,
+    acquire_timeout=settings.ssh_pool_acquire_timeout,
+    health_interval=settings.ssh_health_interval,
+)
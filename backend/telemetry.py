@@ -0,0 +1,222 @@
+"""Per-request remote-call accounting, ``Server-Timing`` headers and Prometheus metrics."""
+
+from __future__ import annotations
+
+import bisect
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from auth import UserSession
+
+# Latency buckets in seconds, remote-call count buckets per request
+_SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+_COUNTS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+_PHASES = ("connect", "command", "file")
+
+
+class HostUsage:
+    """What one request did on one host."""
+
+    __slots__ = ("calls", "seconds", "sent", "received")
+
+    def __init__(self):
+        self.calls = dict.fromkeys(_PHASES, 0)
+        self.seconds = dict.fromkeys(_PHASES, 0.0)
+        self.sent = 0
+        self.received = 0
+
+
+class RequestUsage:
+    """Remote work done on behalf of one API request, per host."""
+
+    def __init__(self):
+        self.hosts: dict[str, HostUsage] = {}
+        # Set once the request is over; background tasks it started stop counting then
+        self.closed = False
+
+    def host(self, session: UserSession) -> HostUsage | None:
+        if self.closed:
+            return None
+        key = f"{session.host}:{session.port}"
+        usage = self.hosts.get(key)
+        if usage is None:
+            usage = self.hosts[key] = HostUsage()
+        return usage
+
+    def total(self, attr: str, phase: str) -> float:
+        return sum(getattr(u, attr)[phase] for u in self.hosts.values())
+
+    def server_timing(self, elapsed: float) -> str:
+        """The ``Server-Timing`` header value for this request so far."""
+        parts = [f"total;dur={elapsed * 1000:.1f}"]
+        for phase in _PHASES:
+            calls = int(self.total("calls", phase))
+            if calls:
+                unit = {"connect": "connect", "command": "command", "file": "file op"}[phase]
+                desc = f"{calls} {unit}{'s' if calls > 1 else ''}"
+                parts.append(f'ssh-{phase};dur={self.total("seconds", phase) * 1000:.1f};desc="{desc}"')
+        sent = sum(u.sent for u in self.hosts.values())
+        received = sum(u.received for u in self.hosts.values())
+        if sent or received:
+            parts.append(f'ssh-bytes;desc="sent {sent}, received {received}"')
+        return ", ".join(parts)
+
+
+_usage: ContextVar[RequestUsage | None] = ContextVar("request_usage", default=None)
+
+
+@contextmanager
+def remote(session: UserSession, phase: str) -> Iterator[None]:
+    """Time one remote call (``phase``: connect, command or file) for the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        request = _usage.get()
+        usage = request.host(session) if request is not None else None
+        if usage is not None:
+            usage.calls[phase] += 1
+            usage.seconds[phase] += time.perf_counter() - started
+
+
+def transferred(session: UserSession, sent: int = 0, received: int = 0) -> None:
+    """Count payload bytes sent to and received from a host for the current request."""
+    request = _usage.get()
+    usage = request.host(session) if request is not None else None
+    if usage is not None:
+        usage.sent += sent
+        usage.received += received
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+def _labels(labels: dict[str, str]) -> str:
+    def escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+    return ",".join(f'{k}="{escape(v)}"' for k, v in labels.items())
+
+
+class Metrics:
+    """Aggregates finished requests and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self._histograms: dict[str, tuple[str, dict[tuple[tuple[str, str], ...], Histogram]]] = {}
+        self._counters: dict[str, tuple[str, dict[tuple[tuple[str, str], ...], float]]] = {}
+        self._gauges: list[Callable[[], Iterator[tuple[str, str, dict[str, str], float]]]] = []
+
+    def observe(self, name: str, help_text: str, bounds: tuple[float, ...], value: float, **labels: str) -> None:
+        series = self._histograms.setdefault(name, (help_text, {}))[1]
+        key = tuple(labels.items())
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram(bounds)
+        histogram.observe(value)
+
+    def increment(self, name: str, help_text: str, amount: float, **labels: str) -> None:
+        series = self._counters.setdefault(name, (help_text, {}))[1]
+        key = tuple(labels.items())
+        series[key] = series.get(key, 0) + amount
+
+    def gauges(self, collect: Callable[[], Iterator[tuple[str, str, dict[str, str], float]]]) -> None:
+        """Register a callback yielding ``(name, help, labels, value)`` at scrape time."""
+        self._gauges.append(collect)
+
+    def record(self, method: str, route: str, elapsed: float, usage: RequestUsage) -> None:
+        self.observe(
+            "nanobot_web_request_duration_seconds", "API request latency.",
+            _SECONDS, elapsed, method=method, route=route,
+        )
+        hosts = usage.hosts or {"": HostUsage()}
+        for host, used in hosts.items():
+            for phase in _PHASES:
+                self.observe(
+                    "nanobot_web_request_remote_calls", "Remote calls made by one API request.",
+                    _COUNTS, used.calls[phase], route=route, host=host, phase=phase,
+                )
+                if used.calls[phase]:
+                    self.observe(
+                        "nanobot_web_request_remote_seconds", "Time one API request spent on remote calls.",
+                        _SECONDS, used.seconds[phase], route=route, host=host, phase=phase,
+                    )
+            for direction, amount in (("sent", used.sent), ("received", used.received)):
+                if amount:
+                    self.increment(
+                        "nanobot_web_remote_bytes_total", "Payload bytes exchanged with hosts by API requests.",
+                        amount, route=route, host=host, direction=direction,
+                    )
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for name, (help_text, series) in self._histograms.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for key, histogram in series.items():
+                labels = dict(key)
+                cumulative = 0
+                for bound, count in zip((*histogram.bounds, "+Inf"), histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{{{_labels({**labels, 'le': str(bound)})}}} {cumulative}")
+                lines.append(f"{name}_sum{{{_labels(labels)}}} {histogram.sum}")
+                lines.append(f"{name}_count{{{_labels(labels)}}} {cumulative}")
+        for name, (help_text, series) in self._counters.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            lines += [f"{name}{{{_labels(dict(key))}}} {value}" for key, value in series.items()]
+        described: set[str] = set()
+        for collect in self._gauges:
+            for name, help_text, labels, value in collect():
+                if name not in described:
+                    described.add(name)
+                    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+                lines.append(f"{name}{{{_labels(labels)}}} {value}" if labels else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class TelemetryMiddleware:
+    """ASGI middleware: accounts each HTTP request's remote work, adds ``Server-Timing``.
+
+    The header reflects the work done before the response started; the
+    aggregated metrics include everything up to the end of the body.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        usage = RequestUsage()
+        token = _usage.set(usage)
+        started = time.perf_counter()
+
+        async def send_with_timing(message: dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                timing = usage.server_timing(time.perf_counter() - started)
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", timing.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _usage.reset(token)
+            usage.closed = True
+            route = getattr(scope.get("route"), "path", None)
+            # Unmatched paths (static files, 404s) would make one series per URL
+            metrics.record(scope["method"], route or "other", time.perf_counter() - started, usage)
@@ -1,5 +1,26 @@
+import type {
+  CronRun,
+  FleetAction,
+  FleetEvent,
+  FleetHost,
+  LogsQuery,
+  LogsResult,
+  MetricsHistory,
+  SearchKind,
+  SearchResponse,
+  Versioned,
+} from '../types'
+
 const API_BASE = '/api'
 
+// The config changed since the version a write was based on (HTTP 412)
+export class ConflictError extends Error {}
+
+// Writes send back the version their data was read at, so a change made
+// elsewhere in between is refused instead of silently overwritten
+const ifMatch = (version?: string | null): Record<string, string> =>
+  version ? { 'If-Match': `"${version}"` } : {}
+
 class ApiClient {
   private token: string | null = null
 
@@ -15,6 +36,17 @@ class ApiClient {
   }
 
   private async request<T>(path: string, options: RequestInit = {}): Promise<T> {
+    return (await this.send(path, options)).json()
+  }
+
+  // Like request(), along with the config version from the ETag
+  private async requestVersioned<T>(path: string, options: RequestInit = {}): Promise<Versioned<T>> {
+    const res = await this.send(path, options)
+    const etag = res.headers.get('ETag')
+    return { data: await res.json(), version: etag ? etag.replace(/^W\//, '').replace(/"/g, '') : null }
+  }
+
+  private async send(path: string, options: RequestInit): Promise<Response> {
     const headers: Record<string, string> = {
       'Content-Type': 'application/json',
       ...(options.headers as Record<string, string>),
@@ -30,9 +62,10 @@ class ApiClient {
     }
     if (!res.ok) {
       const body = await res.json().catch(() => ({ detail: res.statusText }))
+      if (res.status === 412) throw new ConflictError(body.detail || 'Config was changed by someone else')
       throw new Error(body.detail || res.statusText)
     }
-    return res.json()
+    return res
   }
 
   // Auth
@@ -45,6 +78,15 @@ class ApiClient {
     return data
   }
 
+  // Revokes the session server-side; the local token is dropped either way
+  async logout() {
+    try {
+      await this.request('/auth/logout', { method: 'POST' })
+    } finally {
+      this.setToken(null)
+    }
+  }
+
   async getMe() {
     return this.request<{ host: string; port: number; username: string }>('/auth/me')
   }
@@ -54,44 +96,66 @@ class ApiClient {
     return this.request<any>('/dashboard')
   }
 
+  async getMetricsHistory(range: { since?: number; until?: number; points?: number } = {}) {
+    const params = new URLSearchParams()
+    Object.entries(range).forEach(([k, v]) => {
+      if (v !== undefined) params.set(k, String(v))
+    })
+    return this.request<MetricsHistory>(`/metrics/history?${params}`)
+  }
+
   // Config
   async getConfig() {
-    return this.request<any>('/config')
+    return this.requestVersioned<any>('/config')
   }
 
-  async updateConfig(config: any) {
-    return this.request<any>('/config', {
+  async updateConfig(config: any, version?: string | null) {
+    return this.request<{ status: string; version: string }>('/config', {
       method: 'PUT',
+      headers: ifMatch(version),
       body: JSON.stringify({ config }),
     })
   }
 
+  // Send only the changed keys (JSON Merge Patch); fails with 412 if the config
+  // changed since `version` (the ETag/`version` of an earlier read or write).
+  async patchConfig(patch: any, version: string) {
+    return this.request<{ status: string; version: string }>('/config', {
+      method: 'PATCH',
+      headers: { 'Content-Type': 'application/merge-patch+json', ...ifMatch(version) },
+      body: JSON.stringify(patch),
+    })
+  }
+
   async getConfigSection(section: string) {
-    return this.request<any>(`/config/${section}`)
+    return this.requestVersioned<any>(`/config/${section}`)
   }
 
-  async updateConfigSection(section: string, data: any) {
-    return this.request<any>(`/config/${section}`, {
+  async updateConfigSection(section: string, data: any, version?: string | null) {
+    return this.request<{ status: string; version: string }>(`/config/${section}`, {
       method: 'PUT',
+      headers: ifMatch(version),
       body: JSON.stringify({ data }),
     })
   }
 
   // Channels
   async getChannels() {
-    return this.request<any>('/channels')
+    return this.requestVersioned<any>('/channels')
   }
 
-  async updateChannel(channel: string, data: any) {
-    return this.request<any>(`/channels/${channel}`, {
+  async updateChannel(channel: string, data: any, version?: string | null) {
+    return this.request<{ status: string; version: string }>(`/channels/${channel}`, {
       method: 'PUT',
+      headers: ifMatch(version),
       body: JSON.stringify({ data }),
     })
   }
 
   // Agents
+  // `version` is the config version the agents section was read at
   async getAgents() {
-    return this.request<any>('/agents')
+    return this.request<{ config: any; agents_md: string | null; version: string | null }>('/agents')
   }
 
   async updateAgentsMd(content: string) {
@@ -101,9 +165,10 @@ class ApiClient {
     })
   }
 
-  async updateAgentsConfig(data: any) {
-    return this.request<any>('/agents/config', {
+  async updateAgentsConfig(data: any, version?: string | null) {
+    return this.request<{ status: string; version: string }>('/agents/config', {
       method: 'PUT',
+      headers: ifMatch(version),
       body: JSON.stringify({ data }),
     })
   }
@@ -133,31 +198,44 @@ class ApiClient {
 
   // Providers
   async getProviders() {
-    return this.request<any>('/providers')
+    return this.requestVersioned<any>('/providers')
   }
 
-  async updateProvider(provider: string, data: any) {
-    return this.request<any>(`/providers/${provider}`, {
+  async updateProvider(provider: string, data: any, version?: string | null) {
+    return this.request<{ status: string; version: string }>(`/providers/${provider}`, {
       method: 'PUT',
+      headers: ifMatch(version),
       body: JSON.stringify({ data }),
     })
   }
 
   // Tools
   async getTools() {
-    return this.request<any>('/tools')
+    return this.requestVersioned<any>('/tools')
   }
 
-  async updateTools(data: any) {
-    return this.request<any>('/tools', {
+  async updateTools(data: any, version?: string | null) {
+    return this.request<{ status: string; version: string }>('/tools', {
       method: 'PUT',
+      headers: ifMatch(version),
       body: JSON.stringify({ data }),
     })
   }
 
   // Memory
   async getMemory() {
-    return this.request<{ files: any[] }>('/memory')
+    return this.request<{ files: any[]; max_read_bytes: number }>('/memory')
+  }
+
+  async getMemoryFile(
+    path: string,
+    range: { offset?: number; length?: number; start_line?: number; lines?: number; tail?: number } = {},
+  ) {
+    const params = new URLSearchParams({ path })
+    Object.entries(range).forEach(([k, v]) => {
+      if (v !== undefined) params.set(k, String(v))
+    })
+    return this.request<any>(`/memory/file?${params}`)
   }
 
   async updateMemory(path: string, content: string) {
@@ -167,6 +245,13 @@ class ApiClient {
     })
   }
 
+  // Search
+  async search(q: string, kinds: SearchKind[] = [], limit = 20) {
+    const params = new URLSearchParams({ q, limit: String(limit) })
+    kinds.forEach((k) => params.append('kind', k))
+    return this.request<SearchResponse>(`/search?${params}`)
+  }
+
   // Cron
   async getCronJobs() {
     return this.request<any[]>('/cron')
@@ -193,14 +278,27 @@ class ApiClient {
   }
 
   async runCronJob(jobId: string) {
-    return this.request<any>(`/cron/${jobId}/run`, {
+    return this.request<{ status: string; run: CronRun }>(`/cron/${jobId}/run`, {
       method: 'POST',
     })
   }
 
+  async getCronRuns(jobId?: string) {
+    const query = jobId ? `?job_id=${encodeURIComponent(jobId)}` : ''
+    return this.request<{ runs: CronRun[] }>(`/cron/runs${query}`)
+  }
+
+  async getCronRun(runId: string) {
+    return this.request<CronRun>(`/cron/runs/${runId}`)
+  }
+
   // Logs
-  async getLogs(lines = 100) {
-    return this.request<{ logs: string }>(`/logs?lines=${lines}`)
+  async getLogs(lines = 100, query: LogsQuery = {}) {
+    const params = new URLSearchParams({ lines: String(lines) })
+    Object.entries(query).forEach(([k, v]) => {
+      if (v !== undefined && v !== '') params.set(k, String(v))
+    })
+    return this.request<LogsResult>(`/logs?${params}`)
   }
 
   // Service
@@ -213,6 +311,49 @@ class ApiClient {
     return this.request<any>('/health')
   }
 
+  // Fleet
+  async getFleet() {
+    return this.request<{ hosts: FleetHost[] }>('/fleet')
+  }
+
+  async addFleetHost(host: string, port: number, username: string, password: string) {
+    return this.request<FleetHost>('/fleet/hosts', {
+      method: 'POST',
+      body: JSON.stringify({ host, port, username, password }),
+    })
+  }
+
+  async removeFleetHost(id: string) {
+    return this.request<any>(`/fleet/hosts/${encodeURIComponent(id)}`, { method: 'DELETE' })
+  }
+
+  // Runs an action on many hosts; onEvent sees each host's result as it arrives
+  async runFleet(
+    body: { action: FleetAction; hosts?: string[]; patch?: Record<string, any> },
+    onEvent: (event: FleetEvent) => void,
+  ) {
+    const token = this.getToken()
+    const res = await fetch(`${API_BASE}/fleet/run`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', ...(token ? { Authorization: `Bearer ${token}` } : {}) },
+      body: JSON.stringify(body),
+    })
+    if (!res.ok || !res.body) {
+      const err = await res.json().catch(() => ({ detail: res.statusText }))
+      throw new Error(err.detail || res.statusText)
+    }
+    const reader = res.body.pipeThrough(new TextDecoderStream()).getReader()
+    let buffer = ''
+    for (;;) {
+      const { value, done } = await reader.read()
+      if (done) break
+      buffer += value
+      const lines = buffer.split('\n')
+      buffer = lines.pop() ?? ''
+      lines.filter(Boolean).forEach((line) => onEvent(JSON.parse(line)))
+    }
+  }
+
   // Connectivity testing
   async testConnectivity(host: string) {
     return this.request<any>('/test-connectivity', {
@@ -5,6 +5,7 @@ import toast from 'react-hot-toast'
 
 export default function AgentsPage() {
   const [config, setConfig] = useState<any>(null)
+  const [version, setVersion] = useState<string | null>(null)
   const [agentsMd, setAgentsMd] = useState('')
   const [loading, setLoading] = useState(true)
   const [saving, setSaving] = useState(false)
@@ -23,6 +24,7 @@ export default function AgentsPage() {
     try {
       const data = await api.getAgents()
       setConfig(data.config)
+      setVersion(data.version)
       setAgentsMd(data.agents_md || '')
 
       const defaults = data.config?.defaults || {}
@@ -47,7 +49,7 @@ export default function AgentsPage() {
   const saveConfig = async () => {
     setSaving(true)
     try {
-      await api.updateAgentsConfig({
+      const res = await api.updateAgentsConfig({
         defaults: {
           model,
           provider,
@@ -57,7 +59,8 @@ export default function AgentsPage() {
           memoryWindow,
           workspace,
         },
-      })
+      }, version)
+      setVersion(res.version)
       toast.success('Agent configuration saved')
     } catch (err: any) {
       toast.error(err.message)
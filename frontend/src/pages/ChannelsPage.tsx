@@ -18,6 +18,7 @@ const CHANNEL_LIST = [
 
 export default function ChannelsPage() {
   const [channels, setChannels] = useState<any>({})
+  const [version, setVersion] = useState<string | null>(null)
   const [loading, setLoading] = useState(true)
   const [selected, setSelected] = useState<string | null>(null)
   const [editJson, setEditJson] = useState('')
@@ -26,8 +27,9 @@ export default function ChannelsPage() {
   const fetchChannels = async () => {
     setLoading(true)
     try {
-      const data = await api.getChannels()
+      const { data, version } = await api.getChannels()
       setChannels(data)
+      setVersion(version)
     } catch (err: any) {
       toast.error(err.message)
     } finally {
@@ -50,8 +52,9 @@ export default function ChannelsPage() {
     setSaving(true)
     try {
       const data = JSON.parse(editJson)
-      await api.updateChannel(selected, data)
+      const res = await api.updateChannel(selected, data, version)
       setChannels({ ...channels, [selected]: data })
+      setVersion(res.version)
       toast.success(`${selected} channel saved`)
     } catch (err: any) {
       toast.error(err.message || 'Invalid JSON')
@@ -63,8 +66,9 @@ export default function ChannelsPage() {
   const toggleChannel = async (key: string) => {
     const cfg = { ...(channels[key] || {}), enabled: !(channels[key]?.enabled) }
     try {
-      await api.updateChannel(key, cfg)
+      const res = await api.updateChannel(key, cfg, version)
       setChannels({ ...channels, [key]: cfg })
+      setVersion(res.version)
       toast.success(`${key} ${cfg.enabled ? 'enabled' : 'disabled'}`)
       if (selected === key) setEditJson(JSON.stringify(cfg, null, 2))
     } catch (err: any) {
@@ -1,13 +1,21 @@
 import { useEffect, useRef, useState } from 'react'
 import { useStore } from '../store'
 import { api } from '../api/client'
-import { Send, Trash2, Bot, User } from 'lucide-react'
+import { Send, Square, Trash2, Bot, User, X } from 'lucide-react'
 import type { ChatMessage } from '../types'
 
+type ChatRun =
+  | { state: 'queued'; position: number }
+  | { state: 'running'; progress: string | null }
+  | { state: 'streaming'; progress: null }
+
 export default function ChatPage() {
-  const { chatMessages, addChatMessage, clearChat } = useStore()
+  const { chatMessages, addChatMessage, appendToChatMessage, clearChat } = useStore()
   const [input, setInput] = useState('')
-  const [thinking, setThinking] = useState(false)
+  // Messages sent but not finished, keyed by the id the server tags their frames with
+  const [runs, setRuns] = useState<Record<string, ChatRun>>({})
+  // Runs whose assistant message has been added and now receives deltas
+  const repliesRef = useRef<Set<string>>(new Set())
   const [wsConnected, setWsConnected] = useState(false)
   const wsRef = useRef<WebSocket | null>(null)
   const messagesEndRef = useRef<HTMLDivElement>(null)
@@ -44,18 +52,32 @@ export default function ChatPage() {
           content: 'Connected to nanobot. You can chat to add features, manage configuration, and more.',
           timestamp: Date.now(),
         })
+      } else if (data.type === 'queued') {
+        updateRun(data.id, { state: 'queued', position: data.position })
       } else if (data.type === 'thinking') {
-        setThinking(true)
-      } else if (data.type === 'response') {
-        setThinking(false)
+        updateRun(data.id, { state: 'running', progress: null })
+      } else if (data.type === 'progress') {
+        updateRun(data.id, { state: 'running', progress: data.message })
+      } else if (data.type === 'delta') {
+        updateRun(data.id, { state: 'streaming', progress: null })
+        if (repliesRef.current.has(data.id)) {
+          appendToChatMessage(data.id, data.message)
+        } else {
+          repliesRef.current.add(data.id)
+          addChatMessage({ id: data.id, role: 'assistant', content: data.message, timestamp: Date.now() })
+        }
+      } else if (data.type === 'done') {
+        finishRun(data.id)
+      } else if (data.type === 'cancelled') {
+        finishRun(data.id)
         addChatMessage({
           id: crypto.randomUUID(),
-          role: 'assistant',
-          content: data.message,
+          role: 'system',
+          content: 'Cancelled.',
           timestamp: Date.now(),
         })
       } else if (data.type === 'error') {
-        setThinking(false)
+        finishRun(data.id)
         addChatMessage({
           id: crypto.randomUUID(),
           role: 'system',
@@ -67,6 +89,7 @@ export default function ChatPage() {
 
     ws.onclose = () => {
       setWsConnected(false)
+      setRuns({})
     }
 
     ws.onerror = () => {
@@ -76,6 +99,22 @@ export default function ChatPage() {
     wsRef.current = ws
   }
 
+  const updateRun = (id: string, run: ChatRun) => {
+    setRuns((r) => (id in r ? { ...r, [id]: run } : r))
+  }
+
+  const finishRun = (id: string) => {
+    repliesRef.current.delete(id)
+    setRuns((r) => {
+      const { [id]: _, ...rest } = r
+      return rest
+    })
+  }
+
+  const cancelRun = (id: string) => {
+    wsRef.current?.send(JSON.stringify({ type: 'cancel', id }))
+  }
+
   const sendMessage = () => {
     const text = input.trim()
     if (!text || !wsRef.current || wsRef.current.readyState !== WebSocket.OPEN) return
@@ -87,9 +126,10 @@ export default function ChatPage() {
       timestamp: Date.now(),
     })
 
-    wsRef.current.send(JSON.stringify({ message: text }))
+    const id = crypto.randomUUID()
+    setRuns((r) => ({ ...r, [id]: { state: 'running', progress: null } }))
+    wsRef.current.send(JSON.stringify({ id, message: text }))
     setInput('')
-    setThinking(true)
     inputRef.current?.focus()
   }
 
@@ -172,19 +212,29 @@ export default function ChatPage() {
           </div>
         ))}
 
-        {thinking && (
-          <div className="flex gap-3">
-            <div className="w-8 h-8 rounded-lg bg-nano-600/20 flex items-center justify-center flex-shrink-0">
-              🐈
-            </div>
-            <div className="bg-dark-800 rounded-xl px-4 py-3 border border-dark-700">
-              <div className="flex gap-1.5">
-                <span className="w-2 h-2 bg-nano-400 rounded-full animate-bounce" />
-                <span className="w-2 h-2 bg-nano-400 rounded-full animate-bounce [animation-delay:.15s]" />
-                <span className="w-2 h-2 bg-nano-400 rounded-full animate-bounce [animation-delay:.3s]" />
+        {Object.entries(runs).map(([id, run]) =>
+          run.state === 'running' ? (
+            <div key={id} className="flex gap-3">
+              <div className="w-8 h-8 rounded-lg bg-nano-600/20 flex items-center justify-center flex-shrink-0">
+                🐈
+              </div>
+              <div className="bg-dark-800 rounded-xl px-4 py-3 border border-dark-700">
+                <div className="flex gap-1.5">
+                  <span className="w-2 h-2 bg-nano-400 rounded-full animate-bounce" />
+                  <span className="w-2 h-2 bg-nano-400 rounded-full animate-bounce [animation-delay:.15s]" />
+                  <span className="w-2 h-2 bg-nano-400 rounded-full animate-bounce [animation-delay:.3s]" />
+                </div>
+                {run.progress && <p className="text-xs text-dark-400 mt-2">{run.progress}</p>}
               </div>
             </div>
-          </div>
+          ) : run.state === 'queued' ? (
+            <div key={id} className="flex items-center gap-2 text-xs text-dark-400 pl-11">
+              Queued (#{run.position})
+              <button onClick={() => cancelRun(id)} className="text-dark-400 hover:text-dark-100" title="Cancel">
+                <X className="w-3.5 h-3.5" />
+              </button>
+            </div>
+          ) : null
         )}
 
         <div ref={messagesEndRef} />
@@ -208,6 +258,17 @@ export default function ChatPage() {
               t.style.height = Math.min(t.scrollHeight, 144) + 'px'
             }}
           />
+          {Object.entries(runs).some(([, run]) => run.state !== 'queued') && (
+            <button
+              onClick={() =>
+                Object.entries(runs).forEach(([id, run]) => run.state !== 'queued' && cancelRun(id))
+              }
+              className="btn-secondary p-3 rounded-lg"
+              title="Stop"
+            >
+              <Square className="w-4 h-4" />
+            </button>
+          )}
           <button
             onClick={sendMessage}
             disabled={!input.trim() || !wsConnected}
@@ -5,6 +5,8 @@ import toast from 'react-hot-toast'
 
 export default function ConfigPage() {
   const [config, setConfig] = useState<any>(null)
+  // Config version the editor was loaded at; saving over a newer one fails with 412
+  const [version, setVersion] = useState<string | null>(null)
   const [editJson, setEditJson] = useState('')
   const [loading, setLoading] = useState(true)
   const [saving, setSaving] = useState(false)
@@ -12,8 +14,9 @@ export default function ConfigPage() {
   const fetchConfig = async () => {
     setLoading(true)
     try {
-      const data = await api.getConfig()
+      const { data, version } = await api.getConfig()
       setConfig(data)
+      setVersion(version)
       setEditJson(JSON.stringify(data, null, 2))
     } catch (err: any) {
       toast.error(err.message)
@@ -30,8 +33,9 @@ export default function ConfigPage() {
     setSaving(true)
     try {
       const data = JSON.parse(editJson)
-      await api.updateConfig(data)
+      const res = await api.updateConfig(data, version)
       setConfig(data)
+      setVersion(res.version)
       toast.success('Configuration saved. You may need to restart nanobot for changes to take effect.')
     } catch (err: any) {
       toast.error(err.message || 'Invalid JSON')
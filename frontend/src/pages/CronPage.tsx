@@ -1,5 +1,6 @@
-import { useEffect, useState } from 'react'
+import { useEffect, useRef, useState } from 'react'
 import { api } from '../api/client'
+import type { CronRun, CronRunEvent, CronRunLine } from '../types'
 import { Clock, Plus, Trash2, Play, Pause, RefreshCw, Send, CheckCircle2, XCircle } from 'lucide-react'
 import toast from 'react-hot-toast'
 
@@ -44,6 +45,10 @@ export default function CronPage() {
   const [channel, setChannel] = useState('')
   const [adding, setAdding] = useState(false)
 
+  // Latest manual run per job, followed over a WebSocket while it runs
+  const [runs, setRuns] = useState<Record<string, { run: CronRun; lines: CronRunLine[] }>>({})
+  const socketsRef = useRef<Set<WebSocket>>(new Set())
+
   const fetchJobs = async () => {
     setLoading(true)
     try {
@@ -58,6 +63,8 @@ export default function CronPage() {
 
   useEffect(() => {
     fetchJobs()
+    const sockets = socketsRef.current
+    return () => sockets.forEach((ws) => ws.close())
   }, [])
 
   const handleAddJob = async (e: React.FormEvent) => {
@@ -107,14 +114,49 @@ export default function CronPage() {
     }
   }
 
+  const followRun = (jobId: string, runId: string) => {
+    const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws'
+    const ws = new WebSocket(`${protocol}://${window.location.host}/ws/cron/runs/${runId}`)
+    socketsRef.current.add(ws)
+
+    ws.onopen = () => {
+      ws.send(JSON.stringify({ token: api.getToken() }))
+    }
+
+    ws.onmessage = (event) => {
+      const data: CronRunEvent = JSON.parse(event.data)
+      if (data.type === 'output') {
+        setRuns((prev) => {
+          const current = prev[jobId]
+          if (!current || current.run.id !== runId) return prev
+          const lines = data.backfill ? data.lines : current.lines.concat(data.lines)
+          return { ...prev, [jobId]: { ...current, lines } }
+        })
+      } else if (data.type === 'done') {
+        setRuns((prev) => (prev[jobId] ? { ...prev, [jobId]: { ...prev[jobId], run: data.run } } : prev))
+        if (data.run.status === 'ok') {
+          toast.success(`Job finished in ${data.run.duration.toFixed(1)}s`)
+        } else {
+          toast.error(data.run.error || `Job failed (exit ${data.run.exit_status})`)
+        }
+        fetchJobs()
+      } else if (data.type === 'error') {
+        toast.error(data.message)
+      }
+    }
+
+    ws.onclose = () => {
+      socketsRef.current.delete(ws)
+    }
+  }
+
   const handleRun = async (id: string) => {
-    const runToast = toast.loading('Executing job...')
     try {
-      await api.runCronJob(id)
-      toast.success('Job executed successfully', { id: runToast })
-      fetchJobs()
+      const { run } = await api.runCronJob(id)
+      setRuns((prev) => ({ ...prev, [id]: { run, lines: [] } }))
+      followRun(id, run.id)
     } catch (err: any) {
-      toast.error(err.message, { id: runToast })
+      toast.error(err.message)
     }
   }
 
@@ -331,10 +373,15 @@ export default function CronPage() {
                 <div className="flex items-center gap-2">
                   <button
                     onClick={() => handleRun(job.id)}
-                    className="p-2 hover:bg-dark-800 text-dark-300 hover:text-nano-400 rounded-lg transition-colors"
+                    disabled={runs[job.id]?.run.status === 'running'}
+                    className="p-2 hover:bg-dark-800 text-dark-300 hover:text-nano-400 rounded-lg transition-colors disabled:opacity-40"
                     title="Run Now"
                   >
-                    <Play className="w-4 h-4" />
+                    {runs[job.id]?.run.status === 'running' ? (
+                      <RefreshCw className="w-4 h-4 animate-spin" />
+                    ) : (
+                      <Play className="w-4 h-4" />
+                    )}
                   </button>
                   <button
                     onClick={() => handleToggle(job)}
@@ -387,6 +434,28 @@ export default function CronPage() {
                   </p>
                 </div>
               </div>
+
+              {runs[job.id] && (
+                <div className="mt-4 pt-4 border-t border-dark-800/50">
+                  <div className="flex items-center justify-between mb-2">
+                    <span className="text-[10px] uppercase font-bold text-dark-500 tracking-wider">Manual Run</span>
+                    <span className={`text-xs ${
+                      runs[job.id].run.status === 'ok' ? 'text-green-400/80' :
+                      runs[job.id].run.status === 'running' ? 'text-dark-400' : 'text-red-400/80'
+                    }`}>
+                      {runs[job.id].run.status === 'running'
+                        ? 'Running...'
+                        : `${runs[job.id].run.status} · exit ${runs[job.id].run.exit_status ?? '-'} · ${runs[job.id].run.duration.toFixed(1)}s`}
+                    </span>
+                  </div>
+                  <pre className="p-3 text-xs font-mono text-dark-300 bg-dark-900/50 rounded-lg overflow-auto max-h-48 whitespace-pre-wrap">
+                    {runs[job.id].lines.length === 0 && runs[job.id].run.status === 'running' && 'Waiting for output...'}
+                    {runs[job.id].lines.map((l, i) => (
+                      <div key={i} className={l.stream === 'stderr' ? 'text-red-400/80' : undefined}>{l.line}</div>
+                    ))}
+                  </pre>
+                </div>
+              )}
             </div>
           ))
         )}
@@ -1,4 +1,4 @@
-import { useEffect, useState } from 'react'
+import { useEffect, useRef, useState } from 'react'
 import { api } from '../api/client'
 import { useStore } from '../store'
 import {
@@ -20,20 +20,39 @@ export default function DashboardPage() {
   const [loading, setLoading] = useState(true)
   const [restarting, setRestarting] = useState(false)
 
-  const fetchDashboard = async () => {
-    setLoading(true)
-    try {
-      const data = await api.getDashboard()
-      setDashboard(data)
-    } catch (err: any) {
-      toast.error('Failed to load dashboard: ' + err.message)
-    } finally {
-      setLoading(false)
+  const wsRef = useRef<WebSocket | null>(null)
+  // Only toast the first error of a streak; the server keeps retrying every poll
+  const failingRef = useRef(false)
+
+  // Snapshots are pushed by the server's shared poller; this asks it to poll now
+  const fetchDashboard = () => {
+    if (wsRef.current?.readyState === WebSocket.OPEN) {
+      wsRef.current.send(JSON.stringify({ type: 'refresh' }))
     }
   }
 
   useEffect(() => {
-    fetchDashboard()
+    const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws'
+    const ws = new WebSocket(`${protocol}://${window.location.host}/ws/dashboard`)
+
+    ws.onopen = () => {
+      ws.send(JSON.stringify({ token: api.getToken() }))
+    }
+
+    ws.onmessage = (event) => {
+      const data = JSON.parse(event.data)
+      if (data.type === 'snapshot') {
+        failingRef.current = false
+        setDashboard(data.data)
+      } else if (data.type === 'error' && !failingRef.current) {
+        failingRef.current = true
+        toast.error('Failed to load dashboard: ' + data.message)
+      }
+      setLoading(false)
+    }
+
+    wsRef.current = ws
+    return () => ws.close()
   }, [])
 
   const handleRestart = async () => {
@@ -196,6 +196,7 @@ export default function LoginPage() {
               {Object.entries(connectivityResults.results).map(([port, isOpen]: [string, any]) => (
                 <div
                   key={port}
+                  title={connectivityResults.details?.[port]?.banner ?? connectivityResults.details?.[port]?.state}
                   className={`flex items-center gap-2 p-2 rounded-lg text-sm ${
                     isOpen ? 'bg-emerald-500/10 text-emerald-400' : 'bg-dark-700 text-dark-400'
                   }`}
@@ -1,19 +1,31 @@
 import { useEffect, useState, useRef } from 'react'
 import { api } from '../api/client'
-import { FileText, RefreshCw, Download } from 'lucide-react'
+import { FileText, RefreshCw, Download, Radio } from 'lucide-react'
 import toast from 'react-hot-toast'
 
 export default function LogsPage() {
   const [logs, setLogs] = useState('')
   const [loading, setLoading] = useState(true)
   const [lines, setLines] = useState(200)
+  // Follow the log over a WebSocket instead of fetching snapshots
+  const [live, setLive] = useState(false)
+  // Filters run on the server; the pattern applies once Enter is pressed
+  const [level, setLevel] = useState('')
+  const [patternInput, setPatternInput] = useState('')
+  const [pattern, setPattern] = useState('')
   const logsRef = useRef<HTMLPreElement>(null)
+  // Where the last fetch ended, so a refresh only downloads newer lines
+  const cursorRef = useRef<string | null>(null)
+  const shownRef = useRef<string[]>([])
 
-  const fetchLogs = async () => {
-    setLoading(true)
+  const fetchLogs = async (newer = false) => {
+    const cursor = newer ? cursorRef.current : null
+    if (!cursor) setLoading(true)
     try {
-      const data = await api.getLogs(lines)
-      setLogs(data.logs || 'No logs available')
+      const data = await api.getLogs(lines, { cursor: cursor ?? undefined, level, pattern })
+      shownRef.current = (cursor ? shownRef.current.concat(data.lines) : data.lines).slice(-lines)
+      cursorRef.current = data.cursor
+      setLogs(shownRef.current.join('\n') || 'No logs available')
     } catch (err: any) {
       toast.error(err.message)
     } finally {
@@ -22,8 +34,33 @@ export default function LogsPage() {
   }
 
   useEffect(() => {
-    fetchLogs()
-  }, [lines])
+    if (!live) fetchLogs()
+  }, [lines, live, level, pattern])
+
+  useEffect(() => {
+    if (!live) return
+    const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws'
+    const ws = new WebSocket(`${protocol}://${window.location.host}/ws/logs`)
+    let buffer: string[] = []
+
+    ws.onopen = () => {
+      ws.send(JSON.stringify({ token: api.getToken() }))
+    }
+
+    ws.onmessage = (event) => {
+      const data = JSON.parse(event.data)
+      if (data.type === 'lines') {
+        buffer = (data.backfill ? data.lines : buffer.concat(data.lines)).slice(-lines)
+        setLogs(buffer.join('\n') || 'No logs available')
+        setLoading(false)
+      } else if (data.type === 'error') {
+        toast.error(data.message)
+        setLive(false)
+      }
+    }
+
+    return () => ws.close()
+  }, [live, lines])
 
   useEffect(() => {
     if (logsRef.current) {
@@ -49,6 +86,26 @@ export default function LogsPage() {
           <p className="text-dark-400 text-sm mt-1">View nanobot service logs</p>
         </div>
         <div className="flex items-center gap-3">
+          <input
+            value={patternInput}
+            onChange={(e) => setPatternInput(e.target.value)}
+            onKeyDown={(e) => e.key === 'Enter' && setPattern(patternInput.trim())}
+            placeholder="Filter (regex)"
+            disabled={live}
+            className="input text-sm w-48"
+          />
+          <select
+            value={level}
+            onChange={(e) => setLevel(e.target.value)}
+            disabled={live}
+            className="input text-sm"
+          >
+            <option value="">All levels</option>
+            <option value="debug">Debug+</option>
+            <option value="info">Info+</option>
+            <option value="warning">Warning+</option>
+            <option value="error">Error+</option>
+          </select>
           <select
             value={lines}
             onChange={(e) => setLines(Number(e.target.value))}
@@ -64,7 +121,14 @@ export default function LogsPage() {
             <Download className="w-4 h-4" />
             Export
           </button>
-          <button onClick={fetchLogs} className="btn-primary flex items-center gap-2">
+          <button
+            onClick={() => setLive(!live)}
+            className={`${live ? 'btn-primary' : 'btn-secondary'} flex items-center gap-2`}
+          >
+            <Radio className="w-4 h-4" />
+            Live
+          </button>
+          <button onClick={() => fetchLogs(true)} disabled={live} className="btn-primary flex items-center gap-2">
             <RefreshCw className="w-4 h-4" />
             Refresh
           </button>
@@ -2,18 +2,19 @@ import { useEffect, useState } from 'react'
 import { api } from '../api/client'
 import { Database, Save } from 'lucide-react'
 import toast from 'react-hot-toast'
+import type { MemoryFile } from '../types'
 
-interface MemoryFile {
-  name: string
-  path: string
-  content: string
-}
+const formatSize = (bytes: number) =>
+  bytes < 1024 ? `${bytes} B` : bytes < 1048576 ? `${(bytes / 1024).toFixed(1)} KB` : `${(bytes / 1048576).toFixed(1)} MB`
 
 export default function MemoryPage() {
   const [files, setFiles] = useState<MemoryFile[]>([])
+  const [maxReadBytes, setMaxReadBytes] = useState(Infinity)
   const [loading, setLoading] = useState(true)
   const [selected, setSelected] = useState<MemoryFile | null>(null)
   const [editContent, setEditContent] = useState('')
+  const [truncated, setTruncated] = useState(false)
+  const [loadingFile, setLoadingFile] = useState(false)
   const [saving, setSaving] = useState(false)
 
   const fetchMemory = async () => {
@@ -21,6 +22,7 @@ export default function MemoryPage() {
     try {
       const data = await api.getMemory()
       setFiles(data.files || [])
+      if (data.max_read_bytes) setMaxReadBytes(data.max_read_bytes)
     } catch (err: any) {
       toast.error(err.message)
     } finally {
@@ -32,9 +34,24 @@ export default function MemoryPage() {
     fetchMemory()
   }, [])
 
-  const selectFile = (file: MemoryFile) => {
+  const selectFile = async (file: MemoryFile) => {
     setSelected(file)
-    setEditContent(file.content)
+    setEditContent('')
+    setTruncated(false)
+    setLoadingFile(true)
+    try {
+      // Files over the read limit (e.g. HISTORY.md) would come back truncated; show their tail read-only
+      const large = file.size > maxReadBytes
+      let data = await api.getMemoryFile(file.path, large ? { tail: 500 } : {})
+      // It may have grown past the limit since the listing
+      if (!large && data.truncated) data = await api.getMemoryFile(file.path, { tail: 500 })
+      setEditContent(data.content)
+      setTruncated(data.truncated)
+    } catch (err: any) {
+      toast.error(err.message)
+    } finally {
+      setLoadingFile(false)
+    }
   }
 
   const saveFile = async () => {
@@ -87,6 +104,7 @@ export default function MemoryPage() {
                 <div>
                   <span className="font-medium text-dark-100">{file.name}</span>
                   <p className="text-xs text-dark-500 font-mono truncate">{file.path}</p>
+                  <p className="text-xs text-dark-500">{formatSize(file.size)}</p>
                 </div>
               </div>
             </div>
@@ -99,9 +117,16 @@ export default function MemoryPage() {
               <h3 className="text-lg font-semibold text-dark-100 mb-1">{selected.name}</h3>
               <p className="text-xs text-dark-500 font-mono mb-4">{selected.path}</p>
 
+              {truncated && (
+                <p className="text-xs text-amber-400 mb-2">
+                  File is {formatSize(selected.size)}; showing the last 500 lines read-only.
+                </p>
+              )}
+
               <textarea
-                value={editContent}
+                value={loadingFile ? 'Loading...' : editContent}
                 onChange={(e) => setEditContent(e.target.value)}
+                readOnly={loadingFile || truncated}
                 rows={24}
                 className="input w-full font-mono text-sm resize-y"
               />
@@ -112,7 +137,7 @@ export default function MemoryPage() {
                 </button>
                 <button
                   onClick={saveFile}
-                  disabled={saving}
+                  disabled={saving || loadingFile || truncated}
                   className="btn-primary flex items-center gap-2"
                 >
                   <Save className="w-4 h-4" />
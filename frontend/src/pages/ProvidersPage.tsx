@@ -25,6 +25,7 @@ const PROVIDER_LIST = [
 
 export default function ProvidersPage() {
   const [providers, setProviders] = useState<any>({})
+  const [version, setVersion] = useState<string | null>(null)
   const [loading, setLoading] = useState(true)
   const [selected, setSelected] = useState<string | null>(null)
   const [apiKey, setApiKey] = useState('')
@@ -35,8 +36,9 @@ export default function ProvidersPage() {
   const fetchProviders = async () => {
     setLoading(true)
     try {
-      const data = await api.getProviders()
+      const { data, version } = await api.getProviders()
       setProviders(data)
+      setVersion(version)
     } catch (err: any) {
       toast.error(err.message)
     } finally {
@@ -62,8 +64,9 @@ export default function ProvidersPage() {
     try {
       const data: Record<string, any> = { apiKey: apiKey }
       if (apiBase.trim()) data.apiBase = apiBase.trim()
-      await api.updateProvider(selected, data)
+      const res = await api.updateProvider(selected, data, version)
       setProviders({ ...providers, [selected]: data })
+      setVersion(res.version)
       toast.success(`${selected} provider saved`)
     } catch (err: any) {
       toast.error(err.message)
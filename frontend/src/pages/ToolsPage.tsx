@@ -5,6 +5,7 @@ import toast from 'react-hot-toast'
 
 export default function ToolsPage() {
   const [tools, setTools] = useState<any>(null)
+  const [version, setVersion] = useState<string | null>(null)
   const [editJson, setEditJson] = useState('')
   const [loading, setLoading] = useState(true)
   const [saving, setSaving] = useState(false)
@@ -12,8 +13,9 @@ export default function ToolsPage() {
   const fetchTools = async () => {
     setLoading(true)
     try {
-      const data = await api.getTools()
+      const { data, version } = await api.getTools()
       setTools(data)
+      setVersion(version)
       setEditJson(JSON.stringify(data, null, 2))
     } catch (err: any) {
       toast.error(err.message)
@@ -30,8 +32,9 @@ export default function ToolsPage() {
     setSaving(true)
     try {
       const data = JSON.parse(editJson)
-      await api.updateTools(data)
+      const res = await api.updateTools(data, version)
       setTools(data)
+      setVersion(res.version)
       toast.success('Tools configuration saved')
     } catch (err: any) {
       toast.error(err.message || 'Invalid JSON')
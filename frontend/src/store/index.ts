@@ -1,4 +1,5 @@
 import { create } from 'zustand'
+import { api } from '../api/client'
 import type { ChatMessage, DashboardData } from '../types'
 
 interface AppStore {
@@ -16,6 +17,7 @@ interface AppStore {
   // Chat
   chatMessages: ChatMessage[]
   addChatMessage: (msg: ChatMessage) => void
+  appendToChatMessage: (id: string, text: string) => void
   clearChat: () => void
 
   // Sidebar
@@ -29,6 +31,7 @@ export const useStore = create<AppStore>((set) => ({
   setAuthenticated: (val) => set({ isAuthenticated: val }),
   setServerInfo: (info) => set({ serverInfo: info }),
   logout: () => {
+    api.logout().catch(() => {})
     localStorage.removeItem('nanobot_token')
     set({ isAuthenticated: false, serverInfo: null, dashboard: null, chatMessages: [] })
   },
@@ -38,6 +41,10 @@ export const useStore = create<AppStore>((set) => ({
 
   chatMessages: [],
   addChatMessage: (msg) => set((s) => ({ chatMessages: [...s.chatMessages, msg] })),
+  appendToChatMessage: (id, text) =>
+    set((s) => ({
+      chatMessages: s.chatMessages.map((m) => (m.id === id ? { ...m, content: m.content + text } : m)),
+    })),
   clearChat: () => set({ chatMessages: [] }),
 
   sidebarOpen: true,
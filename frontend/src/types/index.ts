@@ -41,9 +41,110 @@ export interface Skill {
 export interface MemoryFile {
   name: string
   path: string
+  size: number
+  mtime: number
+  hash: string // fingerprint of path, mtime and size; not of the content
+}
+
+export interface MemoryFileContent {
+  path: string
+  size: number
+  mtime: number
+  offset: number
+  end: number
+  truncated: boolean
   content: string
 }
 
+export interface CronRunLine {
+  stream: 'stdout' | 'stderr'
+  line: string
+}
+
+export interface CronRun {
+  id: string
+  job_id: string
+  status: 'running' | 'ok' | 'error' | 'timeout'
+  exit_status: number | null
+  error: string | null
+  started_at: number
+  finished_at: number | null
+  duration: number // seconds
+  output?: CronRunLine[]
+}
+
+export type CronRunEvent =
+  | { type: 'output'; lines: CronRunLine[]; backfill?: boolean }
+  | { type: 'done'; run: CronRun }
+  | { type: 'error'; message: string }
+
+// A config-derived read and the config version (ETag) it was based on
+export interface Versioned<T> {
+  data: T
+  version: string | null
+}
+
+export type SearchKind = 'workspace' | 'skill' | 'memory'
+
+export interface SearchResult {
+  path: string // relative to the workspace
+  kind: SearchKind
+  name: string
+  line: number // first line of the matching section
+  snippet: string
+  highlights: [number, number][] // matched ranges within snippet
+  score: number
+}
+
+export interface SearchResponse {
+  results: SearchResult[]
+  indexed_at: number | null
+  error: string | null
+}
+
+export type MetricField = 'cpu' | 'load' | 'mem_used' | 'disk_used' | 'proc_rss' | 'proc_cpu'
+
+export interface MetricsHistory {
+  since: number
+  until: number
+  interval: number
+  t: number[]
+  series: Record<MetricField, { min: (number | null)[]; max: (number | null)[]; avg: (number | null)[] }>
+  latest: Partial<Record<MetricField | 'mem_total' | 'disk_total' | 'time' | 'pid', number | null>>
+}
+
+export interface LogsResult {
+  source: 'journal' | 'file' | null
+  lines: string[]
+  cursor: string | null
+  more: boolean
+  logs: string
+}
+
+export interface LogsQuery {
+  cursor?: string
+  level?: string
+  pattern?: string
+  since?: number
+  until?: number
+}
+
+export interface FleetHost {
+  id: string
+  host: string
+  port: number
+  username: string
+  self: boolean
+}
+
+export type FleetAction = 'status' | 'config' | 'patch' | 'restart' | 'cron'
+
+// One line of a /fleet/run stream: a host's outcome, or the closing summary
+export type FleetEvent =
+  | { host: string; ok: true; result: any; elapsed_ms: number }
+  | { host: string; ok: false; error: string; elapsed_ms: number }
+  | { done: true; ok: number; failed: number; elapsed_ms: number }
+
 export interface ChatMessage {
   id: string
   role: 'user' | 'assistant' | 'system'